@@ -0,0 +1,132 @@
+"""
+Analysis of the graph of one round, shared by all the players of that round.
+"""
+import numpy as np
+
+from .betweenness import DynamicBetweenness, _get_scale
+from .graph import ArrayGraph, to_array_graph
+
+
+class RoundAnalysis:
+    """
+    Every strategy sees the same graph within a round, so the shortest paths of that graph are computed once and
+    shared: the Game owns one RoundAnalysis per round (see Game.analysis) and drops it as soon as the graph changes
+    (see Game.update_env).
+
+    Everything is computed on first use, a round of random players never runs a BFS. The shortest path DAG of a
+    source s is not stored as such, it is given by the distances: the edge (a, b) is on it iff
+    dist(s, b) == dist(s, a) + 1.
+    """
+    def __init__(self, graph, nb_nodes=None):
+        """
+        :param graph: ArrayGraph or nx.Graph, graph of the round whose nodes are 0..nb_nodes-1 (copied)
+        :param nb_nodes: int, number of nodes (default to the number of nodes of the graph)
+        """
+        self._graph = to_array_graph(graph, nb_nodes)
+        self._edge_array = None
+        self._dist = None
+        self._sigma = None
+        self._delta = None
+        self._betweenness = None
+
+    @classmethod
+    def from_edges(cls, nb_nodes, edges):
+        """
+        :param nb_nodes: int, number of nodes
+        :param edges: iterable of edges, e.g. a state of Game.history
+        :return: RoundAnalysis
+        """
+        return cls(ArrayGraph.from_edges(nb_nodes, edges))
+
+    @property
+    def graph(self):
+        """
+        ArrayGraph of the round, it must not be modified
+        """
+        return self._graph
+
+    @property
+    def nb_nodes(self):
+        return self._graph.number_of_nodes()
+
+    def edge_array(self):
+        """
+        :return: (nb_edges, 2) int array of the edges (u, v) with u < v
+        """
+        if self._edge_array is None:
+            self._edge_array = self._graph.edge_array()
+        return self._edge_array
+
+    def _compute_shortest_paths(self):
+        """
+        Brandes' algorithm from every source, by batches
+        """
+        nb_nodes = self.nb_nodes
+        self._dist = np.full((nb_nodes, nb_nodes), -1, dtype=np.int32)
+        self._sigma = np.zeros((nb_nodes, nb_nodes))
+        self._delta = np.zeros((nb_nodes, nb_nodes))
+
+        batch_size = self._graph.get_batch_size()
+        for start in range(0, nb_nodes, batch_size):
+            batch = np.arange(start, min(start + batch_size, nb_nodes))
+            dist, sigma, dag = self._graph.bfs(batch)
+            self._dist[batch], self._sigma[batch] = dist, sigma
+            self._delta[batch] = self._graph.accumulate_dependencies(dist, sigma, dag)
+
+    def distances(self):
+        """
+        :return: (nb_nodes, nb_nodes) int array of the distances (-1 if unreachable), it must not be modified
+        """
+        if self._dist is None:
+            self._compute_shortest_paths()
+        return self._dist
+
+    def sigma(self):
+        """
+        :return: (nb_nodes, nb_nodes) array of the number of shortest paths, it must not be modified
+        """
+        if self._sigma is None:
+            self._compute_shortest_paths()
+        return self._sigma
+
+    def dependencies(self):
+        """
+        :return: (nb_nodes, nb_nodes) array of the dependency of each source on every node, it must not be modified
+        """
+        if self._delta is None:
+            self._compute_shortest_paths()
+        return self._delta
+
+    def betweenness(self, normalized=True):
+        """
+        :param normalized: boolean, same normalization as nx.betweenness_centrality
+        :return: array of betweenness centrality indexed by node
+        """
+        if self._betweenness is None:
+            self._betweenness = self.dependencies().sum(axis=0)
+        return self._betweenness * _get_scale(self.nb_nodes, normalized)
+
+    def node_betweenness(self, node, normalized=True):
+        """
+        :param node: int, node
+        :param normalized: boolean, same normalization as nx.betweenness_centrality
+        :return: float, betweenness centrality of the node
+        """
+        return float(self.betweenness(normalized)[node])
+
+    def get_target_dependencies(self, node):
+        """
+        :param node: int, node
+        :return: tuple (distances, dependency of every source on the node), the dependencies argument of
+        DynamicBetweenness in target mode
+        """
+        return self.distances(), self.dependencies()[:, node]
+
+    def get_engine(self, node=None):
+        """
+        :param node: int, if given the engine only tracks the betweenness of this node
+        :return: DynamicBetweenness initialized from the shortest paths of the round, without any traversal
+        """
+        if node is None:
+            return DynamicBetweenness(self._graph, dependencies=(self.distances(), self.dependencies()))
+        return DynamicBetweenness(self._graph, node=node, dependencies=self.get_target_dependencies(node))
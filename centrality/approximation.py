@@ -0,0 +1,282 @@
+"""
+Sampling estimators of the betweenness centrality, used by the approx greedy strategy on large games.
+"""
+import math
+import numpy as np
+
+from .graph import to_array_graph
+
+
+def get_vertex_diameter_bound(graph):
+    """
+    Upper bound of the vertex diameter (largest number of nodes on a shortest path) of an undirected graph: a BFS
+    from any node x of a component gives a diameter of at most 2 * eccentricity(x) for that component
+    :param graph: ArrayGraph
+    :return: int, vertex diameter bound
+    """
+    nb_nodes = graph.number_of_nodes()
+    unseen = graph.degree() > 0
+    bound = 1 if nb_nodes else 0
+
+    while unseen.any():
+        dist = graph.bitset_distances(np.argmax(unseen))[0]
+        unseen &= dist < 0
+        bound = max(bound, 2 * int(dist.max()) + 1)
+
+    return min(bound, nb_nodes)
+
+
+def get_sample_size(vertex_diameter, eps, delta, c=.5):
+    """
+    Number of sampled shortest paths of Riondato and Kornaropoulos' estimator so that every estimate is within eps of
+    the betweenness (normalized by the number of ordered pairs) with probability at least 1 - delta
+    :param vertex_diameter: int, vertex diameter (or an upper bound)
+    :param eps: float, additive error
+    :param delta: float, failure probability
+    :param c: float, universal constant of the VC-dimension bound (0.5 as in the paper)
+    :return: int, number of samples
+    """
+    vc_dimension = math.floor(math.log2(vertex_diameter - 2)) + 1 if vertex_diameter > 2 else 1
+    return int(math.ceil(c / eps ** 2 * (vc_dimension + math.log(1. / delta))))
+
+
+def sample_pairs(nb_nodes, nb_samples, rng):
+    """
+    :param nb_nodes: int, number of nodes
+    :param nb_samples: int, number of pairs
+    :param rng: np.random.Generator
+    :return: tuple (sources, targets), ordered pairs of distinct nodes drawn uniformly at random
+    """
+    sources = rng.integers(nb_nodes, size=nb_samples)
+    targets = rng.integers(nb_nodes - 1, size=nb_samples)
+    targets += targets >= sources
+    return sources, targets
+
+
+def _sample_interior_nodes(graph, dist, sigma, rows, targets, rng):
+    """
+    Draw one shortest path uniformly at random for each (source row, target) pair, walking back from the target and
+    choosing each predecessor p of the current node w with probability sigma(p) / sigma(w). The predecessors are
+    scanned in increasing order, so the drawn paths only depend on the edges of the graph and the rng, not on the
+    order in which the neighbors are stored (toggling an edge off and on again moves it to the end of the rows, and
+    a BitsetGraph keeps them sorted)
+    :param graph: ArrayGraph
+    :param dist: (nb_sources, nb_nodes) array of distances
+    :param sigma: (nb_sources, nb_nodes) array of number of shortest paths
+    :param rows: array of source rows
+    :param targets: array of targets
+    :param rng: np.random.Generator
+    :return: array of the interior nodes of all the drawn paths
+    """
+    interior = []
+
+    # paths of length 0 or 1 have no interior node
+    active = dist[rows, targets] > 1
+    rows, current = rows[active], targets[active]
+    nb_nodes = graph.number_of_nodes()
+    while rows.size:
+        neighbors, mask = graph.get_neighbor_rows(current)
+        # unused slots are sorted after the neighbors
+        neighbors = np.sort(np.where(mask, neighbors, nb_nodes), axis=1)
+        mask = neighbors < nb_nodes
+        neighbors[~mask] = 0
+        mask &=dist[rows[:, None], neighbors] == dist[rows, current][:, None] - 1
+        weights = np.cumsum(np.where(mask, sigma[rows[:, None], neighbors], 0.), axis=1)
+
+        draw = rng.random(rows.size) * weights[:, -1]
+        choice = np.minimum((weights <= draw[:, None]).sum(axis=1), neighbors.shape[1] - 1)
+        current = neighbors[np.arange(rows.size), choice]
+
+        active = dist[rows, current] > 0
+        rows, current = rows[active], current[active]
+        interior.append(current)
+
+    return np.concatenate(interior) if interior else np.zeros(0, dtype=np.int64)
+
+
+def approximate_betweenness_centrality(graph, eps=.1, delta=.05, seed=None, nb_nodes=None):
+    """
+    Riondato and Kornaropoulos' estimator of the betweenness centrality (Fast approximation of betweenness centrality
+    through sampling, 2014): r shortest paths between random pairs of nodes are drawn, r being sized with the vertex
+    diameter of the graph, and the betweenness of a node is estimated by the share of the paths going through it.
+    With probability at least 1 - delta, every estimate is within eps of nx.betweenness_centrality(graph) (the sample
+    size is computed for that normalization). The cost grows with the number of samples, not with the size of the
+    graph cubed.
+    :param graph: ArrayGraph or nx.Graph, graph whose nodes are 0..nb_nodes-1
+    :param eps: float, additive error
+    :param delta: float, failure probability
+    :param seed: None, int or np.random.Generator, source of randomness
+    :param nb_nodes: int, number of nodes (default to the number of nodes of the graph)
+    :return: dictionary node -> estimated betweenness centrality
+    """
+    graph = to_array_graph(graph, nb_nodes, copy=False)
+    nb_nodes = graph.number_of_nodes()
+    rng = np.random.default_rng(seed)
+
+    counts = np.zeros(nb_nodes)
+    vertex_diameter = get_vertex_diameter_bound(graph)
+    if nb_nodes < 3 or vertex_diameter < 3:
+        # no shortest path has an interior node
+        return {node: 0. for node in range(nb_nodes)}
+
+    # the paper normalizes by the n(n-1) ordered pairs, networkx by (n-1)(n-2)
+    scale = nb_nodes / (nb_nodes - 2.)
+    nb_samples = get_sample_size(vertex_diameter, eps / scale, delta)
+    sources, targets = sample_pairs(nb_nodes, nb_samples, rng)
+
+    # one batched BFS per group of distinct sources
+    unique_sources, source_rows = np.unique(sources, return_inverse=True)
+    batch_size = graph.get_batch_size()
+    for start in range(0, len(unique_sources), batch_size):
+        dist, sigma, _ = graph.bfs(unique_sources[start:start + batch_size])
+        in_batch = (source_rows >= start) & (source_rows < start + batch_size)
+        interior = _sample_interior_nodes(graph, dist, sigma, source_rows[in_batch] - start, targets[in_batch], rng)
+        counts += np.bincount(interior, minlength=nb_nodes)
+
+    counts *= scale / nb_samples
+    return {node: value for node, value in enumerate(counts.tolist())}
+
+
+def _bfs_by_batches(graph, sources):
+    """
+    :return: tuple (distances, number of shortest paths), (len(sources), nb_nodes) arrays
+    """
+    if not len(sources):
+        return np.zeros((0, graph.number_of_nodes()), dtype=np.int32), np.zeros((0, graph.number_of_nodes()))
+
+    dist, sigma = [], []
+    batch_size = graph.get_batch_size()
+    for start in range(0, len(sources), batch_size):
+        batch_dist, batch_sigma, _ = graph.bfs(sources[start:start + batch_size])
+        dist.append(batch_dist)
+        sigma.append(batch_sigma)
+    return np.concatenate(dist), np.concatenate(sigma)
+
+
+class SampledPairsBetweenness:
+    """
+    Estimate of the betweenness of one node from a fixed sample of ordered pairs (s, t), meant to be shared by all the
+    candidate actions of a move (common random numbers): the difference between two candidates is then not hidden by
+    the noise of independent samples.
+
+    Each pair contributes the exact share sigma_st(node) / sigma_st of its shortest paths going through the node
+    (instead of one random path), so by Hoeffding's inequality ln(2 / delta) / (2 eps^2) pairs give an estimate within
+    eps of the betweenness with probability at least 1 - delta.
+
+    Toggling the edge (u, v) only changes the pairs whose shortest paths can use it, i.e. dist(s, u) + 1 + dist(v, t)
+    (or the symmetric path) is equal to dist(s, t) for a removed edge, or at most dist(s, t) for an added one. The
+    distances from both ends of every pair are kept to find them, and only those pairs are re-evaluated.
+    """
+    def __init__(self, graph, node, eps=.1, delta=.05, seed=None, nb_nodes=None):
+        """
+        :param graph: ArrayGraph or nx.Graph, graph whose nodes are 0..nb_nodes-1 (copied)
+        :param node: int, node whose betweenness is estimated
+        :param eps: float, additive error
+        :param delta: float, failure probability
+        :param seed: None, int or np.random.Generator, source of randomness
+        :param nb_nodes: int, number of nodes (default to the number of nodes of the graph)
+        """
+        self._graph = to_array_graph(graph, nb_nodes)
+        self._nb_nodes = self._graph.number_of_nodes()
+        self._node = node
+
+        # the estimator is normalized by the n(n-1) ordered pairs, networkx by (n-1)(n-2)
+        self._scale = self._nb_nodes / (self._nb_nodes - 2.) if self._nb_nodes > 2 else 0.
+        nb_samples = int(math.ceil(math.log(2. / delta) / (2. * (eps / self._scale) ** 2))) if self._scale else 0
+
+        rng = np.random.default_rng(seed)
+        self._sources, self._targets = sample_pairs(self._nb_nodes, nb_samples, rng)
+
+        # distances from every end of the sampled pairs
+        ends, rows = np.unique(np.concatenate((self._sources, self._targets)), return_inverse=True)
+        self._source_rows, self._target_rows = rows[:nb_samples], rows[nb_samples:]
+        dist, sigma = _bfs_by_batches(self._graph, ends)
+
+        node_dist, node_sigma, _ = self._graph.bfs(node)
+        self._values = self._get_values(dist[self._source_rows], sigma[self._source_rows],
+                                        node_dist[0], node_sigma[0], np.arange(nb_samples))
+        self._set_distances(dist)
+
+    def _set_distances(self, dist):
+        """
+        Keep what get_affected_pairs needs: the distances of every pair and, node by node, the distances from the ends
+        of the pairs, the unreachable nodes being at distance 2 * nb_nodes
+        :param dist: (nb_ends, nb_nodes) array of distances from the ends of the pairs (-1 if unreachable)
+        """
+        self._unreachable = 2 * self._nb_nodes
+        # (nb_nodes, nb_ends), row u holds the distances from every end to u
+        self._end_dist = np.ascontiguousarray(np.where(dist < 0, self._unreachable, dist).T)
+        self._pair_dist = self._end_dist[self._targets, self._source_rows]
+
+    @property
+    def nb_samples(self):
+        return len(self._sources)
+
+    def _get_values(self, source_dist, source_sigma, node_dist, node_sigma, pairs):
+        """
+        :param source_dist: (len(pairs), nb_nodes) distances from the source of each pair
+        :param source_sigma: (len(pairs), nb_nodes) number of shortest paths from the source of each pair
+        :param node_dist: distances from the node
+        :param node_sigma: number of shortest paths from the node
+        :param pairs: array of pair indices
+        :return: array, share of the shortest paths of each pair going through the node
+        """
+        rows = np.arange(len(pairs))
+        targets = self._targets[pairs]
+
+        dist_st = source_dist[rows, targets]
+        dist_sn = source_dist[:, self._node]
+        through = (dist_sn > 0) & (node_dist[targets] > 0) & (dist_sn + node_dist[targets] == dist_st)
+
+        values = np.zeros(len(pairs))
+        values[through] = (source_sigma[rows, self._node][through] * node_sigma[targets][through] /
+                           source_sigma[rows, targets][through])
+        return values
+
+    def estimate(self):
+        """
+        :return: float, estimated betweenness of the node (networkx normalization)
+        """
+        if not self.nb_samples:
+            return 0.
+        return self._values.mean() * self._scale
+
+    def get_affected_pairs(self, u, v):
+        """
+        :return: array of the indices of the pairs whose shortest paths change when the edge (u, v) is toggled
+        """
+        # only the distances to u and v are read, O(nb_samples) per candidate
+        to_u, to_v = self._end_dist[u], self._end_dist[v]
+        via = np.minimum(to_u[self._source_rows] + to_v[self._target_rows],
+                         to_v[self._source_rows] + to_u[self._target_rows]) + 1
+        if self._graph.has_edge(u, v):
+            affected = via == self._pair_dist
+        else:
+            affected = via <= self._pair_dist
+        return np.flatnonzero(affected & (via < self._unreachable))
+
+    def what_if(self, u, v):
+        """
+        Estimated betweenness of the node if the edge (u, v) were toggled, using the same pairs. The estimator is
+        left unchanged.
+        :return: float, estimated betweenness of the node (networkx normalization)
+        """
+        node_degree = self._graph.degree(self._node)
+        if self._node in (u, v):
+            node_degree += -1 if self._graph.has_edge(u, v) else 1
+        if node_degree < 2:
+            # a leaf or an isolated node is never strictly inside a shortest path
+            return 0.
+
+        pairs = self.get_affected_pairs(u, v)
+        if not len(pairs):
+            return self.estimate()
+
+        self._graph.toggle_edge(u, v)
+        sources, rows = np.unique(self._sources[pairs], return_inverse=True)
+        source_dist, source_sigma = _bfs_by_batches(self._graph, sources)
+        node_dist, node_sigma, _ = self._graph.bfs(self._node)
+        values = self._get_values(source_dist[rows], source_sigma[rows], node_dist[0], node_sigma[0], pairs)
+        self._graph.toggle_edge(u, v)
+
+        return (self._values.sum() - self._values[pairs].sum() + values.sum()) / self.nb_samples * self._scale
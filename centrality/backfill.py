@@ -0,0 +1,242 @@
+"""
+Offline metrics of saved games (pickles such as centrality/games/*.pkl or binary game files): the states are rebuilt
+from the histories, no strategy is replayed. The rounds of every game are split in chunks computed by a process pool,
+each chunk being updated round by round from the toggled edges (see metrics.IncrementalMetrics). A chunk of a binary
+game file only reads the closest checkpoint before its first round and the toggles of its rounds, a pickle is loaded
+once and its tasks receive the state and toggles of their rounds.
+
+As in game.metrics (see observer.MetricsObserver), the initial state has no row: row i holds the metrics of round
+i + 1.
+
+The metrics of a game are written to output_directory/<path of the game>.npz (see metricstore.MetricsStore.save_npz),
+the path of the game being relative to the deepest common directory of the games and keeping its extension (e.g.
+metrics/x.pkl.npz and metrics/run2/x.cgam.npz), as soon as all its chunks are computed. Every chunk is saved to its
+own file before, so an interrupted backfill of the same games resumes where it stopped: the games and chunks already
+computed for the same metrics are skipped.
+
+Usage: python -m centrality.backfill centrality/games/*.pkl --output metrics --metrics macro_diameter micro_triangles
+"""
+import argparse
+import multiprocessing
+import os
+
+from .game import Game
+from .gamefile import GameFile, is_game_file
+from .graph import ArrayGraph
+from .metrics import IncrementalMetrics, Metrics
+from .metricstore import MetricsStore, read_npz_metrics
+
+
+def load_history(filename):
+    """
+    :param filename: string, path of a game saved by Game.save or Game.save_binary
+    :return: GameHistory of the game
+    """
+    game = Game()
+    game.load(filename)
+    return game.history
+
+
+def get_nb_rounds(filename):
+    """
+    :param filename: string, path of a game saved by Game.save or Game.save_binary
+    :return: int, number of rounds of the history of the game (read from the header of a binary game file)
+    """
+    if is_game_file(filename):
+        return GameFile(filename).nb_rounds
+    return len(load_history(filename))
+
+
+def read_rounds(filename, start, end):
+    """
+    Read rounds start..end-1 of a binary game file: the state of round start is rebuilt from the closest checkpoint
+    before it, the rest of the file is not read
+    :param filename: string, path of a game saved by Game.save_binary
+    :param start: int, first round
+    :param end: int, end round (excluded)
+    :return: tuple (ArrayGraph, state of round start, list of the (nb_toggles, 2) arrays of edges toggled by the rounds
+    start + 1..end - 1)
+    """
+    game_file = GameFile(filename)
+    checkpoint = start // game_file.checkpoint_interval
+    graph = ArrayGraph.from_edges(game_file.nb_nodes, game_file.get_checkpoint(checkpoint).tolist())
+    for round_number in range(checkpoint * game_file.checkpoint_interval + 1, start + 1):
+        for u, v in game_file.get_toggles(round_number).tolist():
+            graph.toggle_edge(u, v)
+    return graph, [game_file.get_toggles(round_number) for round_number in range(start + 1, end)]
+
+
+def _get_history_rounds(history, start, end):
+    """
+    :return: same as read_rounds, from a GameHistory
+    """
+    return history.get_graph(start), [history.get_toggles(round_number) for round_number in range(start + 1, end)]
+
+
+def get_output_filename(output_directory, filename, root=None):
+    """
+    :param output_directory: string, directory of the metrics
+    :param filename: string, path of a saved game
+    :param root: string, directory of the games, the metrics keep the path of the game relative to it, extension
+    included, so games with the same name in different directories or formats (x.pkl and x.cgam) never share their
+    metrics (default to the directory of the game)
+    :return: string, path of the metrics of that game
+    """
+    filename = os.path.abspath(filename)
+    if root is None:
+        root = os.path.dirname(filename)
+    return os.path.join(output_directory, os.path.relpath(filename, os.path.abspath(root)) + ".npz")
+
+
+def get_output_filenames(output_directory, filenames):
+    """
+    :param output_directory: string, directory of the metrics
+    :param filenames: iterable of paths of saved games
+    :return: dictionary game filename -> path of its metrics, relative to the deepest common directory of the games
+    """
+    filenames = list(filenames)
+    if not filenames:
+        return {}
+    root = os.path.commonpath([os.path.dirname(os.path.abspath(filename)) for filename in filenames])
+
+    outputs = {}
+    # path of the metrics -> game filename
+    games = {}
+    for filename in filenames:
+        output_filename = get_output_filename(output_directory, filename, root)
+        if output_filename in games:
+            raise Exception("%s and %s would both write their metrics to %s" %
+                            (games[output_filename], filename, output_filename))
+        games[output_filename] = filename
+        outputs[filename] = output_filename
+    return outputs
+
+
+def _get_chunk_filename(output_filename, start, end):
+    return "%s.%s-%s.part.npz" % (output_filename[:-len(".npz")], start, end)
+
+
+def _is_done(filename, metrics):
+    return os.path.exists(filename) and read_npz_metrics(filename) == metrics
+
+
+def _save(store, filename):
+    """
+    Write the store to a temporary file renamed at the end, so that an interrupted write never leaves a file that
+    looks complete
+    """
+    temporary = filename[:-len(".npz")] + ".tmp.npz"
+    store.save_npz(temporary)
+    os.replace(temporary, filename)
+
+
+def _compute_chunk(task):
+    """
+    :param task: tuple (game filename, chunk filename, first round, end round, metrics, rounds), rounds being the
+    result of read_rounds for a pickle (None to read them from the binary game file)
+    :return: tuple (game filename, chunk filename)
+    """
+    filename, chunk_filename, start, end, metrics, rounds = task
+    graph, toggles = read_rounds(filename, start, end) if rounds is None else rounds
+
+    incremental = IncrementalMetrics(graph, metrics)
+    store = MetricsStore(graph.number_of_nodes(), metrics, end - start)
+    store.append(incremental.get_metrics())
+    for round_toggles in toggles:
+        incremental.update(round_toggles)
+        store.append(incremental.get_metrics())
+
+    _save(store, chunk_filename)
+    return filename, chunk_filename
+
+
+def _merge_chunks(output_filename, chunk_filenames):
+    store = MetricsStore.load_npz(chunk_filenames[0])
+    for chunk_filename in chunk_filenames[1:]:
+        store.extend(MetricsStore.load_npz(chunk_filename))
+    _save(store, output_filename)
+    for chunk_filename in chunk_filenames:
+        os.remove(chunk_filename)
+
+
+def backfill(filenames, output_directory, metrics=None, nb_workers=None, chunk_size=64):
+    """
+    Compute the metrics of every round (but the initial state) of the saved games, skipping the games and chunks
+    already computed
+    :param filenames: iterable of paths of saved games
+    :param output_directory: string, directory of the metrics (created if needed)
+    :param metrics: iterable of Metrics (default to every metric)
+    :param nb_workers: int, number of worker processes (None or 1 to compute in the current process)
+    :param chunk_size: int, number of consecutive rounds computed by a task
+    :return: dictionary game filename -> path of its metrics
+    """
+    metrics = list(Metrics if metrics is None else metrics)
+    os.makedirs(output_directory, exist_ok=True)
+
+    outputs = get_output_filenames(output_directory, filenames)
+    # game filename -> chunk filenames, of the games to compute
+    chunks = {}
+    tasks = []
+    for filename, output_filename in list(outputs.items()):
+        os.makedirs(os.path.dirname(output_filename), exist_ok=True)
+        if _is_done(output_filename, metrics):
+            continue
+
+        # a pickle is only loaded here, its tasks receive their rounds
+        history = None if is_game_file(filename) else load_history(filename)
+        nb_rounds = get_nb_rounds(filename) if history is None else len(history)
+        if nb_rounds < 2:
+            del outputs[filename]
+            continue
+        chunks[filename] = []
+        for start in range(1, nb_rounds, max(int(chunk_size), 1)):
+            end = min(start + chunk_size, nb_rounds)
+            chunk_filename = _get_chunk_filename(output_filename, start, end)
+            chunks[filename].append(chunk_filename)
+            if not _is_done(chunk_filename, metrics):
+                rounds = None if history is None else _get_history_rounds(history, start, end)
+                tasks.append((filename, chunk_filename, start, end, metrics, rounds))
+
+    # number of chunks left for each game
+    remaining = {filename: 0 for filename in chunks}
+    for task in tasks:
+        remaining[task[0]] += 1
+    for filename, count in remaining.items():
+        if not count:
+            _merge_chunks(outputs[filename], chunks[filename])
+
+    def collect(results):
+        for filename, _ in results:
+            remaining[filename] -= 1
+            if not remaining[filename]:
+                _merge_chunks(outputs[filename], chunks[filename])
+
+    if not nb_workers or nb_workers < 2:
+        collect(map(_compute_chunk, tasks))
+    else:
+        with multiprocessing.Pool(nb_workers) as pool:
+            collect(pool.imap_unordered(_compute_chunk, tasks))
+
+    return outputs
+
+
+def _get_metric(name):
+    for metric in Metrics:
+        if name in (metric.name, metric.value):
+            return metric
+    raise Exception("Unknown metric %s" % name)
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description="Compute the metrics of the rounds of saved games")
+    parser.add_argument("games", nargs="+", help="saved games (pickles or binary game files)")
+    parser.add_argument("--output", default="metrics", help="directory of the metrics")
+    parser.add_argument("--metrics", nargs="+", default=None, help="metrics to compute (default to every metric)")
+    parser.add_argument("--workers", type=int, default=multiprocessing.cpu_count(), help="number of processes")
+    parser.add_argument("--chunk-size", type=int, default=64, help="number of rounds per task")
+    args = parser.parse_args()
+
+    metrics = None if args.metrics is None else [_get_metric(name) for name in args.metrics]
+    outputs = backfill(args.games, args.output, metrics, args.workers, args.chunk_size)
+    print("%s games, metrics in %s" % (len(outputs), args.output))
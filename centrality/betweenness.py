@@ -0,0 +1,298 @@
+"""
+Betweenness centrality engines used by the strategies. Nodes are expected to be labelled 0..nb_nodes-1, which is
+always the case in a game (see Game.initialize_graph).
+"""
+import numpy as np
+
+from .graph import to_array_graph
+
+# Two betweenness values closer than this are considered equal when comparing candidate actions
+TOLERANCE = 1e-12
+
+
+def _get_scale(nb_nodes, normalized):
+    """
+    Same rescaling as networkx for undirected graphs (dependencies are summed over ordered pairs)
+    """
+    if normalized:
+        return 1. / ((nb_nodes - 1) * (nb_nodes - 2)) if nb_nodes > 2 else 1.
+    return .5
+
+
+def node_betweenness_centrality(graph, node, nb_nodes=None, normalized=True):
+    """
+    Betweenness centrality of a single node, equal to nx.betweenness_centrality(graph)[node]. Sources in another
+    connected component than the node are skipped and only the dependency on the node is accumulated.
+    :param graph: ArrayGraph or nx.Graph, graph whose nodes are 0..nb_nodes-1
+    :param node: int, node
+    :param nb_nodes: int, number of nodes (default to the number of nodes of the graph)
+    :param normalized: boolean, same normalization as nx.betweenness_centrality
+    :return: float, betweenness centrality of the node
+    """
+    graph = to_array_graph(graph, nb_nodes, copy=False)
+    nb_nodes = graph.number_of_nodes()
+    if graph.degree(node) < 2:
+        # a leaf or an isolated node is never strictly inside a shortest path
+        return 0.
+
+    component = np.flatnonzero(graph.bitset_distances(node)[0] > 0)
+    res = 0.
+    batch_size = graph.get_batch_size()
+    for start in range(0, len(component), batch_size):
+        res += graph.target_dependencies(component[start:start + batch_size], node)[1].sum()
+
+    return res * _get_scale(nb_nodes, normalized)
+
+
+class DynamicBetweenness:
+    """
+    Betweenness centrality of an undirected graph that can be updated after a single edge insertion or deletion.
+
+    The distances and dependencies of every source are kept. Toggling the edge (u, v) can only modify the shortest
+    path DAG of the sources s for which dist(s, u) != dist(s, v), the other sources are left untouched. Only the
+    affected sources are recomputed, which makes "what if" evaluations of candidate edges much cheaper than
+    recomputing the betweenness from scratch.
+
+    When a node is given, the engine only tracks the dependencies of every source on that node (target mode), which
+    is all a strategy needs to evaluate its own betweenness.
+    """
+    def __init__(self, graph, nb_nodes=None, node=None, dependencies=None):
+        """
+        :param graph: ArrayGraph or nx.Graph, graph whose nodes are 0..nb_nodes-1 (copied)
+        :param nb_nodes: int, number of nodes (default to the number of nodes of the graph)
+        :param node: int, if given only the betweenness of this node is tracked
+        :param dependencies: tuple (distances, dependencies) of every source already computed on the graph (copied),
+        the dependencies being those on the tracked node in target mode (see RoundAnalysis.get_engine)
+        """
+        self._graph = to_array_graph(graph, nb_nodes)
+        nb_nodes = self._graph.number_of_nodes()
+
+        self._nb_nodes = nb_nodes
+        self._node = node
+        if dependencies is not None:
+            self._dist = np.array(dependencies[0], dtype=np.int32)
+            self._delta = np.array(dependencies[1], dtype=float)
+        else:
+            self._dist = np.full((nb_nodes, nb_nodes), -1, dtype=np.int32)
+            if node is None:
+                self._delta = np.zeros((nb_nodes, nb_nodes))
+            else:
+                self._delta = np.zeros(nb_nodes)
+
+            self._compute_sources(np.arange(nb_nodes))
+
+        self._betweenness = self._delta.sum(axis=0)
+
+        # distances with unreachable nodes at a distance larger than any path, built on demand for the bounds
+        self._bound_dist = None
+
+    @property
+    def nb_nodes(self):
+        return self._nb_nodes
+
+    @property
+    def node(self):
+        return self._node
+
+    def has_edge(self, u, v):
+        return self._graph.has_edge(u, v)
+
+    def _compute_sources(self, sources):
+        """
+        Recompute the distances and dependencies of the given sources, by batches
+        """
+        batch_size = self._graph.get_batch_size()
+        for start in range(0, len(sources), batch_size):
+            batch = sources[start:start + batch_size]
+            if self._node is None:
+                self._dist[batch], self._delta[batch] = self._graph.dependencies(batch)
+            else:
+                self._dist[batch], self._delta[batch] = self._graph.target_dependencies(batch, self._node)
+
+    def _check_node(self, node):
+        if self._node is not None and node != self._node:
+            raise Exception("The engine only tracks the betweenness of node %s" % self._node)
+
+    def betweenness(self, normalized=True):
+        """
+        :param normalized: boolean, same normalization as nx.betweenness_centrality
+        :return: dictionary node -> betweenness centrality
+        """
+        if self._node is not None:
+            raise Exception("The engine only tracks the betweenness of node %s" % self._node)
+
+        scale = _get_scale(self._nb_nodes, normalized)
+        return {node: value * scale for node, value in enumerate(self._betweenness)}
+
+    def node_betweenness(self, node=None, normalized=True):
+        """
+        :param node: int, node (default to the tracked node in target mode)
+        :param normalized: boolean, same normalization as nx.betweenness_centrality
+        :return: float, betweenness centrality of the node
+        """
+        if node is None:
+            node = self._node
+        self._check_node(node)
+
+        if self._node is not None:
+            return self._betweenness * _get_scale(self._nb_nodes, normalized)
+        return self._betweenness[node] * _get_scale(self._nb_nodes, normalized)
+
+    def affected_sources(self, u, v):
+        """
+        Sources whose shortest path DAG changes when the edge (u, v) is toggled. If u and v are at the same
+        distance from a source (or both unreachable), the edge can't be part of a shortest path from that source,
+        whether it is added or removed.
+        :return: array of source ids
+        """
+        return np.flatnonzero(self._dist[:, u] != self._dist[:, v])
+
+    def _get_target_sources(self, u, v, sources):
+        """
+        Among the affected sources, keep those connected to the tracked node before or after the toggle of (u, v),
+        the dependency of the other ones on the node is zero in both graphs
+        """
+        dist = self._dist[sources]
+        connected = dist[:, self._node] >= 0
+        if not self._graph.has_edge(u, v):
+            # (u, v) is being added, it may connect the component of the source to the one of the node
+            connected |= (dist[:, u] >= 0) & (self._dist[self._node, v] >= 0)
+            connected |= (dist[:, v] >= 0) & (self._dist[self._node, u] >= 0)
+        return sources[connected & (sources != self._node)]
+
+    def _toggle(self, u, v, sources):
+        """
+        Toggle the edge (u, v) and recompute the given sources
+        :return: tuple (previous distances, previous dependencies) of the sources
+        """
+        old_dist = self._dist[sources]
+        old_delta = self._delta[sources]
+
+        self._graph.toggle_edge(u, v)
+        self._compute_sources(sources)
+
+        return old_dist, old_delta
+
+    def toggle(self, u, v):
+        """
+        Add the edge (u, v) if it doesn't exist, remove it otherwise, and update the betweenness
+        :return: void
+        """
+        self._toggle(u, v, self.affected_sources(u, v))
+        self._betweenness = self._delta.sum(axis=0)
+        self._bound_dist = None
+
+    def what_if(self, u, v, node=None, normalized=True):
+        """
+        Betweenness centrality the graph would have if the edge (u, v) were toggled. The engine is left unchanged.
+        :param u: int, first end of the edge
+        :param v: int, second end of the edge
+        :param node: int, if given only the betweenness of this node is returned (always the case in target mode)
+        :param normalized: boolean, same normalization as nx.betweenness_centrality
+        :return: float if node is given, dictionary node -> betweenness centrality otherwise
+        """
+        if self._node is not None:
+            self._check_node(node if node is not None else self._node)
+            return self._target_what_if(u, v, normalized)
+
+        sources = self.affected_sources(u, v)
+        old_dist, old_delta = self._toggle(u, v, sources)
+
+        scale = _get_scale(self._nb_nodes, normalized)
+        if node is not None:
+            res = (self._betweenness[node] - old_delta[:, node].sum() + self._delta[sources, node].sum()) * scale
+        else:
+            new_betweenness = self._betweenness - old_delta.sum(axis=0) + self._delta[sources].sum(axis=0)
+            res = {i: value * scale for i, value in enumerate(new_betweenness)}
+
+        # roll back
+        self._graph.toggle_edge(u, v)
+        self._dist[sources] = old_dist
+        self._delta[sources] = old_delta
+
+        return res
+
+    def _get_node_degree(self, u, v):
+        """
+        :return: int, degree of the tracked node once the edge (u, v) is toggled
+        """
+        node_degree = self._graph.degree(self._node)
+        if self._node in (u, v):
+            node_degree += -1 if self._graph.has_edge(u, v) else 1
+        return node_degree
+
+    def _target_what_if(self, u, v, normalized):
+        if self._get_node_degree(u, v) < 2:
+            # a leaf or an isolated node is never strictly inside a shortest path
+            return 0.
+
+        sources = self._get_target_sources(u, v, self.affected_sources(u, v))
+        old_dist, old_delta = self._toggle(u, v, sources)
+
+        res = (self._betweenness - old_delta.sum() + self._delta[sources].sum()) * _get_scale(self._nb_nodes,
+                                                                                            normalized)
+
+        # roll back
+        self._graph.toggle_edge(u, v)
+        self._dist[sources] = old_dist
+        self._delta[sources] = old_delta
+
+        return res
+
+    def gain_upper_bound(self, u, v, normalized=True):
+        """
+        Cheap upper bound of the variation of the betweenness of the tracked node if the edge (u, v) were toggled,
+        computed from the stored distances without any traversal (target mode only).
+
+        Only the pairs (s, t) whose shortest paths go through the edge can change: dist(s, u) + 1 + dist(v, t) (or
+        the symmetric path) is equal to dist(s, t) for a removed edge, and at most dist(s, t) for an added one. Each of
+        those pairs adds at most 1 to the dependency of s, and the dependency of s can't exceed the size of the
+        component of the node minus 2. Sources that are not affected or never connected to the node don't change.
+        Distances to unreachable nodes are replaced by 2 * nb_nodes so that paths through them are never shorter.
+        :param u: int, first end of the edge
+        :param v: int, second end of the edge
+        :param normalized: boolean, same normalization as nx.betweenness_centrality
+        :return: float, upper bound of (betweenness after the toggle - current betweenness)
+        """
+        if self._node is None:
+            raise Exception("Gain upper bounds are only available in target mode")
+
+        scale = _get_scale(self._nb_nodes, normalized)
+        if self._get_node_degree(u, v) < 2:
+            return -self._betweenness * scale
+
+        sources = self._get_target_sources(u, v, self.affected_sources(u, v))
+        if not len(sources):
+            return 0.
+
+        if self._bound_dist is None:
+            self._bound_dist = np.where(self._dist < 0, 2 * self._nb_nodes, self._dist)
+        dist = self._bound_dist
+        unreachable = 2 * self._nb_nodes
+
+        # component of the node after the toggle
+        component = dist[self._node] < unreachable
+        if not self._graph.has_edge(u, v) and component[u] != component[v]:
+            component = component | (dist[v if component[u] else u] < unreachable)
+        component[self._node] = False
+
+        # length of the shortest paths from s to t through the edge in both directions, at least unreachable if there
+        # is none
+        via_uv = dist[sources, u][:, None] + 1 + dist[v][None, :]
+        via_vu = dist[sources, v][:, None] + 1 + dist[u][None, :]
+        via = np.minimum(via_uv, via_vu)
+        touched = (via <= dist[sources]) & (via < unreachable) & component[None, :]
+
+        if not self._graph.has_edge(u, v):
+            # an added edge only brings new shortest paths, the share of the paths going through the node can only
+            # grow if the node is on one of them, i.e. on a shortest path from s to the first end of the edge or from
+            # the second end to t
+            node_dist = dist[self._node]
+            on_uv = ((dist[sources, self._node] + node_dist[u] == dist[sources, u])[:, None] |
+                     (node_dist[v] + node_dist == dist[v])[None, :])
+            on_vu = ((dist[sources, self._node] + node_dist[v] == dist[sources, v])[:, None] |
+                     (node_dist[u] + node_dist == dist[u])[None, :])
+            touched &= ((via_uv == via) & on_uv) | ((via_vu == via) & on_vu)
+
+        bound = np.minimum(touched.sum(axis=1), component.sum() - 1 - self._delta[sources])
+        return bound.sum() * scale
@@ -0,0 +1,318 @@
+"""
+Compiled constraints on the edges of a game.
+"""
+import numpy as np
+
+
+def _normalize(u, v):
+    return (int(u), int(v)) if u < v else (int(v), int(u))
+
+
+class _EdgeBits:
+    """
+    Set of undirected edges stored as bitmask rows: only the nodes with at least one edge have a row (one bit per
+    node, packed in uint64 words), so the memory grows with the number of constrained nodes instead of N²
+    """
+    def __init__(self, nb_nodes):
+        self._nb_words = max((nb_nodes + 63) // 64, 1)
+        # node -> index of its row, -1 if the node has no edge
+        self._row_index = np.full(nb_nodes, -1, dtype=np.int64)
+        self._rows = np.zeros((0, self._nb_words), dtype=np.uint64)
+        self._nb_rows = 0
+
+    def _get_row(self, node):
+        if self._row_index[node] < 0:
+            if self._nb_rows == len(self._rows):
+                rows = np.zeros((max(2 * len(self._rows), 4), self._nb_words), dtype=np.uint64)
+                rows[:self._nb_rows] = self._rows[:self._nb_rows]
+                self._rows = rows
+            self._row_index[node] = self._nb_rows
+            self._nb_rows += 1
+        return self._rows[self._row_index[node]]
+
+    def add(self, u, v):
+        self._get_row(u)[v >> 6] |= np.uint64(1 << (v & 63))
+        self._get_row(v)[u >> 6] |= np.uint64(1 << (u & 63))
+
+    def add_all(self, node, mask):
+        """
+        :param node: int, node
+        :param mask: uint64 array of words, nodes to connect to node
+        """
+        self._get_row(node)[:] |= mask
+
+    def contains(self, u, v):
+        index = self._row_index[u]
+        return index >= 0 and bool(int(self._rows[index, v >> 6]) >> (v & 63) & 1)
+
+    def contains_all(self, us, vs):
+        """
+        :param us: int array of nodes
+        :param vs: int array of nodes
+        :return: boolean array, True for the edges (us[i], vs[i]) in the set
+        """
+        us, vs = np.asarray(us, dtype=np.int64), np.asarray(vs, dtype=np.int64)
+        index = self._row_index[us]
+        res = np.zeros(len(us), dtype=bool)
+        has_row = index >= 0
+        words = self._rows[index[has_row], vs[has_row] >> 6]
+        res[has_row] = (words >> (vs[has_row] & 63).astype(np.uint64)) & np.uint64(1) == 1
+        return res
+
+    def count(self, nodes):
+        """
+        :param nodes: int array of nodes
+        :return: int array, number of edges of each node
+        """
+        index = self._row_index[np.asarray(nodes, dtype=np.int64)]
+        res = np.zeros(len(index), dtype=np.int64)
+        has_row = index >= 0
+        res[has_row] = np.unpackbits(self._rows[index[has_row]].view(np.uint8), axis=1).sum(axis=1)
+        return res
+
+    def get_words(self, node):
+        """
+        :return: uint64 array of words of the row of node (zeros if the node has no edge)
+        """
+        index = self._row_index[node]
+        return self._rows[index] if index >= 0 else np.zeros(self._nb_words, dtype=np.uint64)
+
+
+def _get_mask(nb_nodes, nodes):
+    """
+    :return: uint64 array of words with the bits of the nodes set
+    """
+    bits = np.zeros(max((nb_nodes + 63) // 64, 1) * 64, dtype=bool)
+    bits[list(nodes)] = True
+    return np.packbits(bits, bitorder="little").view(np.uint64)
+
+
+def _unpack(words, nb_nodes):
+    """
+    :return: boolean array of the first nb_nodes bits of the words
+    """
+    return np.unpackbits(words.view(np.uint8), bitorder="little")[:nb_nodes].astype(bool)
+
+
+class ConstraintIndex:
+    """
+    Constraints on the edges of a game: impossible edges are never added, imposed edges are never removed, nodes of
+    banned groups are never connected and a node never exceeds its degree cap. The edges are undirected, (u, v) and
+    (v, u) are the same edge.
+
+    Every constraint is compiled into bitmask rows, so checking an edge is O(1), and the candidate actions of the
+    strategies are generated lazily, row by row (see iter_candidates), without building the set of the N(N-1)/2
+    pairs.
+    """
+    def __init__(self, nb_nodes, impossible_edges=(), imposed_edges=()):
+        """
+        :param nb_nodes: int, number of nodes
+        :param impossible_edges: iterable of edges that can't be added
+        :param imposed_edges: iterable of edges that can't be removed
+        """
+        self._nb_nodes = nb_nodes
+        self._impossible = _EdgeBits(nb_nodes)
+        self._imposed = _EdgeBits(nb_nodes)
+        self._impossible_edges = set()
+        self._imposed_edges = set()
+        self._banned_groups = []
+        # node -> maximum degree
+        self._degree_caps = {}
+
+        self.add_impossible_edges(impossible_edges)
+        self.add_imposed_edges(imposed_edges)
+
+    @property
+    def nb_nodes(self):
+        return self._nb_nodes
+
+    @property
+    def impossible_edges(self):
+        """
+        [(u, v)] with u < v, impossible edges given one by one (the banned groups are not expanded)
+        """
+        return sorted(self._impossible_edges)
+
+    @property
+    def imposed_edges(self):
+        """
+        [(u, v)] with u < v, imposed edges
+        """
+        return sorted(self._imposed_edges)
+
+    @property
+    def banned_groups(self):
+        """
+        [(group, other group)], other group being None for the bans within a group
+        """
+        return list(self._banned_groups)
+
+    @property
+    def degree_caps(self):
+        """
+        dictionary node -> maximum degree
+        """
+        return dict(self._degree_caps)
+
+    """
+    Compilation of the constraints
+    """
+    def add_impossible_edges(self, edges):
+        for u, v in edges:
+            if u != v:
+                self._impossible.add(int(u), int(v))
+                self._impossible_edges.add(_normalize(u, v))
+
+    def add_imposed_edges(self, edges):
+        for u, v in edges:
+            if u != v:
+                self._imposed.add(int(u), int(v))
+                self._imposed_edges.add(_normalize(u, v))
+
+    def ban_groups(self, group, other_group=None):
+        """
+        Make every edge between two groups of nodes impossible
+        :param group: iterable of nodes
+        :param other_group: iterable of nodes, if None the edges within group are banned
+        :return: void
+        """
+        group = sorted(set(int(node) for node in group))
+        other_group = group if other_group is None else sorted(set(int(node) for node in other_group))
+        self._banned_groups.append((group, None if other_group is group else other_group))
+
+        group_mask, other_mask = _get_mask(self._nb_nodes, group), _get_mask(self._nb_nodes, other_group)
+        for node in group:
+            self._impossible.add_all(node, other_mask)
+        for node in other_group:
+            self._impossible.add_all(node, group_mask)
+        # no self loop in the rows
+        for node in set(group) & set(other_group):
+            self._impossible.get_words(node)[node >> 6] &= ~np.uint64(1 << (node & 63))
+
+    def set_degree_cap(self, node, cap):
+        """
+        :param node: int, node
+        :param cap: int, maximum degree of the node (None to remove the cap)
+        :return: void
+        """
+        if cap is None:
+            self._degree_caps.pop(int(node), None)
+        else:
+            self._degree_caps[int(node)] = int(cap)
+
+    """
+    Checks, O(1) per edge
+    """
+    def is_impossible(self, u, v):
+        return self._impossible.contains(u, v)
+
+    def is_imposed(self, u, v):
+        return self._imposed.contains(u, v)
+
+    def is_capped(self, graph, node):
+        """
+        :return: boolean, True if the node reached its degree cap in the graph
+        """
+        cap = self._degree_caps.get(node)
+        return cap is not None and graph.degree(node) >= cap
+
+    def can_add(self, graph, u, v):
+        """
+        :param graph: ArrayGraph, current state
+        :return: boolean, True if the edge (u, v) can be added to the graph
+        """
+        return u != v and not self.is_impossible(u, v) and not self.is_capped(graph, u) and \
+            not self.is_capped(graph, v)
+
+    def can_remove(self, u, v):
+        return not self.is_imposed(u, v)
+
+    def are_impossible(self, us, vs):
+        """
+        :param us: int array of nodes
+        :param vs: int array of nodes
+        :return: boolean array, True for the impossible edges (us[i], vs[i])
+        """
+        return self._impossible.contains_all(us, vs)
+
+    def are_imposed(self, us, vs):
+        """
+        :param us: int array of nodes
+        :param vs: int array of nodes
+        :return: boolean array, True for the imposed edges (us[i], vs[i])
+        """
+        return self._imposed.contains_all(us, vs)
+
+    def count_impossible(self, nodes):
+        """
+        :param nodes: int array of nodes
+        :return: int array, number of nodes that can't be connected to each node (not counting the node itself)
+        """
+        return self._impossible.count(nodes)
+
+    def get_impossible_row(self, node):
+        """
+        :return: boolean array, True for the nodes that can't be connected to node (including node itself)
+        """
+        row = _unpack(self._impossible.get_words(node), self._nb_nodes)
+        row[node] = True
+        return row
+
+    def get_capped_nodes(self, graph):
+        """
+        :return: boolean array, True for the nodes that reached their degree cap in the graph
+        """
+        capped = np.zeros(self._nb_nodes, dtype=bool)
+        for node, cap in self._degree_caps.items():
+            capped[node] = graph.degree(node) >= cap
+        return capped
+
+    """
+    Candidate actions
+    """
+    def _get_partners(self, node, graph, capped):
+        """
+        :return: sorted int array of the nodes v such that toggling (node, v) is allowed: neither imposed nor
+        impossible, and not exceeding a degree cap if the toggle adds the edge
+        """
+        excluded = self.get_impossible_row(node) | _unpack(self._imposed.get_words(node), self._nb_nodes)
+        if capped is not None and capped.any():
+            connected = np.zeros(self._nb_nodes, dtype=bool)
+            connected[graph.neighbors(node)] = True
+            excluded |= ~connected & (capped | capped[node])
+        return np.flatnonzero(~excluded)
+
+    def iter_candidates(self, graph=None, node=None, block_size=1 << 16):
+        """
+        Candidate actions of a strategy, generated lazily by blocks of rows in increasing order of (u, v), so that a
+        strategy scanning them never holds the N(N-1)/2 pairs at once
+        :param graph: ArrayGraph, current state, needed to apply the degree caps
+        :param node: int, if given only the edges of that node are generated
+        :param block_size: int, minimum number of edges of a block (but the last one)
+        :return: generator of (nb_candidates, 2) int32 arrays of the edges (u, v) with u < v that are neither
+        impossible nor imposed (and that can be added without exceeding a degree cap if graph is given)
+        """
+        capped = None if graph is None or not self._degree_caps else self.get_capped_nodes(graph)
+        if node is not None:
+            partners = self._get_partners(node, graph, capped)
+            yield np.column_stack((np.minimum(partners, node), np.maximum(partners, node))).astype(np.int32)
+            return
+
+        blocks, size = [], 0
+        for u in range(self._nb_nodes):
+            partners = self._get_partners(u, graph, capped)
+            partners = partners[partners > u]
+            blocks.append(np.column_stack((np.full(len(partners), u), partners)).astype(np.int32))
+            size += len(partners)
+            if size >= block_size:
+                yield np.concatenate(blocks)
+                blocks, size = [], 0
+        if size:
+            yield np.concatenate(blocks)
+
+    def get_candidates(self, graph=None, node=None):
+        """
+        Same edges as iter_candidates, in a single array
+        :return: (nb_candidates, 2) int32 array
+        """
+        return np.concatenate([np.zeros((0, 2), dtype=np.int32)] + list(self.iter_candidates(graph, node)))
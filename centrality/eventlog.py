@@ -0,0 +1,184 @@
+"""
+Append-only event log of a game (NDJSON, one event per line), written round by round by EventLogObserver so that a
+game survives the death of its process: resume_game rebuilds the game from the log and the game goes on from its
+current step.
+
+Events:
+    start   metadata of the game (see Game.get_metadata), master seed, edges and step of the initial state, states of
+            the random generators
+    round   step, actions returned by Game.get_actions, edges toggled by Game.update_env, states of the random
+            generators at the end of the round
+    end     step of the last round
+
+Every line is flushed as soon as it is written and a line is only read once complete, so other processes can read or
+follow (see follow_events) the log of a running game without interfering with it.
+"""
+import json
+import os
+import time
+
+from .game import Game
+from .graph import ArrayGraph
+from .observer import GameObserver
+
+
+def _get_rng_states(game):
+    return {"game": game.rng.bit_generator.state,
+            "players": {str(node_id): player.rng.bit_generator.state for node_id, player in game.players.items()}}
+
+
+def _set_rng_states(game, states):
+    game.rng.bit_generator.state = states["game"]
+    for node_id, state in states["players"].items():
+        game.players[int(node_id)].rng.bit_generator.state = state
+
+
+def _to_lists(edges):
+    return sorted([int(u), int(v)] for u, v in edges)
+
+
+class EventLogObserver(GameObserver):
+    """
+    Append the events of the game to an event log
+    """
+    def __init__(self, filename, fsync=False, resumed=False):
+        """
+        :param filename: string, path of the log, replaced by the log of a new game
+        :param fsync: boolean, force every event to disk (slower, but survives a crash of the machine)
+        :param resumed: boolean, True if the game has been resumed from the log (see resume_game), the events of the
+        next rounds are then appended to it
+        """
+        self._filename = filename
+        self._fsync = fsync
+        # True once the log holds the start event of the game
+        self._started = resumed
+        self._handle = None
+
+    def _write(self, event):
+        if self._handle is None:
+            self._handle = open(self._filename, "a")
+        self._handle.write(json.dumps(event) + "\n")
+        self._handle.flush()
+        if self._fsync:
+            os.fsync(self._handle.fileno())
+
+    def on_game_start(self, game):
+        if self._started:
+            # resumed game, the log already starts with the initial state
+            return
+        # a new game never appends to the log of another one
+        self._handle = open(self._filename, "w")
+        self._started = True
+        self._write({"event": "start",
+                     "metadata": game.get_metadata(),
+                     "seed": game._seed,
+                     "step": game.current_step,
+                     "edges": _to_lists(game.graph.edges()),
+                     "rng": _get_rng_states(game)})
+
+    def on_round_end(self, game):
+        self._write({"event": "round",
+                     "step": game.current_step,
+                     "actions": _to_lists(game.last_actions or []),
+                     "toggles": _to_lists(game.history.get_toggles(-1).tolist()),
+                     "rng": _get_rng_states(game)})
+
+    def on_game_end(self, game):
+        self._write({"event": "end", "step": game.current_step})
+        self._handle.close()
+        self._handle = None
+
+
+def _read_lines(handle):
+    """
+    :return: generator of the events of the complete lines, from the current position of the handle (left at the end
+    of the last complete line)
+    """
+    while True:
+        position = handle.tell()
+        line = handle.readline()
+        if not line.endswith("\n"):
+            # incomplete line, being written or cut by the death of the process
+            handle.seek(position)
+            return
+        if line.strip():
+            yield json.loads(line)
+
+
+def read_events(filename):
+    """
+    :param filename: string, path of an event log
+    :return: list of the events of the complete lines of the log
+    """
+    with open(filename) as handle:
+        return list(_read_lines(handle))
+
+
+def follow_events(filename, poll_interval=0.5, timeout=None):
+    """
+    Read the events of a log as they are appended (like tail -f), the log is only read
+    :param filename: string, path of an event log
+    :param poll_interval: float, seconds between two reads once the end of the log is reached
+    :param timeout: float, stop after that many seconds without new event (default to never, a game end always stops)
+    :return: generator of the events
+    """
+    while not os.path.exists(filename):
+        time.sleep(poll_interval)
+
+    with open(filename) as handle:
+        last_event = time.time()
+        while True:
+            for event in _read_lines(handle):
+                last_event = time.time()
+                yield event
+                if event["event"] == "end":
+                    return
+            if timeout is not None and time.time() - last_event > timeout:
+                return
+            time.sleep(poll_interval)
+
+
+def resume_game(filename, headless=False, fsync=False):
+    """
+    Rebuild a game from its event log: rules, players, history, graph, current step and random generators as they
+    were at the end of the last logged round, so the next rounds are the same as if the game had never stopped. The
+    game appends the events of the next rounds to the same log
+    :param filename: string, path of an event log
+    :param headless: boolean, the game doesn't print nor plot the next rounds (see Game.headless)
+    :param fsync: boolean, force every new event to disk
+    :return: Game, ready to go on with play_game
+    """
+    events = read_events(filename)
+    if not events or events[0]["event"] != "start":
+        raise Exception("%s is not an event log" % filename)
+    start = events[0]
+
+    game = Game()
+    game.headless = headless
+    game.set_metadata(start["metadata"])
+    if start["seed"] is not None:
+        game.set_seed(start["seed"])
+    game.graph = ArrayGraph.from_edges(game.rules.nb_players, [tuple(edge) for edge in start["edges"]])
+    game.initialize_graph()
+    game.current_step = start["step"]
+    _set_rng_states(game, start["rng"])
+
+    for event in events[1:]:
+        if event["event"] != "round":
+            continue
+        # replayed as the actions of the round (removals first, then additions in increasing order, as
+        # Game.update_env applied them), so the neighbors are stored in the same order as in the uninterrupted game
+        game.graph.apply_actions(event["toggles"])
+        game.history.append(game.graph)
+        game.current_step = event["step"]
+        game.last_actions = set(map(tuple, event["actions"]))
+        _set_rng_states(game, event["rng"])
+    game._analysis = None
+
+    # the truncated line of a process killed while writing would corrupt the next event
+    with open(filename, "rb+") as handle:
+        data = handle.read()
+        handle.truncate(len(data) - len(data.rsplit(b"\n", 1)[-1]))
+
+    game.observers.append(EventLogObserver(filename, fsync, resumed=True))
+    return game
@@ -1,115 +1,214 @@
 from .rules import Rules
 from .player import Player
-from .plot import Plotter
+from .entity import EntityType
+from .strategy import Strategy
+from .observer import AsyncMetricsObserver, MetricsObserver, PlotObserver, PrintObserver
+from .analysis import RoundAnalysis
+from .constraints import ConstraintIndex
+from .graph import ArrayGraph, BitsetGraph
+from .history import GameHistory, _get_edge_keys
+from .gamefile import GameFile, is_game_file, write_game_file
+from .metrics import Metrics
 
 import pickle
-import networkx as nx
-import pandas as pd
-
-
-from enum import Enum
-
-
-class Metrics(Enum):
-    # warning round_number > 0
-    macro_degree_assortativity_coefficient = "macro_degree_assortativity_coefficient"
-    # macro_rich_club_coefficient = "macro_rich_club_coefficient"
-
-    macro_transitivity = "macro_transitivity"
-    macro_average_clustering = "macro_average_clustering"
-    macro_is_connected = "macro_is_connected"
-    macro_number_connected_components = "macro_number_connected_components"
-    macro_is_distance_regular = "macro_is_distance_regular"
-    macro_dominating_set = "macro_dominating_set"
-    macro_is_eulerian = "macro_is_eulerian"
-    macro_isolates = "macro_isolates"
-
-    # warning is_connected
-    macro_diameter = "macro_diameter"
-    macro_center = "macro_center"
-    macro_periphery = "macro_periphery"
-    macro_radius = "macro_radius"
-    macro_average_shortest_path_length = "macro_average_shortest_path_length"
-    micro_eccentricity = "micro_eccentricity"
-
-    micro_average_neighbor_degree = "micro_average_neighbor_degree"
-    micro_clustering = "micro_clustering"
-    micro_degree_centrality = "micro_degree_centrality"
-    micro_closeness_centrality = "micro_closeness_centrality"
-    micro_communicability_centrality = "micro_communicability_centrality"
-    micro_load_centrality = "micro_load_centrality"
-    micro_betweenness_centrality = "micro_betweenness_centrality"
-    micro_triangles = "micro_triangles"
-    micro_square_clustering = "micro_square_clustering"
-    micro_core_number = "micro_core_number"
-    micro_closeness_vitality = "micro_closeness_vitality"
-
-
-def _get_column_names():
-    return [metric.value for metric in Metrics]
-
-
-def _get_metrics(graph):
-    res = []
-
-    # macro
-    if len(graph.edges()) is not 0:
-        res.append(nx.degree_assortativity_coefficient(graph))
-        # res.append(nx.rich_club_coefficient(graph))
-    else:
-        res.append(None)
-        res.append(None)
-
-    res.append(nx.transitivity(graph))
-    res.append(nx.average_clustering(graph))
-    res.append(nx.is_connected(graph))
-    res.append(nx.number_connected_components(graph))
-    res.append(nx.is_distance_regular(graph))
-    res.append(nx.dominating_set(graph))
-    res.append(nx.is_eulerian(graph))
-    res.append(nx.isolates(graph))
-
-    if nx.is_connected(graph):
-        res.append(nx.diameter(graph))
-        res.append(nx.center(graph))
-        res.append(nx.periphery(graph))
-        res.append(nx.radius(graph))
-        res.append(nx.average_shortest_path_length(graph))
-        res.append(nx.eccentricity(graph))
-    else:
-        res.append(None)
-        res.append(None)
-        res.append(None)
-        res.append(None)
-        res.append(None)
-        res.append(None)
-
-    # micro
-    res.append(nx.average_neighbor_degree(graph))
-    res.append(nx.clustering(graph))
-    res.append(nx.degree_centrality(graph))
-    res.append(nx.closeness_centrality(graph))
-    res.append(nx.communicability_centrality(graph))
-    res.append(nx.load_centrality(graph))
-    res.append(nx.betweenness_centrality(graph))
-    res.append(nx.triangles(graph))
-    res.append(nx.square_clustering(graph))
-    res.append(nx.core_number(graph))
-    res.append(nx.closeness_vitality(graph))
+from collections import namedtuple
+import numpy as np
+
+
+class RoundSnapshot(namedtuple("RoundSnapshot", ["step", "actions", "toggles", "betweenness"])):
+    """
+    Immutable summary of a round yielded by Game.iter_rounds:
+    step        int, number of the round (game.current_step at its end)
+    actions     frozenset of the actions (u, v) of the players
+    toggles     read only (nb_toggles, 2) int array, edges added or removed by the round
+    betweenness read only array of the betweenness of the nodes at the end of the round, None if not asked for
+    """
+    __slots__ = ()
+
+
+def _read_only(array):
+    view = array.view()
+    view.flags.writeable = False
+    return view
+
+
+class _EdgeList(list):
+    """
+    List of edges calling on_change after every modification, so that the game recompiles its constraints (see
+    Game.constraints) when its impossible or imposed edges are modified in place
+    """
+    def __init__(self, edges, on_change):
+        super().__init__(edges)
+        self._on_change = on_change
+
+    def __reduce__(self):
+        return list, (list(self),)
+
+
+def _notify(name):
+    method = getattr(list, name)
+
+    def modify(self, *args):
+        res = method(self, *args)
+        self._on_change()
+        return self if name in ("__iadd__", "__imul__") else res
+    modify.__name__ = name
+    return modify
 
-    return res
+
+for _name in ("append", "extend", "insert", "remove", "pop", "clear", "sort", "reverse", "__setitem__",
+              "__delitem__", "__iadd__", "__imul__"):
+    setattr(_EdgeList, _name, _notify(_name))
+del _name
 
 
 class Game:
     def __init__(self):
         self.rules = Rules()
-        self.graph = nx.Graph()
+        # state stored as packed adjacency bit rows (see dense_state)
+        self._dense_state = False
+        self.graph = ArrayGraph()
         self.players = {}
         self.current_step = 0
-        self.history = {}
+        self.history = GameHistory()
+        # constraints on the edges, compiled into self.constraints when first needed and recompiled after a change
         self.impossible_edges = []
         self.imposed_edges = []
+        self._banned_groups = []
+        self._degree_caps = {}
+        self._constraints = None
         self.metrics = None
+        # actions of the last round (see get_actions)
+        self.last_actions = None
+        # analysis of the current graph shared by the players, built on demand and dropped when the graph changes
+        self._analysis = None
+        # a headless game doesn't print nor plot its rounds, and never imports matplotlib
+        self.headless = False
+        # number of worker processes computing the metrics in background (see observer.AsyncMetricsObserver), None to
+        # compute them at the end of each round
+        self.metrics_workers = None
+        # additional observers notified of the progress of the game (see observer.GameObserver)
+        self.observers = []
+        # go through the rounds of a cycle of states without asking the players (see play_round)
+        self.fast_forward = False
+        # (first round, length) of the cycle of states the game entered, None if no state repeated
+        self.cycle = None
+        # state hash -> round of the states since the last change of the graph outside of play_round
+        self._states = {}
+        # master seed of the random streams of the game and of the players (None for unseeded streams)
+        self._seed = None
+        # random stream of the game, used by the batched strategies
+        self.rng = np.random.default_rng()
+
+    @property
+    def analysis(self):
+        """
+        :return: RoundAnalysis of the current graph
+        """
+        if self._analysis is None:
+            self._analysis = RoundAnalysis(self.graph)
+        return self._analysis
+
+    @property
+    def graph(self):
+        return self._graph
+
+    @graph.setter
+    def graph(self, graph):
+        if self._dense_state and not isinstance(graph, BitsetGraph):
+            graph = BitsetGraph.from_graph(graph)
+        elif not self._dense_state and isinstance(graph, BitsetGraph):
+            graph = ArrayGraph.from_edges(graph.number_of_nodes(), graph.edge_array())
+        self._graph = graph
+
+    @property
+    def dense_state(self):
+        """
+        True if the state is a BitsetGraph: the actions of a round are applied at once and copies of the state are
+        cheap, at the cost of N²/8 bytes whatever the number of edges (worth it for dense games with many active
+        players), False for an ArrayGraph
+        """
+        return self._dense_state
+
+    @dense_state.setter
+    def dense_state(self, dense_state):
+        self._dense_state = bool(dense_state)
+        self.graph = self._graph
+        self._analysis = None
+
+    @property
+    def impossible_edges(self):
+        return self._impossible_edges
+
+    @impossible_edges.setter
+    def impossible_edges(self, edges):
+        self._impossible_edges = _EdgeList(edges, self._reset_constraints)
+        self._constraints = None
+
+    @property
+    def imposed_edges(self):
+        return self._imposed_edges
+
+    @imposed_edges.setter
+    def imposed_edges(self, edges):
+        self._imposed_edges = _EdgeList(edges, self._reset_constraints)
+        self._constraints = None
+
+    def _reset_constraints(self):
+        self._constraints = None
+
+    def ban_groups(self, group, other_group=None):
+        """
+        Make every edge between two groups of nodes impossible
+        :param group: iterable of node ids
+        :param other_group: iterable of node ids, if None the edges within group are banned
+        :return: void
+        """
+        self._banned_groups.append((sorted(group), None if other_group is None else sorted(other_group)))
+        self._constraints = None
+
+    def set_degree_cap(self, node_id, cap):
+        """
+        :param node_id: int, id of the node
+        :param cap: int, maximum degree of the node, no edge of the node is added beyond it (None to remove the cap)
+        :return: void
+        """
+        if cap is None:
+            self._degree_caps.pop(node_id, None)
+        else:
+            self._degree_caps[node_id] = cap
+        self._constraints = None
+
+    @property
+    def constraints(self):
+        """
+        :return: ConstraintIndex, compiled impossible and imposed edges, group bans and degree caps of the game
+        """
+        if self._constraints is None or self._constraints.nb_nodes != self.rules.nb_players:
+            constraints = ConstraintIndex(self.rules.nb_players, self._impossible_edges, self._imposed_edges)
+            for group, other_group in self._banned_groups:
+                constraints.ban_groups(group, other_group)
+            for node_id, cap in self._degree_caps.items():
+                constraints.set_degree_cap(node_id, cap)
+            self._constraints = constraints
+        return self._constraints
+
+    def set_seed(self, seed):
+        """
+        Derive the random streams of the game and of every player (current and future ones) from a master seed. The
+        stream of a player only depends on the master seed and its node id, so a game is reproducible whatever the
+        order in which the players are added or the process it runs in.
+        :param seed: int, master seed
+        :return: void
+        """
+        self._seed = seed
+        self.rng = np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(0,)))
+        for player in self.players.values():
+            self._seed_player(player)
+
+    def _seed_player(self, player):
+        if self._seed is not None:
+            player.seed(np.random.SeedSequence(self._seed, spawn_key=(1, player.node_id)))
 
     def initialize_graph(self):
         """
@@ -118,7 +217,10 @@ class Game:
         :return: void
         """
         self.graph.add_nodes_from(list(range(self.rules.nb_players)))
-        self.history[0] = self.graph.edges()
+        self._analysis = None
+        self._reset_states()
+        if not len(self.history):
+            self.history.append(self.graph)
 
         while len(self.players) < self.rules.nb_players:
             temp_non_competitive_player = Player(name="NC" + str(len(self.players)))
@@ -135,16 +237,27 @@ class Game:
                 node_id = len(self.players)
             self.players[node_id] = player
             player.node_id = node_id
+            self._seed_player(player)
         else:
             raise Exception("There are already too many players")
 
     def get_actions(self):
         """
-        Returns the actions for each player's embedded strategy
+        Returns the actions for each player's embedded strategy. Inactive players are skipped, and the players whose
+        strategy has a batched version are asked all at once, one call per strategy type
         """
         modified_edges = set()
+        batches = {}
 
         for node_id, player in self.players.items():
+            if player.is_inactive():
+                continue
+
+            if player.batch_strategy is not None:
+                batch_strategy, node_ids = batches.setdefault(player.strategy_type, (player.batch_strategy, []))
+                node_ids.append(player.node_id)
+                continue
+
             modified_edge = player.get_action(self, player.node_id)
             if modified_edge is not None:
                 u, v= modified_edge
@@ -152,8 +265,13 @@ class Game:
                     modified_edge=(v,u)
                     
                 modified_edges.add(modified_edge)
-            
-            
+
+        for batch_strategy, node_ids in batches.values():
+            edges = batch_strategy(self.rules.nb_players, np.array(node_ids), self.history, self.impossible_edges,
+                                   self.imposed_edges, analysis=self.analysis, rng=self.rng,
+                                   constraints=self.constraints)
+            edges = np.sort(edges, axis=1)
+            modified_edges.update(map(tuple, edges[edges[:, 0] != edges[:, 1]].tolist()))
 
         return modified_edges
 
@@ -161,50 +279,140 @@ class Game:
         """
         Mutates the state of the environment (i.e. the graph) based on the actions performed by the players
         """
-        for edge in actions:
-            u, v = edge
-            if not self.graph.has_edge(*edge) and edge not in self.impossible_edges:
-                self.graph.add_edge(u, v)
-            elif self.graph.has_edge(*edge) and edge not in self.imposed_edges:
-                self.graph.remove_edge(u, v)
+        # looping edges are not allowed in the game, they are ignored (see ArrayGraph.apply_actions)
+        self.graph.apply_actions(actions, self.constraints)
+
+        self._analysis = None
 
-    def play_round(self, actions=False, metrics=False):
+    def get_observers(self, metrics=False):
+        """
+        :param metrics: boolean or iterable of Metrics, collect the metrics (every metric if True) of every round in
+        self.metrics, in background if self.metrics_workers is set
+        :return: [GameObserver], printing and plotting observers unless the game is headless, followed by the metrics
+        observer and the additional observers
+        """
+        observers = [] if self.headless else [PrintObserver(), PlotObserver()]
+        if metrics:
+            metrics = None if metrics is True else metrics
+            if self.metrics_workers:
+                observers.append(AsyncMetricsObserver(metrics, self.metrics_workers))
+            else:
+                observers.append(MetricsObserver(metrics))
+        return observers + list(self.observers)
+
+    def _reset_states(self):
+        self._states = {}
+        self.cycle = None
+
+    def _is_deterministic(self, start, end):
+        """
+        :return: boolean, True if the states following the rounds start..end-1 only depend on them (the greedy
+        strategy draws its move on an empty graph)
+        """
+        if not all(player.is_deterministic() for player in self.players.values()):
+            return False
+        cursor = self.history.cursor(start)
+        return all(cursor.seek(round_number).number_of_edges() for round_number in range(start, end))
+
+    def _find_cycle(self):
+        """
+        Record the current state, and the cycle it closes if it has already been seen and the players are
+        deterministic: the game will then go through the same states again and again
+        """
+        round_number = len(self.history) - 1
+        seen = self._states.get(self.graph.state_hash())
+        if seen is None:
+            self._states[self.graph.state_hash()] = round_number
+            return
+
+        # the hashes may collide, the states are compared
+        same_state = np.array_equal(_get_edge_keys(self.rules.nb_players, self.history.get_edges(seen)),
+                                    _get_edge_keys(self.rules.nb_players, self.graph.edge_array()))
+        if same_state and self._is_deterministic(seen, round_number):
+            self.cycle = (seen, round_number - seen)
+
+    def _get_cycle_actions(self):
+        """
+        :return: set of the edges toggled by the next round, which are those of the same round of the cycle
+        """
+        start, length = self.cycle
+        round_number = start + (len(self.history) - 1 - start) % length
+        return set(map(tuple, self.history.get_toggles(round_number + 1).tolist()))
+
+    def play_round(self, actions=False, metrics=False, observers=None):
         """
         Play one round of the game. For now, if two players are acting on the same edge, the logical OR component
         is adopted (meaning if two players want to destroy the same edge, it will get destroyed).
         No notion of edge strength and cumulative nodes strength yet
+
+        The states are hashed (see ArrayGraph.state_hash), so that a state repeated while the players only depend on
+        the state is detected (see self.cycle). The game then goes round the same cycle until its end, and if
+        self.fast_forward is set the rounds of the cycle are replayed from the history without asking the players:
+        their actions are the edges toggled by the round.
+        :param actions: set of edges, actions of the players (default to asking the players)
+        :param observers: [GameObserver], observers to notify at the end of the round (default to get_observers)
         :return: void
         """
-        if not actions:
+        if observers is None:
+            observers = self.get_observers(metrics)
+
+        if actions:
+            # the following states don't only depend on the current one
+            self._reset_states()
+        elif self.cycle is not None and self.fast_forward:
+            actions = self._get_cycle_actions()
+        else:
+            if not self._states and len(self.history):
+                self._states[self.graph.state_hash()] = len(self.history) - 1
             actions = self.get_actions()
+        self.last_actions = actions
 
         self.update_env(actions)
 
         self.current_step += 1
 
-        self.history[self.current_step] = self.graph.edges()
-        
-        print("The game at state %s:" %self.current_step)
-        plotter = Plotter()
-        plotter.plot_state(self)
+        self.history.append(self.graph)
+        if self.cycle is None:
+            self._find_cycle()
 
-        if metrics:
-            self.metrics.loc[len(self.metrics)] = _get_metrics(self.graph)
+        for observer in observers:
+            observer.on_round_end(self)
+
+    def iter_rounds(self, metrics=False, betweenness=False):
+        """
+        Play the game round by round, yielding after each round so that the caller consumes the rounds as they are
+        played and can stop the game early (closing the generator). The observers are notified as in play_game, except
+        on_game_end which is only called if the game reaches its last round
+        :param metrics: boolean or iterable of Metrics, collect the metrics (every metric if True) of every round in
+        self.metrics
+        :param betweenness: boolean, add the betweenness of the nodes to the snapshots (computed by the analysis of the
+        round, which the players of the next round reuse)
+        :return: generator of RoundSnapshot
+        """
+        observers = self.get_observers(metrics)
+
+        for observer in observers:
+            observer.on_game_start(self)
+
+        while self.current_step < self.rules.nb_max_step:
+            self.play_round(observers=observers)
+            yield RoundSnapshot(self.current_step,
+                                frozenset(self.last_actions),
+                                _read_only(self.history.get_toggles(-1)),
+                                _read_only(self.analysis.betweenness()) if betweenness else None)
+
+        for observer in observers:
+            observer.on_game_end(self)
 
     def play_game(self, metrics=False):
         """
         Play the entire game according to the given rules (total number of steps in a game)
+        :param metrics: boolean or iterable of Metrics, collect the metrics (every metric if True) of every round in
+        self.metrics
         :return: void
         """
-        print("Here is the initial state of the game")
-        plotter = Plotter()
-        plotter.plot_state(self)
-        
-        if metrics:
-            self.metrics = pd.DataFrame(columns=_get_column_names())
-
-        while self.current_step < self.rules.nb_max_step:
-            self.play_round(metrics=metrics)
+        for _ in self.iter_rounds(metrics):
+            pass
 
     def save(self, filename="history.pickle"):
         # http://stackoverflow.com/questions/11218477/how-can-i-use-pickle-to-save-a-dict
@@ -217,11 +425,78 @@ class Game:
         with open(filename, 'wb') as handle:
             pickle.dump(game_state, handle, protocol=pickle.HIGHEST_PROTOCOL)
 
+    def save_binary(self, filename="history.cgam", betweenness=False):
+        """
+        Save the game in the binary format of gamefile, which can be opened without reading the whole file
+        :param filename: string, path of the file
+        :param betweenness: boolean, also store the betweenness of every node at every round
+        :return: void
+        """
+        metadata = self.get_metadata()
+
+        values = None
+        if betweenness:
+            cursor = self.history.cursor()
+            values = [cursor.seek(round_number).betweenness_centrality() for round_number in range(len(self.history))]
+
+        write_game_file(filename, self.history, metadata, self.current_step, values)
+
+    def get_metadata(self):
+        """
+        :return: dictionary, JSON serializable description of the game: rules, players, constraints on the edges
+        """
+        return {
+            "rules": vars(self.rules),
+            "players": [{"node_id": player.node_id,
+                         "name": player.name,
+                         "type": player.type.name,
+                         "strategy_type": player.strategy_type.value,
+                         "picture": player.picture} for player in self.players.values()],
+            "impossible_edges": [list(edge) for edge in self.impossible_edges],
+            "imposed_edges": [list(edge) for edge in self.imposed_edges],
+            "banned_groups": [[group, other_group] for group, other_group in self._banned_groups],
+            "degree_caps": {str(node_id): cap for node_id, cap in self._degree_caps.items()}
+        }
+
+    def set_metadata(self, metadata):
+        """
+        Restore the rules, players and constraints on the edges described by get_metadata
+        :param metadata: dictionary, description of the game
+        :return: void
+        """
+        self.rules = Rules()
+        for key, value in metadata["rules"].items():
+            setattr(self.rules, key, value)
+        self.impossible_edges = [tuple(edge) for edge in metadata["impossible_edges"]]
+        self.imposed_edges = [tuple(edge) for edge in metadata["imposed_edges"]]
+        self._banned_groups = [(group, other_group) for group, other_group in metadata.get("banned_groups", [])]
+        self._degree_caps = {int(node_id): cap for node_id, cap in metadata.get("degree_caps", {}).items()}
+
+        for description in metadata["players"]:
+            player = Player(rules=self.rules,
+                            type=EntityType[description["type"]],
+                            name=description["name"],
+                            strategy_type=Strategy(description["strategy_type"]))
+            player.picture = description["picture"]
+            self.add_player(player, description["node_id"])
+
     def load(self, filename):
+        """
+        Load a game saved by save (pickle) or save_binary, the graph is restored at the last recorded round
+        :param filename: string, path of the file
+        :return: void
+        """
+        if is_game_file(filename):
+            self._load_binary(filename)
+            return
+
         with open(filename, 'rb') as handle:
             game_state = pickle.load(handle)
             self.rules = game_state["rules"]
             self.history = game_state["history"]
+            if not isinstance(self.history, GameHistory):
+                # games saved before the delta encoded history
+                self.history = GameHistory.from_states(self.rules.nb_players, self.history)
             self.current_step = game_state["current_step"]
 
             players = _to_players(game_state["players"])
@@ -229,6 +504,17 @@ class Game:
                 self.add_player(v, k)
 
             self.initialize_graph()
+            self.graph = self.history.get_graph()
+
+    def _load_binary(self, filename):
+        game_file = GameFile(filename)
+        self.set_metadata(game_file.get_metadata())
+        self.history = game_file.get_history()
+        self.current_step = game_file.current_step
+
+        self.initialize_graph()
+        # the final state is stored as is, no need to replay the rounds
+        self.graph = game_file.get_final_graph()
 
 """
 Pickle doesn't save local objects (like strategies in this example)
@@ -275,4 +561,21 @@ class PlayerRepr:
         self.type = type
         self.node_id = node_id
         self.name = name
-        self.strategy_type = strategy_type
\ No newline at end of file
+        self.strategy_type = strategy_type
+
+
+def convert_pickle(filename, output_filename=None, betweenness=False):
+    """
+    Convert a game saved with pickle (e.g. centrality/games/*.pkl) to the binary format
+    :param filename: string, path of the pickle
+    :param output_filename: string, path of the binary file (default to filename with the .cgam extension)
+    :param betweenness: boolean, also store the betweenness of every node at every round
+    :return: string, path of the binary file
+    """
+    if output_filename is None:
+        output_filename = filename.rsplit(".", 1)[0] + ".cgam"
+
+    game = Game()
+    game.load(filename)
+    game.save_binary(output_filename, betweenness)
+    return output_filename
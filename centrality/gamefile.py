@@ -0,0 +1,199 @@
+"""
+Binary game files. Unlike pickles, they are memory mapped when opened: any round is rebuilt from the closest
+checkpoint without reading the rest of the file, and the final graph is stored as is.
+
+Layout (little endian, every section starts on an 8 bytes boundary):
+    header              magic, version, flags, nb_nodes, nb_rounds, checkpoint_interval, current_step and the offsets
+                        of the sections below (plus the end of the file)
+    metadata            JSON (rules, players, constraints on the edges) padded with spaces
+    toggle index        (nb_rounds + 1) uint64, position of the first toggle of each round in the toggle stream
+    toggles             int32 (u, v) pairs, edges toggled by each round (none for round 0)
+    checkpoint index    (nb_checkpoints + 1) uint64, position of the first edge of each checkpoint
+    checkpoints         int32 (u, v) pairs, edges of the rounds 0, checkpoint_interval, 2 * checkpoint_interval...
+    final edges         int32 (u, v) pairs, edges of the last round
+    betweenness         optional (nb_rounds, nb_nodes) float64 array, betweenness of every node at every round
+"""
+import json
+import struct
+import numpy as np
+
+from .graph import ArrayGraph
+from .history import GameHistory
+
+MAGIC = b"CGAM"
+VERSION = 1
+
+# flags
+HAS_BETWEENNESS = 1
+
+_HEADER = struct.Struct("<4sHHIIII8Q")
+_SECTIONS = ("metadata", "toggle_index", "toggles", "checkpoint_index", "checkpoints", "final_edges", "betweenness")
+
+
+def is_game_file(filename):
+    """
+    :param filename: string, path of a saved game
+    :return: boolean, True if the file is a binary game file (and not a pickle)
+    """
+    with open(filename, "rb") as handle:
+        return handle.read(len(MAGIC)) == MAGIC
+
+
+def _pad(data, fill=b"\0"):
+    return data + fill * (-len(data) % 8)
+
+
+def _get_index(arrays):
+    """
+    :return: uint64 array, cumulated lengths of the arrays starting with 0
+    """
+    index = np.zeros(len(arrays) + 1, dtype=np.uint64)
+    np.cumsum([len(array) for array in arrays], out=index[1:])
+    return index
+
+
+def _get_edges(arrays):
+    return np.concatenate([np.asarray(array, dtype=np.int32).reshape(-1, 2) for array in arrays] +
+                          [np.zeros((0, 2), dtype=np.int32)])
+
+
+def write_game_file(filename, history, metadata, current_step, betweenness=None):
+    """
+    :param filename: string, path of the file
+    :param history: GameHistory, states of the game
+    :param metadata: dictionary, JSON serializable description of the game (see Game.save_binary)
+    :param current_step: int, current step of the game
+    :param betweenness: (len(history), nb_nodes) array of the betweenness of the nodes at every round, or None
+    :return: void
+    """
+    nb_rounds = len(history)
+    toggles = [history.get_toggles(round_number) for round_number in range(nb_rounds)]
+    checkpoints = [history.get_edges(round_number)
+                   for round_number in range(0, nb_rounds, history.checkpoint_interval)]
+
+    sections = [
+        _pad(json.dumps(metadata).encode("utf-8"), b" "),
+        _get_index(toggles).tobytes(),
+        _get_edges(toggles).tobytes(),
+        _get_index(checkpoints).tobytes(),
+        _get_edges(checkpoints).tobytes(),
+        _get_edges([history.get_edges()] if nb_rounds else []).tobytes(),
+        np.zeros(0).tobytes() if betweenness is None else np.asarray(betweenness, dtype="<f8").tobytes(),
+    ]
+
+    offsets = [_HEADER.size]
+    for section in sections:
+        offsets.append(offsets[-1] + len(section))
+
+    flags = 0 if betweenness is None else HAS_BETWEENNESS
+    header = _HEADER.pack(MAGIC, VERSION, flags, history.nb_nodes or 0, nb_rounds, history.checkpoint_interval,
+                          current_step, *offsets)
+
+    with open(filename, "wb") as handle:
+        handle.write(header)
+        for section in sections:
+            handle.write(section)
+
+
+class GameFile:
+    """
+    Binary game file opened with a memory map. The arrays returned by the methods are read only views of the file
+    (except the graphs), the pages are only read when they are used.
+    """
+    def __init__(self, filename):
+        """
+        :param filename: string, path of the file
+        """
+        self._data = np.memmap(filename, dtype=np.uint8, mode="r")
+
+        fields = _HEADER.unpack(bytes(self._data[:_HEADER.size]))
+        magic, version, self._flags, self._nb_nodes, self._nb_rounds, self._checkpoint_interval, \
+            self._current_step = fields[:7]
+        if magic != MAGIC:
+            raise Exception("%s is not a game file" % filename)
+        if version > VERSION:
+            raise Exception("Game file version %s is not supported (latest version: %s)" % (version, VERSION))
+        self._offsets = dict(zip(_SECTIONS, zip(fields[7:-1], fields[8:])))
+
+        self._toggle_index = self._get_section("toggle_index", np.uint64)
+        self._toggles = self._get_section("toggles", np.int32).reshape(-1, 2)
+        self._checkpoint_index = self._get_section("checkpoint_index", np.uint64)
+        self._checkpoints = self._get_section("checkpoints", np.int32).reshape(-1, 2)
+
+    def _get_section(self, name, dtype):
+        start, end = self._offsets[name]
+        return self._data[start:end].view(np.dtype(dtype).newbyteorder("<"))
+
+    @property
+    def nb_nodes(self):
+        return self._nb_nodes
+
+    @property
+    def nb_rounds(self):
+        return self._nb_rounds
+
+    @property
+    def current_step(self):
+        return self._current_step
+
+    @property
+    def checkpoint_interval(self):
+        return self._checkpoint_interval
+
+    @property
+    def has_betweenness(self):
+        return bool(self._flags & HAS_BETWEENNESS)
+
+    def get_metadata(self):
+        """
+        :return: dictionary, description of the game given to write_game_file
+        """
+        start, end = self._offsets["metadata"]
+        return json.loads(bytes(self._data[start:end]).decode("utf-8"))
+
+    def get_toggles(self, round_number):
+        """
+        :param round_number: int, round number
+        :return: (nb_toggles, 2) int array, edges toggled during that round
+        """
+        return self._toggles[int(self._toggle_index[round_number]):int(self._toggle_index[round_number + 1])]
+
+    def get_checkpoint(self, checkpoint):
+        """
+        :param checkpoint: int, index of the checkpoint (round checkpoint * checkpoint_interval)
+        :return: (nb_edges, 2) int array, edges of the state of that round
+        """
+        return self._checkpoints[int(self._checkpoint_index[checkpoint]):int(self._checkpoint_index[checkpoint + 1])]
+
+    def get_final_edges(self):
+        """
+        :return: (nb_edges, 2) int array, edges of the last round
+        """
+        return self._get_section("final_edges", np.int32).reshape(-1, 2)
+
+    def get_final_graph(self):
+        """
+        :return: ArrayGraph, state of the last round
+        """
+        return ArrayGraph.from_edges(self._nb_nodes, self.get_final_edges())
+
+    def get_betweenness(self, round_number=None):
+        """
+        :param round_number: int, round number (default to every round)
+        :return: array of the betweenness of the nodes at that round ((nb_rounds, nb_nodes) array if round_number is
+        None), None if the file doesn't store it
+        """
+        if not self.has_betweenness:
+            return None
+        betweenness = self._get_section("betweenness", np.float64).reshape(self._nb_rounds, self._nb_nodes)
+        return betweenness if round_number is None else betweenness[round_number]
+
+    def get_history(self):
+        """
+        :return: GameHistory whose rounds are views of the file
+        """
+        return GameHistory.from_arrays(self._nb_nodes,
+                                       [self.get_toggles(round_number) for round_number in range(self._nb_rounds)],
+                                       [self.get_checkpoint(checkpoint)
+                                        for checkpoint in range(len(self._checkpoint_index) - 1)],
+                                       self._checkpoint_interval)
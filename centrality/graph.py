@@ -0,0 +1,723 @@
+"""
+Compact array backed undirected graph used in the hot path of the game instead of networkx dict-of-dict graphs.
+Nodes are labelled 0..nb_nodes-1.
+"""
+import numpy as np
+import networkx as nx
+
+_MASK64 = (1 << 64) - 1
+
+
+def _get_edge_hash(u, v):
+    """
+    Zobrist key of an edge: splitmix64 of the pair, so that the keys need no table and don't depend on the number of
+    nodes
+    :return: int, 64 bits key of the edge (u, v), the same as (v, u)
+    """
+    if u > v:
+        u, v = v, u
+    z = ((int(u) << 32 | int(v)) + 0x9E3779B97F4A7C15) & _MASK64
+    z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & _MASK64
+    z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & _MASK64
+    return z ^ (z >> 31)
+
+
+def _get_edge_hashes(us, vs):
+    """
+    Vectorized _get_edge_hash
+    :return: uint64 array, keys of the edges (us[i], vs[i])
+    """
+    us, vs = np.asarray(us, dtype=np.int64), np.asarray(vs, dtype=np.int64)
+    z = (np.minimum(us, vs).astype(np.uint64) << np.uint64(32) | np.maximum(us, vs).astype(np.uint64)) + \
+        np.uint64(0x9E3779B97F4A7C15)
+    z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return z ^ (z >> np.uint64(31))
+
+
+def _get_action_array(actions):
+    """
+    :param actions: iterable or array of edges (u, v)
+    :return: (nb_actions, 2) int64 array of the distinct edges (u, v) with u < v in increasing order, without looping
+    edges
+    """
+    edges = np.asarray(actions if isinstance(actions, np.ndarray) else list(actions), dtype=np.int64).reshape(-1, 2)
+    edges = np.sort(edges, axis=1)
+    return np.unique(edges[edges[:, 0] != edges[:, 1]], axis=0)
+
+
+def to_array_graph(graph, nb_nodes=None, copy=True):
+    """
+    :param graph: ArrayGraph or nx.Graph whose nodes are 0..nb_nodes-1
+    :param nb_nodes: int, number of nodes (default to the number of nodes of the graph)
+    :param copy: boolean, copy the graph if it is already an ArrayGraph
+    :return: ArrayGraph
+    """
+    if nb_nodes is None:
+        nb_nodes = graph.number_of_nodes()
+    if isinstance(graph, ArrayGraph) and graph.number_of_nodes() == nb_nodes:
+        return graph.copy() if copy else graph
+    return ArrayGraph.from_edges(nb_nodes, graph.edges())
+
+
+class ArrayGraph:
+    """
+    Undirected simple graph stored as neighbor rows in a shared pool: row u holds the degree(u) neighbors of u followed
+    by unused slots, starting at its own offset of the pool. The slot of every (u, v) pair is indexed so that adding or
+    removing an edge is O(1) (a removed neighbor is replaced by the last neighbor of the row). A full row is moved to
+    the end of the pool with twice its capacity, and the pool is compacted when it runs out of space, so the memory is
+    O(nb_nodes + nb_edges) whatever the degree distribution (a hub only widens its own row).
+
+    The traversal kernels (BFS, Brandes) work level by level on whole frontiers with NumPy, and the graph can be
+    exported to CSR arrays or converted to and from nx.Graph for plotting and metrics.
+    """
+    def __init__(self, nb_nodes=0, capacity=4):
+        """
+        :param nb_nodes: int, number of nodes
+        :param capacity: int, initial number of neighbor slots per node
+        """
+        capacity = max(capacity, 1)
+        self._nb_nodes = nb_nodes
+        self._degree = np.zeros(nb_nodes, dtype=np.int32)
+        # row u is pool[start[u]:start[u] + capacity[u]], the pool is used up to pool_end
+        self._start = np.arange(nb_nodes, dtype=np.int64) * capacity
+        self._capacity = np.full(nb_nodes, capacity, dtype=np.int64)
+        self._pool = np.zeros(nb_nodes * capacity, dtype=np.int32)
+        self._pool_end = nb_nodes * capacity
+        self._slots = {}
+        self._nb_edges = 0
+        # Zobrist hash of the edge set, XOR of the keys of the edges
+        self._hash = 0
+        # CSR arrays used by the traversal kernels, rebuilt after a modification
+        self._csr = None
+
+    """
+    Construction and conversion
+    """
+    @classmethod
+    def from_edges(cls, nb_nodes, edges):
+        """
+        :param nb_nodes: int, number of nodes
+        :param edges: iterable of (u, v) tuples
+        :return: ArrayGraph
+        """
+        graph = cls(nb_nodes)
+        graph.add_edges_from(edges)
+        return graph
+
+    @classmethod
+    def from_networkx(cls, graph):
+        """
+        :param graph: nx.Graph, graph whose nodes are 0..n-1
+        :return: ArrayGraph
+        """
+        return cls.from_edges(graph.number_of_nodes(), graph.edges())
+
+    def to_networkx(self):
+        """
+        :return: nx.Graph with the same nodes and edges
+        """
+        graph = nx.Graph()
+        graph.add_nodes_from(range(self._nb_nodes))
+        graph.add_edges_from(self.edges())
+        return graph
+
+    def to_csr(self):
+        """
+        Compressed sparse row representation of the adjacency (both orientations of each edge are stored)
+        :return: tuple (indptr, indices) of int arrays, shared with the graph until its next modification
+        """
+        if self._csr is None:
+            indptr = np.zeros(self._nb_nodes + 1, dtype=np.int64)
+            np.cumsum(self._degree, out=indptr[1:])
+            self._csr = indptr, self._pool[self._get_positions()]
+        return self._csr
+
+    def copy(self):
+        graph = ArrayGraph.__new__(ArrayGraph)
+        graph._nb_nodes = self._nb_nodes
+        graph._degree = self._degree.copy()
+        graph._start = self._start.copy()
+        graph._capacity = self._capacity.copy()
+        graph._pool = self._pool.copy()
+        graph._pool_end = self._pool_end
+        graph._slots = dict(self._slots)
+        graph._nb_edges = self._nb_edges
+        graph._hash = self._hash
+        graph._csr = self._csr
+        return graph
+
+    """
+    networkx like API, the subset used by the game
+    """
+    def number_of_nodes(self):
+        return self._nb_nodes
+
+    def number_of_edges(self):
+        return self._nb_edges
+
+    def nodes(self):
+        return list(range(self._nb_nodes))
+
+    def edges(self):
+        """
+        :return: [(u, v)] with u < v
+        """
+        rows, neighbors = self._get_edge_rows()
+        keep = rows < neighbors
+        return list(zip(rows[keep].tolist(), neighbors[keep].tolist()))
+
+    def state_hash(self):
+        """
+        :return: int, 64 bits hash of the edge set, updated with each edge added or removed (equal edge sets have equal
+        hashes, different ones almost surely different hashes)
+        """
+        return self._hash
+
+    def edge_array(self):
+        """
+        :return: (nb_edges, 2) int array of the edges (u, v) with u < v
+        """
+        rows, neighbors = self._get_edge_rows()
+        keep = rows < neighbors
+        return np.column_stack((rows[keep], neighbors[keep])).astype(np.int32)
+
+    def neighbors(self, node):
+        start = self._start[node]
+        return self._pool[start:start + self._degree[node]]
+
+    def degree(self, node=None):
+        """
+        :param node: int, if None the degree of every node is returned
+        :return: int or array of int
+        """
+        if node is None:
+            return self._degree.copy()
+        return int(self._degree[node])
+
+    def add_nodes_from(self, nodes):
+        """
+        Nodes are always 0..nb_nodes-1, adding nodes extends the range up to the largest given node
+        """
+        nodes = list(nodes)
+        if not nodes:
+            return
+        nb_nodes = max(max(nodes) + 1, self._nb_nodes)
+        if nb_nodes > self._nb_nodes:
+            extra = nb_nodes - self._nb_nodes
+            # new rows get the default capacity
+            capacity = 4
+            self._reserve(extra * capacity)
+            self._degree = np.concatenate((self._degree, np.zeros(extra, dtype=np.int32)))
+            self._start = np.concatenate((self._start, self._pool_end + np.arange(extra, dtype=np.int64) * capacity))
+            self._capacity = np.concatenate((self._capacity, np.full(extra, capacity, dtype=np.int64)))
+            self._pool_end += extra * capacity
+            # slot keys depend on the number of nodes
+            self._slots = {(key // self._nb_nodes) * nb_nodes + key % self._nb_nodes: slot
+                           for key, slot in self._slots.items()}
+            self._nb_nodes = nb_nodes
+            self._csr = None
+
+    def has_edge(self, u, v):
+        return self._get_key(u, v) in self._slots
+
+    def add_edge(self, u, v):
+        if u == v:
+            raise Exception("Self loops are not allowed")
+        if self.has_edge(u, v):
+            return
+        self._append(u, v)
+        self._append(v, u)
+        self._nb_edges += 1
+        self._hash ^= _get_edge_hash(u, v)
+
+    def remove_edge(self, u, v):
+        if not self.has_edge(u, v):
+            raise Exception("The edge (%s, %s) is not in the graph" % (u, v))
+        self._pop(u, v)
+        self._pop(v, u)
+        self._nb_edges -= 1
+        self._hash ^= _get_edge_hash(u, v)
+
+    def toggle_edge(self, u, v):
+        """
+        Add the edge (u, v) if it doesn't exist, remove it otherwise
+        :return: boolean, True if the edge has been added
+        """
+        if self.has_edge(u, v):
+            self.remove_edge(u, v)
+            return False
+        self.add_edge(u, v)
+        return True
+
+    def add_edges_from(self, edges):
+        for u, v in edges:
+            self.add_edge(u, v)
+
+    def apply_actions(self, actions, constraints=None):
+        """
+        Apply the simultaneous actions of a round: each edge is toggled once, an existing edge is removed unless it is
+        imposed and a missing one is added unless it is impossible. The degree caps are checked once the removals of
+        the round are done, the additions being made in increasing order of (u, v).
+        :param actions: iterable of edges (u, v), looping edges are ignored
+        :param constraints: ConstraintIndex, constraints on the edges (default to none)
+        :return: (nb_toggles, 2) int array of the toggled edges (u, v) with u < v
+        """
+        edges = _get_action_array(actions)
+        done = np.zeros(len(edges), dtype=bool)
+        additions = []
+        for index, (u, v) in enumerate(edges.tolist()):
+            if not self.has_edge(u, v):
+                additions.append(index)
+            elif constraints is None or constraints.can_remove(u, v):
+                self.remove_edge(u, v)
+                done[index] = True
+        for index in additions:
+            u, v = edges[index].tolist()
+            if constraints is None or constraints.can_add(self, u, v):
+                self.add_edge(u, v)
+                done[index] = True
+        return edges[done]
+
+    def _get_key(self, u, v):
+        return int(u) * self._nb_nodes + int(v)
+
+    def _get_positions(self):
+        """
+        :return: int array, positions in the pool of the used slots, row by row (O(nb_nodes + nb_edges))
+        """
+        counts = self._degree.astype(np.int64)
+        offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        return np.repeat(self._start, counts) + offsets
+
+    def _get_edge_rows(self):
+        """
+        :return: tuple (node, neighbor) arrays with one entry per used slot, row by row
+        """
+        return np.repeat(np.arange(self._nb_nodes), self._degree), self._pool[self._get_positions()]
+
+    def _reserve(self, size):
+        """
+        Make room for size slots at the end of the pool, compacting the rows (and growing the pool if they take more
+        than half of it)
+        """
+        if self._pool_end + size <= len(self._pool):
+            return
+        needed = int(self._capacity.sum()) + size
+        pool = np.zeros(max(2 * needed, len(self._pool)), dtype=np.int32)
+        start = np.cumsum(self._capacity) - self._capacity
+        counts = self._degree.astype(np.int64)
+        offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        pool[np.repeat(start, counts) + offsets] = self._pool[self._get_positions()]
+        self._pool, self._start, self._pool_end = pool, start, int(self._capacity.sum())
+
+    def _append(self, u, v):
+        slot = int(self._degree[u])
+        if slot == self._capacity[u]:
+            # the row moves to the end of the pool with twice its capacity
+            capacity = 2 * slot
+            self._reserve(capacity)
+            start = self._start[u]
+            self._pool[self._pool_end:self._pool_end + slot] = self._pool[start:start + slot]
+            self._start[u], self._capacity[u] = self._pool_end, capacity
+            self._pool_end += capacity
+        self._pool[self._start[u] + slot] = v
+        self._slots[self._get_key(u, v)] = slot
+        self._degree[u] += 1
+        self._csr = None
+
+    def _pop(self, u, v):
+        slot = self._slots.pop(self._get_key(u, v))
+        last = int(self._degree[u]) - 1
+        start = self._start[u]
+        if slot != last:
+            moved = self._pool[start + last]
+            self._pool[start + slot] = moved
+            self._slots[self._get_key(u, moved)] = slot
+        self._degree[u] = last
+        self._csr = None
+
+    """
+    Traversal kernels. They process a batch of sources at once: every level of the search expands the frontiers of
+    all the sources with a handful of array operations. The per-source data is stored in (nb_sources, nb_nodes)
+    arrays and addressed through flat indices source_row * nb_nodes + node.
+    """
+    def _expand(self, nodes):
+        """
+        :param nodes: array of nodes
+        :return: tuple (position in nodes, neighbor) arrays with one entry per edge leaving the nodes
+        """
+        indptr, indices = self.to_csr()
+        starts = indptr[nodes]
+        counts = indptr[nodes + 1] - starts
+        positions = np.repeat(np.arange(len(nodes)), counts)
+        offsets = np.arange(len(positions)) - np.repeat(np.cumsum(counts) - counts, counts)
+        return positions, indices[starts[positions] + offsets]
+
+    def get_neighbor_rows(self, nodes):
+        """
+        :param nodes: array of nodes
+        :return: tuple (neighbor rows of the nodes, mask of the used slots), (len(nodes), max degree of the nodes) arrays
+        """
+        degree = self._degree[nodes]
+        mask = np.arange(max(int(degree.max(initial=0)), 1)) < degree[:, None]
+        neighbors = np.zeros(mask.shape, dtype=np.int32)
+        neighbors[mask] = self._pool[(self._start[nodes][:, None] + np.arange(mask.shape[1]))[mask]]
+        return neighbors, mask
+
+    def get_batch_size(self):
+        """
+        :return: int, number of sources processed together so that a batch holds about 2**22 (source, node) and
+        (source, edge) entries
+        """
+        return max(1, (1 << 22) // max(self._nb_nodes + 2 * self._nb_edges, 1))
+
+    def _get_neighbor_or(self, words):
+        """
+        :param words: (nb_nodes, nb_words) uint64 array
+        :return: (nb_nodes, nb_words) uint64 array, bitwise OR of the words of the neighbors of each node
+        """
+        indptr, indices = self.to_csr()
+        res = np.zeros_like(words)
+        has_neighbors = indptr[1:] > indptr[:-1]
+        if has_neighbors.any():
+            # the segments of the nodes without neighbors are empty, skipping them leaves the other segments intact
+            res[has_neighbors] = np.bitwise_or.reduceat(words[indices], indptr[:-1][has_neighbors], axis=0)
+        return res
+
+    def bitset_levels(self, sources):
+        """
+        Bit-parallel multi-source BFS: bit i of the words of a node tells whether source i has reached it, so a level
+        of 64 sources is advanced by one OR over the words of the neighbors of every node, followed by a mask of the
+        nodes already visited.
+        :param sources: int or array of source nodes
+        :return: generator of the flat indices source_row * nb_nodes + node of the nodes at depth 0, 1, 2...
+        """
+        sources = np.atleast_1d(np.asarray(sources, dtype=np.int64))
+        nb_nodes, nb_sources = self._nb_nodes, len(sources)
+        nb_words = -(-nb_sources // 64)
+
+        bits = np.zeros((nb_nodes, nb_words * 64), dtype=bool)
+        bits[sources, np.arange(nb_sources)] = True
+        frontier = np.packbits(bits, axis=1, bitorder="little").view(np.uint64)
+        visited = frontier.copy()
+
+        level = np.arange(nb_sources) * nb_nodes + sources
+        while level.size:
+            yield level
+
+            frontier = self._get_neighbor_or(frontier) & ~visited
+            visited |= frontier
+
+            nodes = np.flatnonzero(frontier.any(axis=1))
+            bits = np.unpackbits(frontier[nodes].view(np.uint8), axis=1, bitorder="little")[:, :nb_sources]
+            rows, positions = np.nonzero(bits.T)
+            level = rows * nb_nodes + nodes[positions]
+
+    def bitset_distances(self, sources):
+        """
+        :param sources: int or array of source nodes
+        :return: (nb_sources, nb_nodes) int array of the distances from the sources (-1 if unreachable)
+        """
+        sources = np.atleast_1d(np.asarray(sources, dtype=np.int64))
+        dist = np.full(len(sources) * self._nb_nodes, -1, dtype=np.int32)
+        for depth, level in enumerate(self.bitset_levels(sources)):
+            dist[level] = depth
+        return dist.reshape(len(sources), self._nb_nodes)
+
+    def bfs(self, sources):
+        """
+        Breadth first search from each source counting the shortest paths (first phase of Brandes' algorithm). The
+        levels are found by the bit-parallel search, then the edges from each level to the next one form the shortest
+        path DAG along which the paths are counted.
+        :param sources: int or array of source nodes
+        :return: tuple (distances (-1 if unreachable), number of shortest paths, shortest path DAG edges as a list
+        with one (parents, children) pair of flat index arrays per level)
+        """
+        sources = np.atleast_1d(np.asarray(sources, dtype=np.int64))
+        nb_nodes = self._nb_nodes
+
+        levels = list(self.bitset_levels(sources))
+        dist = np.full(len(sources) * nb_nodes, -1, dtype=np.int32)
+        for depth, level in enumerate(levels):
+            dist[level] = depth
+
+        sigma = np.zeros(len(sources) * nb_nodes)
+        sigma[dist == 0] = 1.
+
+        dag = []
+        for depth, frontier in enumerate(levels):
+            rows, nodes = np.divmod(frontier, nb_nodes)
+            positions, neighbors = self._expand(nodes)
+            parents = frontier[positions]
+            children = rows[positions] * nb_nodes + neighbors
+
+            on_dag = dist[children] == depth + 1
+            parents, children = parents[on_dag], children[on_dag]
+            np.add.at(sigma, children, sigma[parents])
+            dag.append((parents, children))
+
+        return dist.reshape(len(sources), nb_nodes), sigma.reshape(len(sources), nb_nodes), dag
+
+    def dependencies(self, sources):
+        """
+        Brandes' algorithm for each source
+        :param sources: int or array of source nodes
+        :return: tuple (distances from the sources, dependency of each source on every node), (nb_sources, nb_nodes)
+        arrays
+        """
+        dist, sigma, dag = self.bfs(sources)
+        return dist, self.accumulate_dependencies(dist, sigma, dag)
+
+    @staticmethod
+    def accumulate_dependencies(dist, sigma, dag):
+        """
+        Backward phase of Brandes' algorithm
+        :param dist: (nb_sources, nb_nodes) distances returned by bfs
+        :param sigma: (nb_sources, nb_nodes) number of shortest paths returned by bfs
+        :param dag: shortest path DAG returned by bfs
+        :return: (nb_sources, nb_nodes) array, dependency of each source on every node
+        """
+        sigma = sigma.reshape(-1)
+
+        delta = np.zeros(sigma.size)
+        for parents, children in reversed(dag):
+            coefficient = (1. + delta[children]) / sigma[children]
+            np.add.at(delta, parents, sigma[parents] * coefficient)
+
+        delta = delta.reshape(dist.shape)
+        delta[dist == 0] = 0.
+
+        return delta
+
+    def target_dependencies(self, sources, target):
+        """
+        Dependency of each source on the target only. For each source, the backward accumulation is restricted to the
+        levels deeper than the target, and stops once the shallowest target is reached.
+        :param sources: int or array of source nodes
+        :param target: int, node whose dependency is computed
+        :return: tuple (distances from the sources, dependency of each source on the target)
+        """
+        dist, sigma, dag = self.bfs(sources)
+        sigma = sigma.reshape(-1)
+        nb_nodes = self._nb_nodes
+
+        # depth of the target for each source, unreachable targets and the target itself have a zero dependency
+        depth = dist[:, target].astype(np.int64)
+        depth[depth <= 0] = len(dag)
+        if not len(depth):
+            return dist, np.zeros(0)
+
+        delta = np.zeros(sigma.size)
+        for level in range(len(dag) - 1, depth.min() - 1, -1):
+            parents, children = dag[level]
+            keep = depth[parents // nb_nodes] <= level
+            parents, children = parents[keep], children[keep]
+            coefficient = (1. + delta[children]) / sigma[children]
+            np.add.at(delta, parents, sigma[parents] * coefficient)
+
+        res = delta[np.arange(len(depth)) * nb_nodes + target]
+        res[depth == len(dag)] = 0.
+        return dist, res
+
+    def betweenness_centrality(self, normalized=True):
+        """
+        Same result as nx.betweenness_centrality
+        :param normalized: boolean, same normalization as networkx
+        :return: array of betweenness centrality indexed by node
+        """
+        res = np.zeros(self._nb_nodes)
+        batch_size = self.get_batch_size()
+        for start in range(0, self._nb_nodes, batch_size):
+            res += self.dependencies(np.arange(start, min(start + batch_size, self._nb_nodes)))[1].sum(axis=0)
+
+        if normalized:
+            return res / ((self._nb_nodes - 1) * (self._nb_nodes - 2)) if self._nb_nodes > 2 else res
+        return res / 2.
+
+
+class BitsetGraph(ArrayGraph):
+    """
+    Dense state of a game: row u of the adjacency matrix is packed in uint64 words (bit v of the row set if (u, v) is
+    an edge), so the memory is N²/8 bytes whatever the number of edges. A round of simultaneous actions is applied as
+    one XOR of the masked toggle bits (see apply_actions) and a copy is a single array copy, cheap enough for the
+    strategies to branch on the state.
+
+    The traversal kernels of ArrayGraph run on the CSR arrays, built from the rows after a modification.
+    """
+    def __init__(self, nb_nodes=0):
+        """
+        :param nb_nodes: int, number of nodes
+        """
+        self._nb_nodes = nb_nodes
+        self._rows = np.zeros((nb_nodes, self._get_nb_words(nb_nodes)), dtype=np.uint64)
+        self._degree = np.zeros(nb_nodes, dtype=np.int32)
+        self._nb_edges = 0
+        # Zobrist hash of the edge set, XOR of the keys of the edges
+        self._hash = 0
+        # CSR arrays used by the traversal kernels, rebuilt after a modification
+        self._csr = None
+
+    @staticmethod
+    def _get_nb_words(nb_nodes):
+        return max(-(-nb_nodes // 64), 1)
+
+    @classmethod
+    def from_graph(cls, graph):
+        """
+        :param graph: ArrayGraph or nx.Graph whose nodes are 0..n-1
+        :return: BitsetGraph
+        """
+        return cls.from_edges(graph.number_of_nodes(), graph.edges())
+
+    def _get_bits(self):
+        """
+        :return: (nb_nodes, nb_nodes) boolean adjacency matrix
+        """
+        return np.unpackbits(self._rows.view(np.uint8), axis=1, bitorder="little")[:, :self._nb_nodes].astype(bool)
+
+    def to_csr(self):
+        """
+        Compressed sparse row representation of the adjacency (both orientations of each edge are stored)
+        :return: tuple (indptr, indices) of int arrays, shared with the graph until its next modification
+        """
+        if self._csr is None:
+            indptr = np.zeros(self._nb_nodes + 1, dtype=np.int64)
+            np.cumsum(self._degree, out=indptr[1:])
+            self._csr = indptr, np.nonzero(self._get_bits())[1].astype(np.int32)
+        return self._csr
+
+    def copy(self):
+        graph = BitsetGraph.__new__(BitsetGraph)
+        graph._nb_nodes = self._nb_nodes
+        graph._rows = self._rows.copy()
+        graph._degree = self._degree.copy()
+        graph._nb_edges = self._nb_edges
+        graph._hash = self._hash
+        graph._csr = self._csr
+        return graph
+
+    """
+    networkx like API, the subset used by the game
+    """
+    def edges(self):
+        """
+        :return: [(u, v)] with u < v
+        """
+        return list(map(tuple, self.edge_array().tolist()))
+
+    def edge_array(self):
+        """
+        :return: (nb_edges, 2) int array of the edges (u, v) with u < v
+        """
+        indptr, indices = self.to_csr()
+        rows = np.repeat(np.arange(self._nb_nodes), self._degree)
+        keep = rows < indices
+        return np.column_stack((rows[keep], indices[keep])).astype(np.int32)
+
+    def neighbors(self, node):
+        indptr, indices = self.to_csr()
+        return indices[indptr[node]:indptr[node + 1]]
+
+    def add_nodes_from(self, nodes):
+        """
+        Nodes are always 0..nb_nodes-1, adding nodes extends the range up to the largest given node
+        """
+        nodes = list(nodes)
+        if not nodes:
+            return
+        nb_nodes = max(max(nodes) + 1, self._nb_nodes)
+        if nb_nodes > self._nb_nodes:
+            rows = np.zeros((nb_nodes, self._get_nb_words(nb_nodes)), dtype=np.uint64)
+            rows[:self._nb_nodes, :self._rows.shape[1]] = self._rows
+            self._rows = rows
+            self._degree = np.concatenate((self._degree, np.zeros(nb_nodes - self._nb_nodes, dtype=np.int32)))
+            self._nb_nodes = nb_nodes
+            self._csr = None
+
+    def has_edge(self, u, v):
+        return bool(int(self._rows[u, v >> 6]) >> (v & 63) & 1)
+
+    def has_edges(self, us, vs):
+        """
+        :param us: int array of nodes
+        :param vs: int array of nodes
+        :return: boolean array, True if (us[i], vs[i]) is an edge
+        """
+        us, vs = np.asarray(us, dtype=np.int64), np.asarray(vs, dtype=np.int64)
+        return (self._rows[us, vs >> 6] >> (vs & 63).astype(np.uint64)) & np.uint64(1) == 1
+
+    def add_edge(self, u, v):
+        if u == v:
+            raise Exception("Self loops are not allowed")
+        if not self.has_edge(u, v):
+            self._flip(np.array([u]), np.array([v]), np.zeros(1, dtype=bool))
+
+    def remove_edge(self, u, v):
+        if not self.has_edge(u, v):
+            raise Exception("The edge (%s, %s) is not in the graph" % (u, v))
+        self._flip(np.array([u]), np.array([v]), np.ones(1, dtype=bool))
+
+    def add_edges_from(self, edges):
+        edges = _get_action_array(edges)
+        edges = edges[~self.has_edges(edges[:, 0], edges[:, 1])]
+        self._flip(edges[:, 0], edges[:, 1], np.zeros(len(edges), dtype=bool))
+
+    def apply_actions(self, actions, constraints=None):
+        """
+        Same result as ArrayGraph.apply_actions: the toggles allowed by the imposed and impossible masks are applied
+        at once by a XOR of their bits, only the additions on nodes with a degree cap are made one by one (they depend
+        on each other)
+        :param actions: iterable or array of edges (u, v), looping edges are ignored
+        :param constraints: ConstraintIndex, constraints on the edges (default to none)
+        :return: (nb_toggles, 2) int array of the toggled edges (u, v) with u < v
+        """
+        edges = _get_action_array(actions)
+        us, vs = edges[:, 0], edges[:, 1]
+        exists = self.has_edges(us, vs)
+        if constraints is None:
+            allowed = np.ones(len(edges), dtype=bool)
+            capped = np.zeros(len(edges), dtype=bool)
+        else:
+            allowed = np.where(exists, ~constraints.are_imposed(us, vs), ~constraints.are_impossible(us, vs))
+            has_cap = np.zeros(self._nb_nodes, dtype=bool)
+            has_cap[list(constraints.degree_caps)] = True
+            capped = allowed & ~exists & (has_cap[us] | has_cap[vs])
+
+        done = allowed & ~capped
+        self._flip(us[done], vs[done], exists[done])
+
+        for index in np.flatnonzero(capped).tolist():
+            u, v = edges[index].tolist()
+            if constraints.can_add(self, u, v):
+                self.add_edge(u, v)
+                done[index] = True
+        return edges[done]
+
+    def _flip(self, us, vs, exists):
+        """
+        Toggle distinct edges
+        :param us: int array of nodes
+        :param vs: int array of nodes
+        :param exists: boolean array, True if (us[i], vs[i]) is an edge (removed by the toggle)
+        """
+        if not len(us):
+            return
+        nodes, others = np.concatenate((us, vs)), np.concatenate((vs, us))
+        np.bitwise_xor.at(self._rows, (nodes, others >> 6), np.uint64(1) << (others & 63).astype(np.uint64))
+        np.add.at(self._degree, nodes, np.where(np.concatenate((exists, exists)), -1, 1).astype(np.int32))
+        self._nb_edges += len(us) - 2 * int(exists.sum())
+        self._hash ^= int(np.bitwise_xor.reduce(_get_edge_hashes(us, vs)))
+        self._csr = None
+
+    def get_neighbor_rows(self, nodes):
+        """
+        :param nodes: array of nodes
+        :return: tuple (neighbor rows of the nodes, mask of the used slots), (len(nodes), max degree) arrays
+        """
+        indptr, indices = self.to_csr()
+        degree = self._degree[nodes]
+        mask = np.arange(max(int(degree.max(initial=0)), 1)) < degree[:, None]
+        neighbors = np.zeros(mask.shape, dtype=np.int32)
+        neighbors[mask] = indices[(indptr[nodes][:, None] + np.arange(mask.shape[1]))[mask]]
+        return neighbors, mask
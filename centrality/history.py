@@ -0,0 +1,238 @@
+"""
+Delta encoded history of the states of a game.
+"""
+import numpy as np
+
+from .graph import ArrayGraph
+
+
+def _get_edge_keys(nb_nodes, edges):
+    """
+    :param edges: (nb_edges, 2) int array of edges (u, v) with u < v
+    :return: sorted int64 array of the keys u * nb_nodes + v
+    """
+    edges = np.asarray(edges, dtype=np.int64).reshape(-1, 2)
+    return np.sort(edges[:, 0] * nb_nodes + edges[:, 1])
+
+
+class GameHistory:
+    """
+    States of a game, round by round. Each round only stores the edges toggled since the previous round, and a full
+    copy of the edges is kept every checkpoint_interval rounds, so the memory grows with the number of actions instead
+    of the number of rounds times the number of edges, and any state is rebuilt from the closest checkpoint by
+    replaying at most checkpoint_interval - 1 rounds.
+
+    Recorded rounds can't be modified. history[round_number] returns a new list of the edges of that state (as the
+    former dict of edge lists did), get_graph returns it as an ArrayGraph and cursor walks through the states in both
+    directions.
+    """
+    def __init__(self, checkpoint_interval=16):
+        """
+        :param checkpoint_interval: int, number of rounds between two full copies of the edges
+        """
+        self._checkpoint_interval = max(int(checkpoint_interval), 1)
+        self._nb_nodes = None
+        # toggled edges of each round ((nb_toggles, 2) int32 arrays, empty for round 0)
+        self._toggles = []
+        # round number -> (nb_edges, 2) int32 array of the edges
+        self._checkpoints = {}
+        # sorted keys of the edges of the last round, to find the toggles of the next one
+        self._keys = None
+
+    @classmethod
+    def from_states(cls, nb_nodes, states, checkpoint_interval=16):
+        """
+        :param nb_nodes: int, number of nodes
+        :param states: dictionary round number -> list of edges (former history format) or list of lists of edges
+        :param checkpoint_interval: int, number of rounds between two full copies of the edges
+        :return: GameHistory
+        """
+        history = cls(checkpoint_interval)
+        for round_number in range(len(states)):
+            history.append(ArrayGraph.from_edges(nb_nodes, states[round_number]))
+        return history
+
+    @classmethod
+    def from_arrays(cls, nb_nodes, toggles, checkpoints, checkpoint_interval):
+        """
+        :param nb_nodes: int, number of nodes
+        :param toggles: list of (nb_toggles, 2) int arrays, toggled edges of each round (kept as is, e.g. views of a
+        game file)
+        :param checkpoints: list of (nb_edges, 2) int arrays, edges of the rounds 0, checkpoint_interval...
+        :param checkpoint_interval: int, number of rounds between two checkpoints
+        :return: GameHistory
+        """
+        history = cls(checkpoint_interval)
+        if toggles:
+            history._nb_nodes = nb_nodes
+        history._toggles = list(toggles)
+        history._checkpoints = {index * history._checkpoint_interval: edges for index, edges in enumerate(checkpoints)}
+        return history
+
+    @property
+    def nb_nodes(self):
+        return self._nb_nodes
+
+    @property
+    def checkpoint_interval(self):
+        return self._checkpoint_interval
+
+    def __len__(self):
+        return len(self._toggles)
+
+    def __getitem__(self, round_number):
+        """
+        :param round_number: int, round number (negative values count from the last round)
+        :return: [(u, v)] with u < v, edges of the state of that round
+        """
+        return list(map(tuple, self.get_edges(round_number).tolist()))
+
+    def __iter__(self):
+        """
+        :return: generator of the edges of every state, in the same format as history[round_number]
+        """
+        if not len(self):
+            return
+        cursor = self.cursor()
+        yield cursor.graph.edges()
+        for _ in range(1, len(self)):
+            yield cursor.forward().edges()
+
+    def _check_round(self, round_number):
+        if round_number is None:
+            round_number = len(self) - 1
+        if round_number < 0:
+            round_number += len(self)
+        if not 0 <= round_number < len(self):
+            raise IndexError("Round %s is not in the history" % round_number)
+        return round_number
+
+    def append(self, graph):
+        """
+        Record the state of the next round
+        :param graph: ArrayGraph, state of the game at the end of the round
+        :return: void
+        """
+        edges = graph.edge_array()
+        keys = _get_edge_keys(graph.number_of_nodes(), edges)
+
+        if not len(self):
+            self._nb_nodes = graph.number_of_nodes()
+            toggles = np.zeros((0, 2), dtype=np.int32)
+        elif graph.number_of_nodes() != self._nb_nodes:
+            raise Exception("The number of nodes can't change during a game")
+        else:
+            if self._keys is None:
+                self._keys = _get_edge_keys(self._nb_nodes, self.get_edges())
+            toggled = np.setxor1d(self._keys, keys, assume_unique=True)
+            toggles = np.column_stack(np.divmod(toggled, self._nb_nodes)).astype(np.int32)
+
+        if len(self) % self._checkpoint_interval == 0:
+            self._checkpoints[len(self)] = edges
+        self._toggles.append(toggles)
+        self._keys = keys
+
+    def get_toggles(self, round_number):
+        """
+        :param round_number: int, round number
+        :return: (nb_toggles, 2) int array, edges added or removed by the players during that round
+        """
+        return self._toggles[self._check_round(round_number)]
+
+    def get_graph(self, round_number=None):
+        """
+        :param round_number: int, round number (default to the last round)
+        :return: ArrayGraph, new graph of the state of that round
+        """
+        round_number = self._check_round(round_number)
+        checkpoint = round_number - round_number % self._checkpoint_interval
+
+        graph = ArrayGraph.from_edges(self._nb_nodes, self._checkpoints[checkpoint])
+        for step in range(checkpoint + 1, round_number + 1):
+            for u, v in self._toggles[step].tolist():
+                graph.toggle_edge(u, v)
+        return graph
+
+    def get_edges(self, round_number=None):
+        """
+        :param round_number: int, round number (default to the last round)
+        :return: (nb_edges, 2) int array of the edges (u, v) with u < v of the state of that round
+        """
+        round_number = self._check_round(round_number)
+        if round_number in self._checkpoints:
+            return self._checkpoints[round_number].copy()
+        return self.get_graph(round_number).edge_array()
+
+    def cursor(self, round_number=0):
+        """
+        :param round_number: int, first state of the cursor
+        :return: HistoryCursor
+        """
+        return HistoryCursor(self, round_number)
+
+
+class HistoryCursor:
+    """
+    Graph following the states of a GameHistory: moving by one round toggles the edges of that round (a toggle is its
+    own inverse, so the cursor goes backward as cheaply as forward), longer jumps restart from the closest checkpoint.
+    """
+    def __init__(self, history, round_number=0):
+        """
+        :param history: GameHistory
+        :param round_number: int, first state of the cursor
+        """
+        self._history = history
+        self._round_number = history._check_round(round_number)
+        self._graph = history.get_graph(self._round_number)
+
+    @property
+    def round_number(self):
+        return self._round_number
+
+    @property
+    def graph(self):
+        """
+        ArrayGraph of the current state, owned by the cursor: it must not be modified and changes when the cursor moves
+        """
+        return self._graph
+
+    def forward(self):
+        """
+        Move to the next round
+        :return: ArrayGraph, graph of the new state
+        """
+        round_number = self._history._check_round(self._round_number + 1)
+        for u, v in self._history.get_toggles(round_number).tolist():
+            self._graph.toggle_edge(u, v)
+        self._round_number = round_number
+        return self._graph
+
+    def backward(self):
+        """
+        Move to the previous round
+        :return: ArrayGraph, graph of the new state
+        """
+        if self._round_number == 0:
+            raise IndexError("Round -1 is not in the history")
+        for u, v in self._history.get_toggles(self._round_number).tolist():
+            self._graph.toggle_edge(u, v)
+        self._round_number -= 1
+        return self._graph
+
+    def seek(self, round_number):
+        """
+        Move to the given round, through the closest of the current state and the checkpoint of that round
+        :param round_number: int, round number (negative values count from the last round)
+        :return: ArrayGraph, graph of the new state
+        """
+        round_number = self._history._check_round(round_number)
+        from_checkpoint = round_number % self._history.checkpoint_interval
+        if abs(round_number - self._round_number) > from_checkpoint:
+            self._graph = self._history.get_graph(round_number)
+            self._round_number = round_number
+
+        while self._round_number < round_number:
+            self.forward()
+        while self._round_number > round_number:
+            self.backward()
+        return self._graph
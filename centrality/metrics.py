@@ -0,0 +1,635 @@
+"""
+Metrics of the states of a game (see Metrics), computed from a registry: every metric declares the intermediate results
+it is computed from (distances, degrees, triangles, components...), and the intermediate results declare their own
+requirements, so that each of them is computed at most once per graph whatever the subset of metrics asked for.
+"""
+from enum import Enum
+
+import numpy as np
+import networkx as nx
+
+from .analysis import RoundAnalysis
+from .graph import ArrayGraph, to_array_graph
+
+
+class Metrics(Enum):
+    # warning round_number > 0
+    macro_degree_assortativity_coefficient = "macro_degree_assortativity_coefficient"
+    # macro_rich_club_coefficient = "macro_rich_club_coefficient"
+
+    macro_transitivity = "macro_transitivity"
+    macro_average_clustering = "macro_average_clustering"
+    macro_is_connected = "macro_is_connected"
+    macro_number_connected_components = "macro_number_connected_components"
+    macro_is_distance_regular = "macro_is_distance_regular"
+    macro_dominating_set = "macro_dominating_set"
+    macro_is_eulerian = "macro_is_eulerian"
+    macro_isolates = "macro_isolates"
+
+    # warning is_connected
+    macro_diameter = "macro_diameter"
+    macro_center = "macro_center"
+    macro_periphery = "macro_periphery"
+    macro_radius = "macro_radius"
+    macro_average_shortest_path_length = "macro_average_shortest_path_length"
+    micro_eccentricity = "micro_eccentricity"
+
+    micro_average_neighbor_degree = "micro_average_neighbor_degree"
+    micro_clustering = "micro_clustering"
+    micro_degree_centrality = "micro_degree_centrality"
+    micro_closeness_centrality = "micro_closeness_centrality"
+    micro_communicability_centrality = "micro_communicability_centrality"
+    micro_load_centrality = "micro_load_centrality"
+    micro_betweenness_centrality = "micro_betweenness_centrality"
+    micro_triangles = "micro_triangles"
+    micro_square_clustering = "micro_square_clustering"
+    micro_core_number = "micro_core_number"
+    micro_closeness_vitality = "micro_closeness_vitality"
+
+
+# name of an intermediate result -> (function, names of the intermediate results given as arguments)
+_INTERMEDIATES = {}
+# Metrics -> (function, names of the intermediate results given as arguments)
+_REGISTRY = {}
+
+
+def _intermediate(name, *requirements):
+    def register(function):
+        _INTERMEDIATES[name] = (function, requirements)
+        return function
+    return register
+
+
+def _metric(metric, *requirements):
+    def register(function):
+        _REGISTRY[metric] = (function, requirements)
+        return function
+    return register
+
+
+def _to_dict(values):
+    return dict(enumerate(values.tolist()))
+
+
+def get_requirements(metrics=None):
+    """
+    :param metrics: iterable of Metrics (default to every metric)
+    :return: set of the names of the intermediate results needed by the metrics, directly or not
+    """
+    names = set()
+    pending = [name for metric in (Metrics if metrics is None else metrics) for name in _REGISTRY[metric][1]]
+    while pending:
+        name = pending.pop()
+        if name not in names:
+            names.add(name)
+            pending.extend(_INTERMEDIATES[name][1] if name in _INTERMEDIATES else ())
+    return names
+
+
+class MetricContext:
+    """
+    Intermediate results of one graph, each computed on first use by the function registered for it
+    """
+    def __init__(self, graph, analysis=None, values=None):
+        """
+        :param graph: ArrayGraph or nx.Graph whose nodes are 0..n-1, it must not be modified while the context is used
+        :param analysis: RoundAnalysis of the same graph, reused for the betweenness (e.g. Game.analysis)
+        :param values: dictionary name -> intermediate result of the same graph already known (see IncrementalMetrics)
+        """
+        self._values = dict(values or {})
+        self._values["graph"] = to_array_graph(graph, copy=False)
+        if analysis is not None:
+            self._values["analysis"] = analysis
+
+    def __contains__(self, name):
+        return name in self._values
+
+    def __getitem__(self, name):
+        """
+        :param name: string, name of an intermediate result
+        :return: the intermediate result, computed with its requirements if needed
+        """
+        if name not in self._values:
+            function, requirements = _INTERMEDIATES[name]
+            self._values[name] = function(*[self[requirement] for requirement in requirements])
+        return self._values[name]
+
+    def compute(self, metric):
+        """
+        :param metric: Metrics
+        :return: value of the metric
+        """
+        function, requirements = _REGISTRY[metric]
+        return function(*[self[requirement] for requirement in requirements])
+
+
+def get_column_names(metrics=None):
+    """
+    :param metrics: iterable of Metrics (default to every metric)
+    :return: [string], names of the metrics
+    """
+    return [metric.value for metric in (Metrics if metrics is None else metrics)]
+
+
+def get_metrics(graph, metrics=None, analysis=None):
+    """
+    :param graph: ArrayGraph or nx.Graph, state of the game
+    :param metrics: iterable of Metrics (default to every metric, in the order of Metrics)
+    :param analysis: RoundAnalysis of the graph, reused for the betweenness
+    :return: list of the values of the metrics, in the given order
+    """
+    context = MetricContext(graph, analysis)
+    return [context.compute(metric) for metric in (Metrics if metrics is None else metrics)]
+
+
+def _get_snapshot_metrics(nb_nodes, edges, metrics):
+    """
+    Metrics of a snapshot sent to a worker process
+    :param nb_nodes: int, number of nodes
+    :param edges: (nb_edges, 2) int array of the edges
+    :param metrics: list of Metrics
+    :return: list of the values of the metrics
+    """
+    return get_metrics(ArrayGraph.from_edges(nb_nodes, edges), metrics)
+
+
+class MetricsTable:
+    """
+    Metrics of the rounds of a game computed in background (see observer.AsyncMetricsObserver). Each row is a future
+    (e.g. multiprocessing AsyncResult) of the metrics of a round, in round order. Adding a row never waits, reading
+    waits for the rows read: get_row for one round, and to_store or any attribute of metricstore.MetricsStore (get,
+    to_frame, table[metric]...) for the whole table.
+    """
+    def __init__(self, nb_nodes, metrics=None, capacity=16):
+        """
+        :param nb_nodes: int, number of nodes
+        :param metrics: iterable of Metrics, metrics of a row (default to every metric)
+        :param capacity: int, number of rounds preallocated in the store
+        """
+        from .metricstore import MetricsStore
+        self._futures = []
+        # rows already collected
+        self._store = MetricsStore(nb_nodes, metrics, capacity)
+
+    def __len__(self):
+        """
+        :return: int, number of rows, computed or not
+        """
+        return len(self._futures)
+
+    def append(self, future):
+        """
+        :param future: object whose get() returns the list of the values of the metrics of the next round
+        :return: void
+        """
+        self._futures.append(future)
+
+    def ready(self):
+        """
+        :return: boolean, True if every row is computed (reading won't wait)
+        """
+        return all(future.ready() for future in self._futures)
+
+    def get_row(self, round_number):
+        """
+        :param round_number: int, index of the row
+        :return: list of the values of the metrics of that round, waiting for them if needed
+        """
+        return self._futures[round_number].get()
+
+    def to_store(self):
+        """
+        :return: MetricsStore of every row, waiting for the rows not collected yet
+        """
+        for future in self._futures[len(self._store):]:
+            self._store.append(future.get())
+        return self._store
+
+    def __getitem__(self, metric):
+        return self.to_store()[metric]
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return getattr(self.to_store(), name)
+
+
+"""
+Intermediate results
+"""
+
+
+@_intermediate("analysis", "graph")
+def _get_analysis(graph):
+    return RoundAnalysis(graph)
+
+
+@_intermediate("nx_graph", "graph")
+def _get_nx_graph(graph):
+    return graph.to_networkx()
+
+
+@_intermediate("degrees", "graph")
+def _get_degrees(graph):
+    return graph.degree()
+
+
+@_intermediate("adjacency", "graph")
+def _get_adjacency(graph):
+    nb_nodes = graph.number_of_nodes()
+    adjacency = np.zeros((nb_nodes, nb_nodes))
+    edges = graph.edge_array()
+    adjacency[edges[:, 0], edges[:, 1]] = 1
+    adjacency[edges[:, 1], edges[:, 0]] = 1
+    return adjacency
+
+
+@_intermediate("triangles", "nx_graph")
+def _get_triangles(nx_graph):
+    triangles = nx.triangles(nx_graph)
+    return np.array([triangles[node] for node in range(len(triangles))], dtype=np.int64)
+
+
+@_intermediate("clustering", "triangles", "degrees")
+def _get_clustering(triangles, degrees):
+    pairs = degrees * (degrees - 1.)
+    return np.divide(2. * triangles, pairs, out=np.zeros(len(degrees)), where=pairs > 0)
+
+
+@_intermediate("core_number", "nx_graph")
+def _get_core_number(nx_graph):
+    core_number = nx.core_number(nx_graph)
+    return np.array([core_number[node] for node in range(len(core_number))], dtype=np.int64)
+
+
+@_intermediate("components", "nx_graph")
+def _get_components(nx_graph):
+    """
+    :return: int array, label of the connected component of each node (the labels are not necessarily consecutive)
+    """
+    labels = np.zeros(nx_graph.number_of_nodes(), dtype=np.int64)
+    for index, component in enumerate(nx.connected_components(nx_graph)):
+        labels[list(component)] = index
+    return labels
+
+
+@_intermediate("distances", "graph")
+def _get_distances(graph):
+    """
+    :return: (nb_nodes, nb_nodes) int array of the distances (-1 if unreachable), from bit-parallel BFS of all the
+    nodes by batches of sources
+    """
+    nb_nodes = graph.number_of_nodes()
+    distances = np.empty((nb_nodes, nb_nodes), dtype=np.int32)
+    batch_size = graph.get_batch_size()
+    for start in range(0, nb_nodes, batch_size):
+        distances[start:start + batch_size] = graph.bitset_distances(np.arange(start, min(start + batch_size,
+                                                                                          nb_nodes)))
+    return distances
+
+
+@_intermediate("eccentricity", "distances")
+def _get_eccentricity(distances):
+    """
+    :return: int array of the eccentricity of each node, None if the graph isn't connected
+    """
+    if not len(distances) or (distances < 0).any():
+        return None
+    return distances.max(axis=1)
+
+
+"""
+Macro metrics
+"""
+
+
+@_metric(Metrics.macro_degree_assortativity_coefficient, "nx_graph")
+def _get_degree_assortativity_coefficient(nx_graph):
+    if not nx_graph.number_of_edges():
+        return None
+    return nx.degree_assortativity_coefficient(nx_graph)
+
+
+@_metric(Metrics.macro_transitivity, "triangles", "degrees")
+def _get_transitivity(triangles, degrees):
+    triads = int((degrees * (degrees - 1) // 2).sum())
+    return float(triangles.sum()) / triads if triangles.any() else 0
+
+
+@_metric(Metrics.macro_average_clustering, "clustering")
+def _get_average_clustering(clustering):
+    return float(clustering.mean())
+
+
+@_metric(Metrics.macro_is_connected, "components")
+def _is_connected(components):
+    return len(components) > 0 and bool((components == components[0]).all())
+
+
+@_metric(Metrics.macro_number_connected_components, "components")
+def _get_number_connected_components(components):
+    return len(np.unique(components))
+
+
+@_metric(Metrics.macro_is_distance_regular, "nx_graph")
+def _is_distance_regular(nx_graph):
+    return nx.is_distance_regular(nx_graph)
+
+
+@_metric(Metrics.macro_dominating_set, "nx_graph")
+def _get_dominating_set(nx_graph):
+    return nx.dominating_set(nx_graph)
+
+
+@_metric(Metrics.macro_is_eulerian, "degrees", "components")
+def _is_eulerian(degrees, components):
+    return _is_connected(components) and not (degrees % 2).any()
+
+
+@_metric(Metrics.macro_isolates, "degrees")
+def _get_isolates(degrees):
+    return np.flatnonzero(degrees == 0).tolist()
+
+
+@_metric(Metrics.macro_diameter, "eccentricity")
+def _get_diameter(eccentricity):
+    return None if eccentricity is None else int(eccentricity.max())
+
+
+@_metric(Metrics.macro_center, "eccentricity")
+def _get_center(eccentricity):
+    return None if eccentricity is None else np.flatnonzero(eccentricity == eccentricity.min()).tolist()
+
+
+@_metric(Metrics.macro_periphery, "eccentricity")
+def _get_periphery(eccentricity):
+    return None if eccentricity is None else np.flatnonzero(eccentricity == eccentricity.max()).tolist()
+
+
+@_metric(Metrics.macro_radius, "eccentricity")
+def _get_radius(eccentricity):
+    return None if eccentricity is None else int(eccentricity.min())
+
+
+@_metric(Metrics.macro_average_shortest_path_length, "distances", "eccentricity")
+def _get_average_shortest_path_length(distances, eccentricity):
+    if eccentricity is None:
+        return None
+    nb_nodes = len(distances)
+    return int(distances.sum(dtype=np.int64)) / (nb_nodes * (nb_nodes - 1)) if nb_nodes > 1 else 0
+
+
+"""
+Micro metrics, dictionaries node -> value
+"""
+
+
+@_metric(Metrics.micro_eccentricity, "eccentricity")
+def _get_micro_eccentricity(eccentricity):
+    return None if eccentricity is None else _to_dict(eccentricity)
+
+
+@_metric(Metrics.micro_average_neighbor_degree, "graph", "degrees")
+def _get_average_neighbor_degree(graph, degrees):
+    indptr, indices = graph.to_csr()
+    sums = np.bincount(np.repeat(np.arange(len(degrees)), degrees), weights=degrees[indices].astype(float),
+                       minlength=len(degrees))
+    return _to_dict(np.divide(sums, degrees, out=np.zeros(len(degrees)), where=degrees > 0))
+
+
+@_metric(Metrics.micro_clustering, "clustering")
+def _get_micro_clustering(clustering):
+    return _to_dict(clustering)
+
+
+@_metric(Metrics.micro_degree_centrality, "degrees")
+def _get_degree_centrality(degrees):
+    if len(degrees) <= 1:
+        return {node: 1 for node in range(len(degrees))}
+    return _to_dict(degrees / (len(degrees) - 1.))
+
+
+@_metric(Metrics.micro_closeness_centrality, "distances")
+def _get_closeness_centrality(distances):
+    """
+    Same values as nx.closeness_centrality: the closeness within the component of the node, scaled by the fraction of
+    the nodes in that component
+    """
+    nb_nodes = len(distances)
+    reachable = (distances > 0).sum(axis=1)
+    total = np.where(distances > 0, distances, 0).sum(axis=1, dtype=np.int64)
+    closeness = np.zeros(nb_nodes)
+    if nb_nodes > 1:
+        connected = total > 0
+        closeness[connected] = reachable[connected] ** 2 / (total[connected] * (nb_nodes - 1.))
+    return _to_dict(closeness)
+
+
+@_metric(Metrics.micro_communicability_centrality, "adjacency")
+def _get_communicability_centrality(adjacency):
+    """
+    Subgraph centrality, from the eigendecomposition of the adjacency matrix (as nx.communicability_centrality)
+    """
+    eigenvalues, eigenvectors = np.linalg.eigh(adjacency)
+    return _to_dict((eigenvectors ** 2).dot(np.exp(eigenvalues)))
+
+
+@_metric(Metrics.micro_load_centrality, "nx_graph")
+def _get_load_centrality(nx_graph):
+    return nx.load_centrality(nx_graph)
+
+
+@_metric(Metrics.micro_betweenness_centrality, "analysis")
+def _get_betweenness_centrality(analysis):
+    return _to_dict(analysis.betweenness())
+
+
+@_metric(Metrics.micro_triangles, "triangles")
+def _get_micro_triangles(triangles):
+    return _to_dict(triangles)
+
+
+@_metric(Metrics.micro_square_clustering, "nx_graph")
+def _get_square_clustering(nx_graph):
+    return nx.square_clustering(nx_graph)
+
+
+@_metric(Metrics.micro_core_number, "core_number")
+def _get_micro_core_number(core_number):
+    return _to_dict(core_number)
+
+
+@_metric(Metrics.micro_closeness_vitality, "nx_graph")
+def _get_closeness_vitality(nx_graph):
+    return nx.closeness_vitality(nx_graph)
+
+
+"""
+Incremental maintenance
+"""
+
+
+class IncrementalMetrics:
+    """
+    Metrics of the successive states of a game. Most rounds toggle a few edges, so the intermediate results that are
+    cheap to update (degrees, triangles, core numbers, components and distances) are maintained from the toggled edges
+    instead of being recomputed, the values derived from them (clustering, eccentricity, closeness...) are computed
+    from the maintained arrays, and the other metrics are computed from scratch through a MetricContext seeded with
+    them. A round that changes nothing returns the metrics of the previous round without computing anything.
+
+    Only the intermediate results needed by the chosen metrics are maintained.
+    """
+    MAINTAINED = ("degrees", "triangles", "core_number", "components", "distances")
+
+    def __init__(self, graph, metrics=None):
+        """
+        :param graph: ArrayGraph or nx.Graph whose nodes are 0..n-1, first state (copied)
+        :param metrics: iterable of Metrics (default to every metric, in the order of Metrics)
+        """
+        self._metrics = list(Metrics if metrics is None else metrics)
+        self._graph = to_array_graph(graph)
+        requirements = get_requirements(self._metrics)
+        context = MetricContext(self._graph)
+        self._values = {name: context[name].copy() for name in self.MAINTAINED if name in requirements}
+        # metrics of the current state, None until computed
+        self._last = None
+
+    @property
+    def graph(self):
+        """
+        ArrayGraph of the current state, it must not be modified
+        """
+        return self._graph
+
+    def update(self, toggles):
+        """
+        Move to the next state
+        :param toggles: iterable of edges (u, v), edges added or removed since the current state (e.g.
+        GameHistory.get_toggles)
+        :return: void
+        """
+        for u, v in np.asarray(toggles, dtype=np.int64).reshape(-1, 2).tolist():
+            self._toggle(u, v)
+
+    def _toggle(self, u, v):
+        graph, values = self._graph, self._values
+        added = not graph.has_edge(u, v)
+        sign = 1 if added else -1
+        self._last = None
+
+        if "triangles" in values:
+            # the common neighbors are the same with or without the edge
+            common = np.intersect1d(graph.neighbors(u), graph.neighbors(v))
+            triangles = values["triangles"]
+            triangles[[u, v]] += sign * len(common)
+            triangles[common] += sign
+
+        distances = values.get("distances")
+        # the sources whose shortest path DAG may use the edge, before it is removed
+        sources = None if added or distances is None else np.flatnonzero(distances[:, u] != distances[:, v])
+
+        graph.toggle_edge(u, v)
+
+        if "degrees" in values:
+            values["degrees"][[u, v]] += sign
+        if "components" in values:
+            _update_components(graph, values["components"], u, v, added)
+        if "core_number" in values:
+            _update_core_number(graph, values["core_number"], u, v, added)
+        if distances is not None:
+            if added:
+                _add_distances(distances, u, v)
+            else:
+                _remove_distances(graph, distances, sources)
+
+    def get_metrics(self, analysis=None):
+        """
+        :param analysis: RoundAnalysis of the current state, reused for the betweenness
+        :return: list of the values of the metrics of the current state, in the order given to the constructor
+        """
+        if self._last is None:
+            context = MetricContext(self._graph, analysis, self._values)
+            self._last = [context.compute(metric) for metric in self._metrics]
+        return list(self._last)
+
+
+def _update_components(graph, components, u, v, added):
+    """
+    Merge the components of u and v after the edge is added, or split them if removing the edge disconnected v from u
+    """
+    if added:
+        if components[u] != components[v]:
+            components[components == components[v]] = components[u]
+        return
+
+    reached = graph.bitset_distances(np.array([u]))[0] >= 0
+    if not reached[v]:
+        components[reached] = components.max() + 1
+
+
+def _get_subcore(graph, core_number, roots, k):
+    """
+    :return: set of the nodes of core number k connected to the roots through nodes of core number k
+    """
+    subcore = set(roots)
+    stack = list(roots)
+    while stack:
+        node = stack.pop()
+        for neighbor in graph.neighbors(node).tolist():
+            if core_number[neighbor] == k and neighbor not in subcore:
+                subcore.add(neighbor)
+                stack.append(neighbor)
+    return subcore
+
+
+def _update_core_number(graph, core_number, u, v, added):
+    """
+    Subcore algorithm: toggling the edge (u, v) only changes by one the core number of nodes of core number
+    k = min(core(u), core(v)) connected to the endpoints of core number k through nodes of core number k. These
+    candidates are peeled as in the computation from scratch, but only among themselves: the nodes left move to the
+    (k + 1)-core when the edge is added, the nodes peeled fall to the (k - 1)-core when it is removed.
+    """
+    k = min(core_number[u], core_number[v])
+    candidates = _get_subcore(graph, core_number, [node for node in (u, v) if core_number[node] == k], k)
+    # number of neighbors that can stay in the core of the candidate
+    support = {node: int((core_number[graph.neighbors(node)] >= k).sum()) for node in candidates}
+    # a candidate leaves the (k + 1)-core with at most k supports, the k-core with less than k supports
+    threshold = k if added else k - 1
+
+    peeled = set()
+    stack = [node for node in candidates if support[node] <= threshold]
+    while stack:
+        node = stack.pop()
+        if node in peeled:
+            continue
+        peeled.add(node)
+        for neighbor in graph.neighbors(node).tolist():
+            if neighbor in candidates and neighbor not in peeled:
+                support[neighbor] -= 1
+                if support[neighbor] <= threshold:
+                    stack.append(neighbor)
+
+    changed = list(candidates - peeled if added else peeled)
+    core_number[changed] += 1 if added else -1
+
+
+def _add_distances(distances, u, v):
+    """
+    Shortest paths through the new edge (u, v): d(s, t) = min(d(s, t), d(s, u) + 1 + d(v, t), d(s, v) + 1 + d(u, t))
+    """
+    unreachable = len(distances) + 1
+    dist = np.where(distances < 0, unreachable, distances).astype(np.int64)
+    through = np.minimum(dist[:, u, None] + 1 + dist[None, v], dist[:, v, None] + 1 + dist[None, u])
+    updated = through < dist
+    distances[updated] = through[updated]
+
+
+def _remove_distances(graph, distances, sources):
+    """
+    Only the distances from the sources whose shortest path DAG used the removed edge change, their rows are
+    recomputed (the other rows are unchanged, so are the columns of the sources by symmetry)
+    """
+    batch_size = graph.get_batch_size()
+    for start in range(0, len(sources), batch_size):
+        batch = sources[start:start + batch_size]
+        distances[batch] = graph.bitset_distances(batch)
@@ -0,0 +1,195 @@
+"""
+Columnar storage of the metrics of the rounds of a game (see metrics.Metrics).
+
+Each micro metric is a (rounds, nodes) float32 array, each macro metric whose value is a set of nodes (center,
+periphery, isolates, dominating set) a (rounds, nodes) boolean array, and the other macro metrics are the columns of a
+single (rounds, metrics) float64 array. The arrays are preallocated and their capacity doubles when they are full, so
+appending a round is amortized O(nodes) whatever the length of the game. Missing values (None) are stored as NaN.
+"""
+import json
+
+import numpy as np
+
+from .metrics import Metrics
+
+# macro metrics whose value is a set of nodes
+NODE_SETS = (Metrics.macro_dominating_set, Metrics.macro_isolates, Metrics.macro_center, Metrics.macro_periphery)
+
+
+def _is_micro(metric):
+    return metric.value.startswith("micro_")
+
+
+def read_npz_metrics(filename):
+    """
+    :param filename: string, path of a file written by MetricsStore.save_npz
+    :return: [Metrics], metrics stored in the file (the arrays are not read)
+    """
+    with np.load(filename) as data:
+        return [Metrics(name) for name in json.loads(str(data["header"]))["metrics"]]
+
+
+class MetricsStore:
+    """
+    Metrics of the rounds of a game, one row per played round (the initial state has no row, so row i holds round
+    i + 1 of the history). get returns views of the arrays, to_frame pandas DataFrames sharing their memory.
+    """
+    def __init__(self, nb_nodes, metrics=None, capacity=16):
+        """
+        :param nb_nodes: int, number of nodes
+        :param metrics: iterable of Metrics, metrics of a row in the order given to append (default to every metric)
+        :param capacity: int, number of rounds preallocated
+        """
+        self._nb_nodes = nb_nodes
+        self._metrics = list(Metrics if metrics is None else metrics)
+        self._nb_rounds = 0
+        capacity = max(int(capacity), 1)
+
+        self._macro = [metric for metric in self._metrics if not _is_micro(metric) and metric not in NODE_SETS]
+        # metric -> column of the macro array
+        self._macro_columns = {metric: index for index, metric in enumerate(self._macro)}
+        self._macro_values = np.full((capacity, len(self._macro)), np.nan)
+        # metric -> (rounds, nodes) array
+        self._node_values = {}
+        for metric in self._metrics:
+            if _is_micro(metric):
+                self._node_values[metric] = np.full((capacity, nb_nodes), np.nan, dtype=np.float32)
+            elif metric in NODE_SETS:
+                self._node_values[metric] = np.zeros((capacity, nb_nodes), dtype=bool)
+
+    @property
+    def nb_nodes(self):
+        return self._nb_nodes
+
+    @property
+    def metrics(self):
+        return list(self._metrics)
+
+    def __len__(self):
+        return self._nb_rounds
+
+    def _grow(self):
+        capacity = 2 * len(self._macro_values)
+        macro_values = np.full((capacity, len(self._macro)), np.nan)
+        macro_values[:self._nb_rounds] = self._macro_values[:self._nb_rounds]
+        self._macro_values = macro_values
+        for metric, values in self._node_values.items():
+            grown = np.zeros((capacity, self._nb_nodes), dtype=values.dtype)
+            if values.dtype != bool:
+                grown.fill(np.nan)
+            grown[:self._nb_rounds] = values[:self._nb_rounds]
+            self._node_values[metric] = grown
+
+    def append(self, row):
+        """
+        Add the metrics of the next round
+        :param row: list of the values of the metrics in the order of self.metrics (see metrics.get_metrics), micro
+        metrics being dictionaries node -> value and node sets iterables of nodes
+        :return: void
+        """
+        if self._nb_rounds == len(self._macro_values):
+            self._grow()
+        index = self._nb_rounds
+
+        for metric, value in zip(self._metrics, row):
+            if metric in self._macro_columns:
+                self._macro_values[index, self._macro_columns[metric]] = np.nan if value is None else float(value)
+            elif value is None:
+                continue
+            elif metric in NODE_SETS:
+                self._node_values[metric][index, list(value)] = True
+            else:
+                self._node_values[metric][index, list(value.keys())] = list(value.values())
+
+        self._nb_rounds += 1
+
+    def extend(self, store):
+        """
+        Add the rounds of another store
+        :param store: MetricsStore with the same nodes and metrics (e.g. the metrics of the following rounds)
+        :return: void
+        """
+        if store.nb_nodes != self._nb_nodes or store.metrics != self._metrics:
+            raise Exception("The stores don't have the same nodes and metrics")
+        while len(self._macro_values) < self._nb_rounds + len(store):
+            self._grow()
+        rounds = slice(self._nb_rounds, self._nb_rounds + len(store))
+        self._macro_values[rounds] = store._macro_values[:len(store)]
+        for metric, values in self._node_values.items():
+            values[rounds] = store.get(metric)
+        self._nb_rounds += len(store)
+
+    def get(self, metric):
+        """
+        :param metric: Metrics or its name
+        :return: view of the values of the metric, (rounds,) float array for macro metrics, (rounds, nodes) float32
+        array for micro metrics and boolean array for node sets
+        """
+        metric = Metrics(metric)
+        if metric in self._macro_columns:
+            return self._macro_values[:self._nb_rounds, self._macro_columns[metric]]
+        return self._node_values[metric][:self._nb_rounds]
+
+    def __getitem__(self, metric):
+        return self.get(metric)
+
+    def to_frame(self, metric=None):
+        """
+        :param metric: Metrics or its name, None for the macro metrics
+        :return: pd.DataFrame sharing the memory of the store (until the next append that grows the arrays), rounds as
+        rows and either the macro metrics (except node sets) or the nodes as columns
+        """
+        import pandas as pd
+        if metric is None:
+            return pd.DataFrame(self._macro_values[:self._nb_rounds], columns=[macro.value for macro in self._macro],
+                                copy=False)
+        return pd.DataFrame(self.get(metric), copy=False)
+
+    """
+    Export
+    """
+    def _get_arrays(self):
+        arrays = {metric.value: self.get(metric) for metric in self._node_values}
+        arrays["macro"] = self._macro_values[:self._nb_rounds]
+        return arrays
+
+    def save_npz(self, filename):
+        """
+        :param filename: string, path of the compressed npz file, one array per micro metric and node set plus the
+        macro array
+        :return: void
+        """
+        header = json.dumps({"nb_nodes": self._nb_nodes, "metrics": [metric.value for metric in self._metrics]})
+        np.savez_compressed(filename, header=np.array(header), **self._get_arrays())
+
+    @classmethod
+    def load_npz(cls, filename):
+        """
+        :param filename: string, path of a file written by save_npz
+        :return: MetricsStore
+        """
+        with np.load(filename) as data:
+            header = json.loads(str(data["header"]))
+            metrics = [Metrics(name) for name in header["metrics"]]
+            nb_rounds = len(data["macro"])
+            store = cls(header["nb_nodes"], metrics, nb_rounds)
+            store._macro_values[:nb_rounds] = data["macro"]
+            for metric in store._node_values:
+                store._node_values[metric][:nb_rounds] = data[metric.value]
+        store._nb_rounds = nb_rounds
+        return store
+
+    def to_parquet(self, filename):
+        """
+        Write one row per round: the macro metrics, then one column metric/node per node of every micro metric and
+        node set (needs pyarrow or fastparquet)
+        :param filename: string, path of the parquet file
+        :return: void
+        """
+        import pandas as pd
+        frames = [self.to_frame()]
+        for metric in self._node_values:
+            frame = self.to_frame(metric)
+            frame.columns = ["%s/%s" % (metric.value, node) for node in range(self._nb_nodes)]
+            frames.append(frame)
+        pd.concat(frames, axis=1).to_parquet(filename)
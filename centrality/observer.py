@@ -0,0 +1,134 @@
+"""
+Observers of a game: everything that is not needed to play (printing, plotting, metrics) is done by observers notified
+by Game.play_game and Game.play_round, so that a headless game (Game.headless) only runs the strategies.
+
+The plotting and metrics modules are imported when first used, a headless game never imports matplotlib.
+"""
+import multiprocessing
+
+
+class GameObserver:
+    """
+    Base observer, the hooks do nothing and can be overridden independently
+    """
+    def on_game_start(self, game):
+        """
+        Called by play_game before the first round
+        :param game: Game, game in its initial state
+        :return: void
+        """
+        pass
+
+    def on_round_end(self, game):
+        """
+        Called after each round, once the graph and the history are updated
+        :param game: Game, game at the end of the round (game.current_step)
+        :return: void
+        """
+        pass
+
+    def on_game_end(self, game):
+        """
+        Called by play_game after the last round
+        :param game: Game, game in its final state
+        :return: void
+        """
+        pass
+
+
+class PrintObserver(GameObserver):
+    """
+    Print the progress of the game
+    """
+    def on_game_start(self, game):
+        print("Here is the initial state of the game")
+
+    def on_round_end(self, game):
+        print("The game at state %s:" % game.current_step)
+
+
+class PlotObserver(GameObserver):
+    """
+    Plot the state of the game at the start and after each round (see Plotter.plot_state)
+    """
+    def __init__(self, block=True):
+        """
+        :param block: boolean, plt.show blocks until the figure is closed
+        """
+        self._block = block
+        self._plotter = None
+
+    def _plot(self, game):
+        if self._plotter is None:
+            from .plot import Plotter
+            self._plotter = Plotter()
+        self._plotter.plot_state(game, block=self._block)
+
+    def on_game_start(self, game):
+        self._plot(game)
+
+    def on_round_end(self, game):
+        self._plot(game)
+
+
+class MetricsObserver(GameObserver):
+    """
+    Fill game.metrics (metricstore.MetricsStore) with the metrics (see metrics.Metrics) of every round. The metrics are
+    updated from the edges toggled by each round (see metrics.IncrementalMetrics)
+    """
+    def __init__(self, metrics=None):
+        """
+        :param metrics: iterable of Metrics, columns of game.metrics (default to every metric)
+        """
+        self._metrics = None if metrics is None else list(metrics)
+        self._incremental = None
+        # round of the state followed by self._incremental
+        self._round_number = None
+
+    def on_game_start(self, game):
+        from .metricstore import MetricsStore
+        game.metrics = MetricsStore(game.graph.number_of_nodes(), self._metrics, game.rules.nb_max_step)
+
+    def on_round_end(self, game):
+        from .metrics import IncrementalMetrics
+        from .metricstore import MetricsStore
+        if not isinstance(game.metrics, MetricsStore):
+            self.on_game_start(game)
+
+        round_number = len(game.history) - 1
+        if self._incremental is None or self._round_number != round_number - 1:
+            self._incremental = IncrementalMetrics(game.graph, self._metrics)
+        else:
+            self._incremental.update(game.history.get_toggles(round_number))
+        self._round_number = round_number
+
+        # the analysis of the new graph is shared with the players of the next round
+        game.metrics.append(self._incremental.get_metrics(game.analysis))
+
+
+class AsyncMetricsObserver(GameObserver):
+    """
+    Send the graph of every round to a pool of worker processes and fill game.metrics with a metrics.MetricsTable of
+    the pending results, so that the rounds never wait for the metrics: reading game.metrics waits instead.
+    """
+    def __init__(self, metrics=None, nb_workers=None):
+        """
+        :param metrics: iterable of Metrics, columns of game.metrics (default to every metric)
+        :param nb_workers: int, number of worker processes (default to the number of CPUs)
+        """
+        from .metrics import Metrics
+        self._metrics = list(Metrics if metrics is None else metrics)
+        self._nb_workers = nb_workers or multiprocessing.cpu_count()
+
+    def on_game_start(self, game):
+        from .metrics import MetricsTable
+        game.metrics = MetricsTable(game.graph.number_of_nodes(), self._metrics, game.rules.nb_max_step)
+
+    def on_round_end(self, game):
+        from .metrics import MetricsTable, _get_snapshot_metrics
+        from .parallel import get_pool
+        if not isinstance(game.metrics, MetricsTable):
+            self.on_game_start(game)
+        # the edge array is a copy, the game can go on while the snapshot waits in the queue
+        snapshot = (game.graph.number_of_nodes(), game.graph.edge_array(), self._metrics)
+        game.metrics.append(get_pool(self._nb_workers, "metrics").apply_async(_get_snapshot_metrics, snapshot))
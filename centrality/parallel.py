@@ -0,0 +1,149 @@
+"""
+Persistent process pools used by the strategies to evaluate their candidate actions in parallel, and by the background
+computations of the game (see observer.AsyncMetricsObserver).
+
+A candidate evaluator is a module level function evaluate(snapshot, candidates, start, best_value) that returns
+(value, index) for the best candidate, index being None if no candidate beats best_value by more than TOLERANCE. Ties
+(up to TOLERANCE) go to the first candidate in scan order, and find_best_candidate merges the chunks in that order too,
+so the result never depends on the number of workers.
+
+The snapshot (the state of the current move) is sent with every chunk, there is one chunk per worker and per call of
+find_best_candidate. A strategy that calls find_best_candidate several times per move (e.g. once per block of
+candidates) wraps its snapshot in a SharedSnapshot: it is pickled once into shared memory, the chunks only carry its
+name and every worker unpickles it once per move.
+"""
+import atexit
+import multiprocessing
+import pickle
+from multiprocessing import resource_tracker, shared_memory
+
+from .betweenness import TOLERANCE
+
+_pools = {}
+# snapshot of the current move in a worker process: (name of its shared memory, snapshot)
+_worker_snapshot = (None, None)
+
+
+def get_pool(nb_workers, name="candidates"):
+    """
+    :param nb_workers: int, number of worker processes
+    :param name: string, pools of different names are distinct, so that background tasks never delay the evaluation
+    of the candidates
+    :return: multiprocessing.Pool, created on first use and reused by the following moves
+    """
+    pool = _pools.get((name, nb_workers))
+    if pool is None:
+        # the workers share the resource tracker of this process, which frees the shared snapshots (see
+        # SharedSnapshot) instead of one tracker per worker warning about them
+        resource_tracker.ensure_running()
+        pool = multiprocessing.Pool(nb_workers)
+        _pools[(name, nb_workers)] = pool
+    return pool
+
+
+def close_pools():
+    """
+    Terminate every pool created by get_pool
+    :return: void
+    """
+    for pool in _pools.values():
+        pool.terminate()
+    _pools.clear()
+
+
+atexit.register(close_pools)
+
+
+class SharedSnapshot:
+    """
+    Snapshot of a move shared by several calls of find_best_candidate, to be used as a context manager: the shared
+    memory is freed at the end of the move. Nothing is shared if the candidates are evaluated in the current process.
+    """
+    def __init__(self, snapshot, nb_workers=None):
+        """
+        :param snapshot: picklable state shared by all the candidates of the move
+        :param nb_workers: int, number of worker processes of find_best_candidate
+        """
+        self._snapshot = snapshot
+        self._memory = None
+        self.name, self.size = None, 0
+        if nb_workers and nb_workers > 1:
+            data = pickle.dumps(snapshot, protocol=pickle.HIGHEST_PROTOCOL)
+            self._memory = shared_memory.SharedMemory(create=True, size=max(len(data), 1))
+            self._memory.buf[:len(data)] = data
+            self.name, self.size = self._memory.name, len(data)
+
+    def __getstate__(self):
+        # only the name of the shared memory is sent to the workers
+        return {"name": self.name, "size": self.size}
+
+    def __setstate__(self, state):
+        self._snapshot, self._memory = None, None
+        self.name, self.size = state["name"], state["size"]
+
+    def load(self):
+        """
+        :return: the snapshot, unpickled from the shared memory once per move in a worker process
+        """
+        global _worker_snapshot
+        if self._snapshot is not None:
+            return self._snapshot
+        if _worker_snapshot[0] != self.name:
+            memory = shared_memory.SharedMemory(self.name)
+            try:
+                data = bytes(memory.buf[:self.size])
+            finally:
+                memory.close()
+            _worker_snapshot = (self.name, pickle.loads(data))
+        return _worker_snapshot[1]
+
+    def close(self):
+        """
+        Free the shared memory
+        :return: void
+        """
+        if self._memory is not None:
+            self._memory.close()
+            self._memory.unlink()
+            self._memory = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def _evaluate_chunk(task):
+    evaluate, snapshot, start, candidates, best_value = task
+    if isinstance(snapshot, SharedSnapshot):
+        snapshot = snapshot.load()
+    return evaluate(snapshot, candidates, start, best_value)
+
+
+def find_best_candidate(evaluate, snapshot, candidates, best_value, nb_workers=None):
+    """
+    Evaluate the candidates, in parallel if nb_workers > 1, and return the same result as a sequential scan: the
+    first candidate reaching the best value (up to TOLERANCE) wins ties
+    :param evaluate: function, candidate evaluator (see module doc)
+    :param snapshot: picklable state shared by all the candidates, or SharedSnapshot
+    :param candidates: list of candidates
+    :param best_value: float, value to beat
+    :param nb_workers: int, number of worker processes (None or 1 to evaluate in the current process)
+    :return: tuple (best value, index of the best candidate or None if no candidate beats best_value)
+    """
+    if not nb_workers or nb_workers < 2 or len(candidates) < 2:
+        return _evaluate_chunk((evaluate, snapshot, 0, candidates, best_value))
+
+    # contiguous chunks so that the reduction below follows the sequential order
+    chunk_size = -(-len(candidates) // nb_workers)
+    tasks = [(evaluate, snapshot, start, candidates[start:start + chunk_size], best_value)
+             for start in range(0, len(candidates), chunk_size)]
+    results = get_pool(nb_workers).map(_evaluate_chunk, tasks, chunksize=1)
+
+    best_index = None
+    for value, index in results:
+        if index is not None and value - best_value > TOLERANCE:
+            best_value, best_index = value, index
+
+    return best_value, best_index
@@ -2,12 +2,25 @@ from .entity import EntityType
 from .strategy import Strategy
 from .strategy import StrategyBuilder
 from .rules import Rules
-from .plot import Plotter
-
-# remove import matplotlib, shouldn't be here
-import matplotlib.pyplot as plt
 
 import getpass
+import inspect
+import numpy as np
+
+
+def _accepts_analysis(strategy):
+    """
+    :param strategy: callable, custom strategy
+    :return: boolean, True if the strategy accepts the analysis keyword argument (the original custom strategies
+    only take (nb_nodes, node_id, history, impossible_edges, imposed_edges))
+    """
+    try:
+        parameters = inspect.signature(strategy).parameters.values()
+    except (TypeError, ValueError):
+        return False
+    return any(parameter.name == "analysis" or parameter.kind is inspect.Parameter.VAR_KEYWORD
+               for parameter in parameters)
+
 
 class Player:
     def __init__(self, **kwargs):
@@ -17,15 +30,30 @@ class Player:
         self._name = kwargs.get('name', "John")
         self._picture = kwargs.get('picture', "img/default.jpg")
         self._strategy_type = kwargs.get('strategy_type', Strategy.inactive)
-        self._strategy = lambda nb_nodes, node_id, history, impossible_edges, imposed_edges: None
+        self._strategy = lambda nb_nodes, node_id, history, impossible_edges, imposed_edges, analysis=None, \
+            constraints=None: None
+        # batched version of the strategy (see Game.get_actions), None if the strategy can only be called per player
+        self._batch_strategy = None
+        # False once a custom strategy has been set
+        self._default_strategy = True
+        # whether the custom strategy accepts the analysis of the round
+        self._custom_analysis = False
+        # number of worker processes used by the greedy strategy to evaluate its candidate actions
+        self._nb_workers = kwargs.get('nb_workers', None)
+        # whether the approx greedy strategy shares one sample of pairs between all its candidate actions
+        self._common_samples = kwargs.get('common_samples', False)
+        # random stream of the strategy, reseeded by the game from its master seed (see Game.set_seed)
+        self._rng = np.random.default_rng(kwargs.get('seed', None))
 
         if self._strategy_type is Strategy.random_egoist:
             strategy_builder = StrategyBuilder()
-            self._strategy = strategy_builder.get_random_egoist_strategy()
+            self._strategy = strategy_builder.get_random_egoist_strategy(rng=self._rng)
+            self._batch_strategy = strategy_builder.get_random_egoist_batch_strategy()
 
         elif self._strategy_type is Strategy.random:
             strategy_builder = StrategyBuilder()
-            self._strategy = strategy_builder.get_random_strategy()
+            self._strategy = strategy_builder.get_random_strategy(rng=self._rng)
+            self._batch_strategy = strategy_builder.get_random_batch_strategy()
 
         elif self._strategy_type is Strategy.follower:
             strategy_builder = StrategyBuilder()
@@ -33,7 +61,13 @@ class Player:
 
         elif self._strategy_type is Strategy.greedy:
             strategy_builder = StrategyBuilder()
-            self._strategy = strategy_builder.get_greedy_strategy()
+            self._strategy = strategy_builder.get_greedy_strategy(nb_workers=self._nb_workers, rng=self._rng)
+
+        elif self._strategy_type is Strategy.approx_greedy:
+            strategy_builder = StrategyBuilder()
+            self._strategy = strategy_builder.get_approx_greedy_strategy(nb_workers=self._nb_workers,
+                                                                         common_samples=self._common_samples,
+                                                                         rng=self._rng)
 
     """
     API ref, contract of what users should call from the outside
@@ -99,7 +133,55 @@ class Player:
 
     @strategy.setter
     def strategy(self, value):
+        """
+        :param value: function (nb_nodes, node_id, history, impossible_edges, imposed_edges) returning an edge or None,
+        given the RoundAnalysis of the current state as well if it accepts an analysis keyword argument
+        """
         self._strategy = value
+        self._batch_strategy = None
+        self._default_strategy = False
+        self._custom_analysis = _accepts_analysis(value)
+
+    @property
+    def batch_strategy(self):
+        """
+        Strategy answering for several players with the same strategy type at once, None if the player must be asked
+        individually (human players, custom strategies and strategies without a batched version)
+        """
+        if self.type == EntityType.human:
+            return None
+        return self._batch_strategy
+
+    def is_inactive(self):
+        """
+        :return: boolean, True if the player never acts, in which case the game doesn't need to ask for its action
+        """
+        return self.type != EntityType.human and self._default_strategy and self._strategy_type is Strategy.inactive
+
+    def is_deterministic(self):
+        """
+        :return: boolean, True if the action of the player only depends on the current state (the greedy strategy
+        only draws its first move, on an empty graph)
+        """
+        return self.type != EntityType.human and self._default_strategy and \
+            self._strategy_type in (Strategy.inactive, Strategy.follower, Strategy.greedy)
+
+    @property
+    def rng(self):
+        """
+        np.random.Generator of the strategy of the player
+        """
+        return self._rng
+
+    def seed(self, seed):
+        """
+        Restart the random stream of the strategy. The generator object is kept (the strategy holds a reference to
+        it), only the state of its bit generator is replaced.
+        :param seed: None, int or np.random.SeedSequence
+        :return: void
+        """
+        bit_generator = self._rng.bit_generator
+        bit_generator.state = type(bit_generator)(seed).state
 
     def __str__(self):
         return "_".join([self.name, self.strategy_type.value, str(self._node_id)])
@@ -140,8 +222,17 @@ class Player:
             print("Got the second node!")
 
             # should be handle by method plot, either automatic or pressing a key if you want plot to stay on screen
+            # (matplotlib is only imported here so that games without human players can run headless)
+            import matplotlib.pyplot as plt
             plt.close("all")
 
             return u, v
 
+        if self._default_strategy:
+            # the default strategies use the compiled constraints of the game
+            return self.strategy(game.rules.nb_players, node_id, game.history, game.impossible_edges,
+                                 game.imposed_edges, analysis=game.analysis, constraints=game.constraints)
+        if self._custom_analysis:
+            return self.strategy(game.rules.nb_players, node_id, game.history, game.impossible_edges,
+                                 game.imposed_edges, analysis=game.analysis)
         return self.strategy(game.rules.nb_players, node_id, game.history, game.impossible_edges, game.imposed_edges)
@@ -82,21 +82,20 @@ class Plotter:
 
         return labels
 
-    def get_graph_labels_sizes(self, game, round_number, node_list=None):
+    def get_graph_labels_sizes(self, game, round_number, node_list=None, graph=None):
         """
         Compute the labels and sizes of the players according to a given graph state (game + round number)
         :param game: Game, played game
         :param round_number: int, time step/round number of the game
         :param node_list: [int], nodes to be plotted
+        :param graph: ArrayGraph, state of the round if already built (e.g. by a history cursor), left unchanged
         :return: tuple containing a dictionary for the labels and an array for the sizes
         """
 
-        current_graph = nx.Graph()
-        current_graph.add_nodes_from(game.graph.nodes())
-        current_graph.add_edges_from(game.history[round_number])
+        current_graph = graph if graph is not None else game.history.get_graph(round_number)
 
         labels = {}
-        betweenness = nx.betweenness_centrality(current_graph)
+        betweenness = current_graph.betweenness_centrality()
 
         for i in range(game.rules.nb_players):
             player = game.players[i]
@@ -111,7 +110,10 @@ class Plotter:
             else:
                 labels[i] = "other_entity"
 
-        sizes = [(10 * c + 1) * 300 for c in list(betweenness.values())]
+        sizes = [(10 * c + 1) * 300 for c in betweenness.tolist()]
+
+        # drawing is done by networkx
+        current_graph = current_graph.to_networkx()
 
         img = self.get_images(game)
 
@@ -129,17 +131,16 @@ class Plotter:
     Helper functions to build artists to plot metrics given axes ref
     """
     def build_plot_macro(self, game, round_number, metric, ax):
-        df = game.metrics.iloc[:round_number+1, :]
-        pl = ax.plot(df.index.values, df[metric.value])
+        values = game.metrics.get(metric)[:round_number+1]
+        pl = ax.plot(np.arange(len(values)), values)
         plt.title(" ".join(metric.value.split("_")[1:]))
-        plt.axis([-1, len(game.history)+1, df[metric.value].min()-1, df[metric.value].max()+1])
+        plt.axis([-1, len(game.history)+1, np.nanmin(values)-1, np.nanmax(values)+1])
         return pl
 
     def build_plot_micro(self, game, round_number, node_ids, metric, ax):
-        df = game.metrics.iloc[:round_number+1, :]
+        values = game.metrics.get(metric)[:round_number+1]
         for i in node_ids:
-            val = df[metric.value].apply(lambda x: x[i])
-            pl = ax.plot(df.index.values, val)
+            pl = ax.plot(np.arange(len(values)), values[:, i])
             plt.title(" ".join(metric.value.split("_")[1:]))
             # plt.axis([-1, len(game.history)+1, min(df[metric.value].apply(min)) -1, max(df[metric.value].apply(max)) +1])
         return pl
@@ -153,9 +154,8 @@ class Plotter:
         # for i in range(round_number+1):
         #     hi = ax.hist(val[i], alpha=(i*0.05+0.2), color='b')
         # return hi
-        df = game.metrics.iloc[:round_number+1, :]
-        val = df[metric.value].apply(lambda x: list(x.values()))
-        hi = ax.hist(val[round_number], alpha=0.5, color='b')
+        values = game.metrics.get(metric)[round_number]
+        hi = ax.hist(values[~np.isnan(values)], alpha=0.5, color='b')
         plt.title((" ".join(metric.value.split("_")[1:]) + " distribution"))
         return hi
 
@@ -277,7 +277,7 @@ class Plotter:
 
         # nx.draw_networkx(game.graph, pos=positions, node_color=colors)
 
-        _display_graph(game.graph, positions, colors=colors, fig=fig, img=img, labels=labels)
+        _display_graph(game.graph.to_networkx(), positions, colors=colors, fig=fig, img=img, labels=labels)
 
         # _display_graph(game.graph, positions, labels, colors, sizes, alpha, leader_board=leader_board_str,
         #                display_labels=self.labels_interactive_graph, game=game)
@@ -303,7 +303,9 @@ class Plotter:
 
             alpha = self.node_transparency
 
-            graphs = [self.get_graph_labels_sizes(game, round_number, node_list)
+            # the cursor replays the rounds one after the other instead of rebuilding every state
+            cursor = game.history.cursor()
+            graphs = [self.get_graph_labels_sizes(game, round_number, node_list, cursor.seek(round_number))
                       for round_number in range(len(game.history))]
 
             fig = plt.figure()
@@ -424,12 +426,9 @@ def _display_graph(graph, positions=None, labels=None, colors="g", sizes=300, al
                   node_size=sizes, alpha=alpha, **kwargs)
 
 def _get_leader_board(game, round_number, leader_board_size, significant_digits):
-    g = nx.Graph()
-    g.add_nodes_from(game.graph.nodes())
-    g.add_edges_from(game.graph.edges())
-    # g.add_edges_from(game.history[round_number])
+    graph = game.history.get_graph(round_number)
 
-    inverse_table = [(value, key) for key, value in nx.betweenness_centrality(g).items()]
+    inverse_table = [(value, key) for key, value in enumerate(graph.betweenness_centrality())]
     inverse_table = sorted(inverse_table, reverse=True)
     return "Leader board:\n" + "\n".join(
         map(
@@ -101,17 +101,16 @@ class Plotter2:
     Helper functions to build artists to plot metrics given axes ref
     """
     def build_plot_macro(self, game, round_number, metric, ax):
-        df = game.metrics.iloc[:round_number+1, :]
-        pl = ax.plot(df.index.values, df[metric.value])
+        values = game.metrics.get(metric)[:round_number+1]
+        pl = ax.plot(np.arange(len(values)), values)
         plt.title(" ".join(metric.value.split("_")[1:]))
-        plt.axis([-1, len(game.history)+1, df[metric.value].min()-1, df[metric.value].max()+1])
+        plt.axis([-1, len(game.history)+1, np.nanmin(values)-1, np.nanmax(values)+1])
         return pl
 
     def build_plot_micro(self, game, round_number, node_ids, metric, ax):
-        df = game.metrics.iloc[:round_number+1, :]
+        values = game.metrics.get(metric)[:round_number+1]
         for i in node_ids:
-            val = df[metric.value].apply(lambda x: x[i])
-            pl = ax.plot(df.index.values, val)
+            pl = ax.plot(np.arange(len(values)), values[:, i])
             plt.title(" ".join(metric.value.split("_")[1:]))
             # plt.axis([-1, len(game.history)+1, min(df[metric.value].apply(min)) -1, max(df[metric.value].apply(max)) +1])
         return pl
@@ -125,9 +124,8 @@ class Plotter2:
         # for i in range(round_number+1):
         #     hi = ax.hist(val[i], alpha=(i*0.05+0.2), color='b')
         # return hi
-        df = game.metrics.iloc[:round_number+1, :]
-        val = df[metric.value].apply(lambda x: list(x.values()))
-        hi = ax.hist(val[round_number], alpha=0.5, color='b')
+        values = game.metrics.get(metric)[round_number]
+        hi = ax.hist(values[~np.isnan(values)], alpha=0.5, color='b')
         plt.title((" ".join(metric.value.split("_")[1:]) + " distribution"))
         return hi
 
@@ -0,0 +1,261 @@
+"""
+Batch simulations: many independent headless games played by a process pool, one NDJSON line of results per game, and
+the win rates of the strategies with their confidence intervals.
+
+Usage: python -m centrality.simulation --players 20 --steps 7 --strategies greedy random --games 1000 --workers 8
+"""
+import argparse
+import json
+import math
+import multiprocessing
+import time
+from collections import defaultdict
+
+import numpy as np
+
+from .entity import EntityType
+from .game import Game
+from .observer import GameObserver
+from .player import Player
+from .rules import Rules
+from .strategy import Strategy
+
+
+class GameConfig:
+    """
+    Setting of a simulated game: the competitive players (one per strategy) get the first node ids, the remaining
+    nodes are non competitive players
+    """
+    def __init__(self, nb_players, nb_max_step, strategies, impossible_edges=None, name=None, dense_state=False):
+        """
+        :param nb_players: int, number of players (nodes)
+        :param nb_max_step: int, number of rounds
+        :param strategies: [Strategy], strategies of the competitive players
+        :param impossible_edges: list of impossible edges
+        :param name: string, name of the setting in the results (default to players_steps_strategies, followed
+        by _dense for a dense state)
+        :param dense_state: boolean, store the state as packed adjacency bit rows (see Game.dense_state)
+        """
+        self.nb_players = nb_players
+        self.nb_max_step = nb_max_step
+        self.strategies = list(strategies)
+        self.impossible_edges = list(impossible_edges or [])
+        if name is None:
+            # the backend is part of the setting, so the results of dense and array games are never merged
+            name = "_".join([str(nb_players), str(nb_max_step)] +
+                            [strategy.value.replace(" ", "-") for strategy in self.strategies] +
+                            (["dense"] if dense_state else []))
+        self.name = name
+        self.dense_state = dense_state
+
+    def build_game(self, seed=None):
+        """
+        :param seed: int, master seed of the random streams of the game (see Game.set_seed)
+        :return: Game, headless game ready to be played, going through the cycles of states without asking the players
+        (see Game.fast_forward)
+        """
+        rules = Rules()
+        rules.nb_players = self.nb_players
+        rules.nb_max_step = self.nb_max_step
+
+        game = Game()
+        game.rules = rules
+        game.headless = True
+        game.fast_forward = True
+        game.dense_state = self.dense_state
+        if seed is not None:
+            game.set_seed(seed)
+        for index, strategy in enumerate(self.strategies):
+            game.add_player(Player(rules=rules, type=EntityType.competitive_player, name="P%s" % index,
+                                   strategy_type=strategy))
+        game.initialize_graph()
+        game.impossible_edges = list(self.impossible_edges)
+        return game
+
+
+class TimingObserver(GameObserver):
+    """
+    Record the duration of every round
+    """
+    def __init__(self):
+        self.round_times = []
+        self._last = None
+
+    def on_game_start(self, game):
+        self._last = time.perf_counter()
+
+    def on_round_end(self, game):
+        now = time.perf_counter()
+        if self._last is not None:
+            self.round_times.append(now - self._last)
+        self._last = now
+
+
+def get_winner(betweenness):
+    """
+    Winner of a game, ties being broken as in the leader board (highest node id first)
+    :param betweenness: array of the final betweenness of the nodes
+    :return: int, node id of the winner
+    """
+    return max((value, node) for node, value in enumerate(betweenness.tolist()))[1]
+
+
+def play_seeded_game(config, seed):
+    """
+    Play one headless game whose random streams derive from the seed, so the same (config, seed) always gives the same
+    game.
+    :param config: GameConfig, setting of the game
+    :param seed: int, seed of the game
+    :return: dictionary, compact results of the game (one NDJSON line)
+    """
+    game = config.build_game(seed)
+    timing = TimingObserver()
+    game.observers.append(timing)
+
+    start = time.perf_counter()
+    game.play_game()
+    total_time = time.perf_counter() - start
+
+    betweenness = game.analysis.betweenness()
+    winner = get_winner(betweenness)
+    return {
+        "config": config.name,
+        "seed": seed,
+        "nb_players": config.nb_players,
+        "nb_max_step": config.nb_max_step,
+        "winner": winner,
+        "winner_strategy": game.players[winner].strategy_type.value,
+        "betweenness": [round(value, 6) for value in betweenness.tolist()],
+        "round_times": [round(value, 6) for value in timing.round_times],
+        "cycle": game.cycle,
+        "time": round(total_time, 6)
+    }
+
+
+def _play_task(task):
+    return play_seeded_game(*task)
+
+
+def get_seeds(master_seed, nb_games):
+    """
+    :param master_seed: int, seed of the batch
+    :param nb_games: int, number of games
+    :return: [int], independent seeds of the games
+    """
+    return [int(seed.generate_state(1, np.uint64)[0])
+            for seed in np.random.SeedSequence(master_seed).spawn(nb_games)]
+
+
+def run_batch(configs, nb_games, filename, nb_workers=None, master_seed=0, chunk_size=None):
+    """
+    Play nb_games games of every setting and append their results to filename as soon as they are finished (NDJSON,
+    in completion order). The games are independent, so the throughput grows with the number of workers.
+    :param configs: [GameConfig], settings to simulate
+    :param nb_games: int, number of games per setting
+    :param filename: string, path of the results file
+    :param nb_workers: int, number of worker processes (None or 1 to play in the current process)
+    :param master_seed: int, seed from which the seeds of the games are derived
+    :param chunk_size: int, number of games sent to a worker at once (default to about 4 chunks per worker)
+    :return: int, number of games played
+    """
+    seeds = get_seeds(master_seed, nb_games * len(configs))
+    tasks = [(config, seeds[index * nb_games + game])
+             for index, config in enumerate(configs) for game in range(nb_games)]
+
+    with open(filename, "a") as handle:
+        if not nb_workers or nb_workers < 2:
+            for task in tasks:
+                handle.write(json.dumps(_play_task(task)) + "\n")
+            return len(tasks)
+
+        if chunk_size is None:
+            chunk_size = max(1, len(tasks) // (4 * nb_workers))
+        with multiprocessing.Pool(nb_workers) as pool:
+            for result in pool.imap_unordered(_play_task, tasks, chunksize=chunk_size):
+                handle.write(json.dumps(result) + "\n")
+
+    return len(tasks)
+
+
+def read_results(filename):
+    """
+    :param filename: string, path of a results file written by run_batch
+    :return: generator of the results of the games
+    """
+    with open(filename) as handle:
+        for line in handle:
+            if line.strip():
+                yield json.loads(line)
+
+
+def get_confidence_interval(nb_wins, nb_games, z=1.96):
+    """
+    Wilson score interval of a win probability
+    :param nb_wins: int, number of games won
+    :param nb_games: int, number of games
+    :param z: float, quantile of the normal distribution (1.96 for 95%)
+    :return: tuple (lower bound, upper bound)
+    """
+    if not nb_games:
+        return 0., 1.
+    p = nb_wins / float(nb_games)
+    denominator = 1 + z ** 2 / nb_games
+    center = (p + z ** 2 / (2 * nb_games)) / denominator
+    margin = z * math.sqrt(p * (1 - p) / nb_games + z ** 2 / (4 * nb_games ** 2)) / denominator
+    return max(0., center - margin), min(1., center + margin)
+
+
+def aggregate_results(results, z=1.96):
+    """
+    Win probability of every strategy in every setting
+    :param results: iterable of game results (e.g. read_results(filename))
+    :param z: float, quantile of the normal distribution of the confidence intervals (1.96 for 95%)
+    :return: dictionary setting name -> {"games": number of games, "mean_time": mean time per game,
+    "win_rates": {strategy: (probability, lower bound, upper bound)}}
+    """
+    games = defaultdict(int)
+    times = defaultdict(float)
+    wins = defaultdict(lambda: defaultdict(int))
+    for result in results:
+        games[result["config"]] += 1
+        times[result["config"]] += result["time"]
+        wins[result["config"]][result["winner_strategy"]] += 1
+
+    res = {}
+    for name, nb_games in games.items():
+        win_rates = {}
+        for strategy, nb_wins in sorted(wins[name].items()):
+            win_rates[strategy] = (nb_wins / float(nb_games),) + get_confidence_interval(nb_wins, nb_games, z)
+        res[name] = {"games": nb_games, "mean_time": times[name] / nb_games, "win_rates": win_rates}
+    return res
+
+
+def _get_strategy(name):
+    for strategy in Strategy:
+        if name in (strategy.name, strategy.value):
+            return strategy
+    raise Exception("Unknown strategy %s" % name)
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description="Play many headless games and estimate the win rates")
+    parser.add_argument("--players", type=int, default=20, help="number of players")
+    parser.add_argument("--steps", type=int, default=7, help="number of rounds")
+    parser.add_argument("--strategies", nargs="+", default=["greedy", "greedy"],
+                        help="strategies of the competitive players")
+    parser.add_argument("--games", type=int, default=100, help="number of games")
+    parser.add_argument("--workers", type=int, default=multiprocessing.cpu_count(), help="number of processes")
+    parser.add_argument("--seed", type=int, default=0, help="master seed")
+    parser.add_argument("--output", default="results.ndjson", help="results file (appended)")
+    parser.add_argument("--dense", action="store_true", help="store the states as packed adjacency bit rows")
+    args = parser.parse_args()
+
+    config = GameConfig(args.players, args.steps, [_get_strategy(name) for name in args.strategies],
+                        dense_state=args.dense)
+    run_batch([config], args.games, args.output, args.workers, args.seed)
+
+    summary = aggregate_results(read_results(args.output))[config.name]
+    print("%s: %s games, %.3fs per game" % (config.name, summary["games"], summary["mean_time"]))
+    for strategy, (p, low, high) in summary["win_rates"].items():
+        print("  %s: %.3f [%.3f, %.3f]" % (strategy, p, low, high))
@@ -1,6 +1,11 @@
-from random import randint
-import networkx as nx
-import itertools
+import numpy as np
+
+from .analysis import RoundAnalysis
+from .approximation import approximate_betweenness_centrality, SampledPairsBetweenness
+from .betweenness import DynamicBetweenness, TOLERANCE
+from .constraints import ConstraintIndex
+from .graph import ArrayGraph
+from .parallel import find_best_candidate, SharedSnapshot
 
 # import sys
 # sys.path.insert(1, '..')
@@ -15,28 +20,42 @@ class Strategy(Enum):
     random = "random"
     follower = "follower"
     greedy = "greedy"
+    approx_greedy = "approx greedy"
 
 
 class StrategyBuilder:
     """
     The strategies could be defined as static from a pure code point of view but we don't define them this way to
     ensure that each player instantiate a strategy object so that they don't share the exact same strategy in memory.
+
+    Every strategy accepts an optional RoundAnalysis of the current state (given by the Game, shared by all the players
+    of the round), the strategies that need it build it from the last state of the history (GameHistory) otherwise.
+
+    The randomness of a strategy comes from the np.random.Generator given to its builder (the stream of its player,
+    see Player.seed), a new unseeded generator being used by default. The batched strategies draw from the generator
+    given at each call (the stream of the game).
+
+    The default strategies also accept the compiled constraints of the game (ConstraintIndex, given by the Game with
+    the group bans and degree caps), they compile the impossible and imposed edges otherwise.
     """
     @staticmethod
-    def get_random_egoist_edge(nb_nodes, node_id, history, impossible_edges, imposed_edges):
+    def get_random_egoist_edge(nb_nodes, node_id, history, impossible_edges, imposed_edges, rng=None,
+                               constraints=None):
         """
         Helper function that returns an edge between node_id and a node chosen uniformly at random in the set of
         remaining nodes
         :param nb_nodes: Number of players
         :param node_id: Id of the node calling the function
+        :param rng: np.random.Generator, source of randomness
+        :param constraints: ConstraintIndex, compiled constraints of the game
         :return: tuple (node_id, id of another random node)
         """
-        impossible_nodes = set([i[0] if i[0] != node_id else i[1] for i in impossible_edges if node_id in i])
-        other_nodes = set(range(nb_nodes))
-        other_nodes.remove(node_id)
-        other_nodes = list(other_nodes - impossible_nodes)
+        if rng is None:
+            rng = np.random.default_rng()
+        constraints = _get_constraints(nb_nodes, impossible_edges, imposed_edges, constraints)
 
-        return node_id, other_nodes[randint(0, len(other_nodes)-1)]
+        other_nodes = np.flatnonzero(~constraints.get_impossible_row(node_id))
+        return node_id, int(other_nodes[int(rng.integers(len(other_nodes)))])
 
         # other_nodes = list(range(nb_nodes))
         # other_nodes.remove(node_id)
@@ -48,33 +67,105 @@ class StrategyBuilder:
         Define and return the inactive strategy
         :return: function that returns None when being called (player won't do anything)
         """
-        def inactive_strategy(nb_nodes, node_id, history, impossible_edges, imposed_edges):
+        def inactive_strategy(nb_nodes, node_id, history, impossible_edges, imposed_edges, analysis=None,
+                              constraints=None):
             return None
         return inactive_strategy
 
     @staticmethod
-    def get_random_strategy():
+    def get_random_strategy(rng=None):
         """
         Define and return the random strategy
+        :param rng: np.random.Generator, source of randomness
         :return: function that returns a random action (random edge) knowing that a looping edge (u == v) is not
         allowed in the game and is therefore replaced by None
         """
-        def random_strategy(nb_nodes, node_id, history, impossible_edges, imposed_edges):
-            u, v = randint(0, nb_nodes - 1), randint(0, nb_nodes - 1)
+        if rng is None:
+            rng = np.random.default_rng()
+
+        def random_strategy(nb_nodes, node_id, history, impossible_edges, imposed_edges, analysis=None,
+                            constraints=None):
+            u, v = rng.integers(nb_nodes, size=2).tolist()
             if u == v:
                 return None
             else:
                 return u, v
         return random_strategy
 
-    def get_random_egoist_strategy(self):
+    @staticmethod
+    def get_random_egoist_edges(nb_nodes, node_ids, impossible_edges, rng=None, constraints=None):
+        """
+        Vectorized get_random_egoist_edge: for each node, an edge to a node chosen uniformly at random among the other
+        nodes it can be connected to, all the nodes being drawn by a single call to the generator (plus one call per
+        rejection round if there are impossible edges)
+        :param nb_nodes: Number of players
+        :param node_ids: array of ids of the nodes calling the function
+        :param impossible_edges: list of impossible edges
+        :param rng: np.random.Generator, source of randomness
+        :param constraints: ConstraintIndex, compiled constraints of the game
+        :return: (len(node_ids), 2) int array, row i being (node_ids[i], random node) or a looping edge if node_ids[i]
+        can't be connected to any node
+        """
+        if rng is None:
+            rng = np.random.default_rng()
+        constraints = _get_constraints(nb_nodes, impossible_edges, (), constraints)
+
+        node_ids = np.asarray(node_ids, dtype=np.int64)
+        others = rng.integers(max(nb_nodes - 1, 1), size=len(node_ids))
+        others += others >= node_ids
+
+        # nodes for which every edge is impossible do nothing
+        stuck = constraints.count_impossible(node_ids) >= nb_nodes - 1
+        others[stuck] = node_ids[stuck]
+
+        # rejection sampling, which keeps the uniform distribution over the possible nodes
+        rejected = np.flatnonzero(constraints.are_impossible(node_ids, others) & ~stuck)
+        while rejected.size:
+            draw = rng.integers(nb_nodes - 1, size=rejected.size)
+            others[rejected] = draw + (draw >= node_ids[rejected])
+            rejected = rejected[constraints.are_impossible(node_ids[rejected], others[rejected])]
+
+        return np.column_stack((node_ids, others))
+
+    @staticmethod
+    def get_random_batch_strategy():
+        """
+        Define and return the batched random strategy, which draws the actions of several players at once
+        :return: function that returns a (len(node_ids), 2) int array of random actions (random edges) drawn by a single
+        call to rng, a looping edge (u == v) meaning no action
+        """
+        def random_batch_strategy(nb_nodes, node_ids, history, impossible_edges, imposed_edges, analysis=None,
+                                  rng=None, constraints=None):
+            if rng is None:
+                rng = np.random.default_rng()
+            return rng.integers(nb_nodes, size=(len(node_ids), 2))
+        return random_batch_strategy
+
+    def get_random_egoist_batch_strategy(self):
+        """
+        Define and return the batched random egoist strategy, which draws the actions of several players at once
+        :return: function that returns a (len(node_ids), 2) int array of random actions, row i having node_ids[i] as
+        one end, a looping edge (u == v) meaning no action
+        """
+        def random_egoist_batch_strategy(nb_nodes, node_ids, history, impossible_edges, imposed_edges, analysis=None,
+                                         rng=None, constraints=None):
+            return self.get_random_egoist_edges(nb_nodes, node_ids, impossible_edges, rng, constraints)
+        return random_egoist_batch_strategy
+
+    def get_random_egoist_strategy(self, rng=None):
         """
         Define and return the random egoist strategy (modified edge is random but has the current node as one end)
+        :param rng: np.random.Generator, source of randomness
         :return: function that returns a random action (random edge) knowing that a looping edge (u == v) is not
         allowed in the game and is therefore replaced by None
         """
-        def random_egoist_strategy(nb_nodes, node_id, history, impossible_edges, imposed_edges):
-            return self.get_random_egoist_edge(nb_nodes, node_id, history, impossible_edges, imposed_edges)
+        if rng is None:
+            rng = np.random.default_rng()
+
+        def random_egoist_strategy(nb_nodes, node_id, history, impossible_edges, imposed_edges, analysis=None,
+                                   constraints=None):
+            return self.get_random_egoist_edge(nb_nodes, node_id, history, impossible_edges, imposed_edges, rng,
+                                               constraints)
         return random_egoist_strategy
 
     def get_follower_strategy(self):
@@ -83,15 +174,16 @@ class StrategyBuilder:
         when connected to everyone
         :return: function computing the edge of the follower strategy
         """
-        def follower_strategy(nb_nodes, node_id, history, impossible_edges, imposed_edges):
+        def follower_strategy(nb_nodes, node_id, history, impossible_edges, imposed_edges, analysis=None,
+                              constraints=None):
 
-            # build graph related to the current state
-            graph = nx.Graph()
-            graph.add_nodes_from(list(range(nb_nodes)))
-            graph.add_edges_from(history[len(history) - 1])
+            # analysis of the current state, shared by the players of the round when called by a Game
+            if analysis is None:
+                analysis = RoundAnalysis(history.get_graph(), nb_nodes)
+            graph = analysis.graph
 
             # find the best players and order them in decreasing order
-            inverse = [(value, key) for key, value in nx.betweenness_centrality(graph).items()]
+            inverse = [(value, key) for key, value in enumerate(analysis.betweenness())]
             sorted(inverse, reverse=True)
 
             for i in range(len(inverse)):
@@ -102,112 +194,206 @@ class StrategyBuilder:
 
         return follower_strategy
 
-    def get_greedy_strategy(self):
+    def get_greedy_strategy(self, nb_workers=None, rng=None):
         """
         Define and return the greedy strategy (myopic, only based on the current state and best current action)
+        :param nb_workers: int, if greater than 1 the candidate edges are evaluated by a pool of worker processes
+        :param rng: np.random.Generator, source of randomness of the first move on an empty graph
         :return: function that returns the best myopic action given the current state
         """
-        def greedy_strategy(nb_nodes, node_id, history, impossible_edges, imposed_edges):
+        if rng is None:
+            rng = np.random.default_rng()
+
+        def greedy_strategy(nb_nodes, node_id, history, impossible_edges, imposed_edges, analysis=None,
+                            constraints=None):
+            # analysis of the current state, shared by the players of the round when called by a Game
+            if analysis is None:
+                analysis = RoundAnalysis(history.get_graph(), nb_nodes)
+
+            constraints = _get_constraints(nb_nodes, impossible_edges, imposed_edges, constraints)
 
             # if graph is empty, return random egoist
-            if len(history[len(history) - 1]) == 0:
-                return self.get_random_egoist_edge(nb_nodes, node_id, history, impossible_edges, imposed_edges)
+            if analysis.graph.number_of_edges() == 0:
+                return self.get_random_egoist_edge(nb_nodes, node_id, history, impossible_edges, imposed_edges, rng,
+                                                   constraints)
+
+            # iterate through all possible action (possible edge) and keep track of the best choice, the candidates
+            # start from the shortest paths of the round instead of recomputing them. The possible edges come by blocks
+            # in a fixed order, a block only replaces the best choice of the previous ones if it strictly beats it, so
+            # ties are always broken the same way. The snapshot (with its N x N distances) is shipped to the workers
+            # once per move, not once per block
+            snapshot = (nb_nodes, node_id, analysis.edge_array(), analysis.get_target_dependencies(node_id))
+            best_bet, best_edge = analysis.node_betweenness(node_id), None
+            with SharedSnapshot(snapshot, nb_workers) as shared:
+                for possible_edges in constraints.iter_candidates(analysis.graph):
+                    best_bet, best_index = find_best_candidate(_evaluate_greedy_candidates, shared, possible_edges,
+                                                               best_bet, nb_workers)
+                    if best_index is not None:
+                        best_edge = tuple(possible_edges[best_index].tolist())
+
+            return best_edge
 
-            # build graph related to the current state
-            graph = nx.Graph()
-            graph.add_nodes_from(list(range(nb_nodes)))
-            graph.add_edges_from(history[len(history) - 1])
+        return greedy_strategy
+
+    def get_approx_greedy_strategy(self, EPSILON=.1, DELTA=.05, nb_workers=None, seed=None, common_samples=False,
+                                   rng=None):
+        """
+        Define and return the greedy strategy (myopic, only based on the current state and best current action)
+        :param nb_workers: int, if greater than 1 the candidate edges are evaluated by a pool of worker processes
+        :param seed: None or int, seed of the samples drawn by the betweenness estimator (if rng is not given)
+        :param common_samples: boolean, if True one set of sampled pairs is drawn per move and shared by all the
+        candidates, only the pairs whose shortest paths are affected by a candidate edge are re-evaluated
+        :param rng: np.random.Generator, source of randomness of the strategy
+        :return: function that returns the best myopic ation given the current state
+        """
+        if rng is None:
+            rng = np.random.default_rng(seed)
 
-            # initialize the best current action
-            best_u, best_v, best_bet = 0, 0, nx.betweenness_centrality(graph)[node_id]
+        def approx_greedy_strategy(nb_nodes, node_id, history, impossible_edges, imposed_edges, analysis=None,
+                                   constraints=None, EPSILON=EPSILON, DELTA=DELTA):
+            # analysis of the current state, shared by the players of the round when called by a Game
+            if analysis is None:
+                analysis = RoundAnalysis(history.get_graph(), nb_nodes)
+            graph = analysis.graph
 
-            # create the list of possible edges
-            edges_combination = list(itertools.combinations(range(nb_nodes), r=2))
-            possible_edges = set(edges_combination) - set(impossible_edges)
-            possible_edges -= set(imposed_edges)
+            # if graph is empty, return random egoist
+            EPSILON = EPSILON
+            DELTA = DELTA
+            constraints = _get_constraints(nb_nodes, impossible_edges, imposed_edges, constraints)
+            if graph.number_of_edges() == 0:
+                return self.get_random_egoist_edge(nb_nodes, node_id, history, impossible_edges, imposed_edges, rng,
+                                                   constraints)
+
+            # a greedy player would only consider removing existing edges or adding edges adjacent to itself
+            possible_edges = _get_approx_greedy_candidates(nb_nodes, node_id, analysis.edge_array(), constraints,
+                                                           graph)
+
+            move_seed = int(rng.integers(2 ** 63))
+            snapshot = (nb_nodes, node_id, analysis.edge_array(), EPSILON, DELTA, move_seed)
+
+            if common_samples:
+                # every worker draws the same pairs from the move seed
+                best_bet = SampledPairsBetweenness(graph, node_id, eps=EPSILON, delta=DELTA, seed=move_seed).estimate()
+                evaluate = _evaluate_common_samples_candidates
+            else:
+                # every candidate draws its samples from its own stream, and the sampler reads the neighbors in
+                # sorted order (toggling a candidate off and on again reorders them), so that the result doesn't
+                # depend on nb_workers
+                best_bet = approximate_betweenness_centrality(graph, eps=EPSILON, delta=DELTA,
+                                                              seed=[move_seed])[node_id]
+                evaluate = _evaluate_approx_greedy_candidates
 
             # iterate through all possible action (possible edge) and keep track of the best choice
-            for i, j in possible_edges:
-                if graph.has_edge(i, j):
-                    graph.remove_edge(i, j)
+            best_bet, best_index = find_best_candidate(evaluate, snapshot, possible_edges, best_bet, nb_workers)
+
+            if best_index is None:
+                return None
+            else:
+                return tuple(possible_edges[best_index].tolist())
 
-                    new_bet = nx.betweenness_centrality(graph)[node_id]
-                    if new_bet > best_bet:
-                        best_u, best_v, best_bet = i, j, new_bet
+        return approx_greedy_strategy
 
-                    graph.add_edge(i, j)
 
-                elif graph.has_edge(j, i):
-                    graph.remove_edge(j, i)
+def _get_constraints(nb_nodes, impossible_edges, imposed_edges, constraints):
+    """
+    :return: ConstraintIndex, the compiled constraints given by the Game, compiled from the edge lists otherwise
+    """
+    if constraints is None:
+        constraints = ConstraintIndex(nb_nodes, impossible_edges, imposed_edges)
+    return constraints
 
-                    new_bet = nx.betweenness_centrality(graph)[node_id]
-                    if new_bet > best_bet:
-                        best_u, best_v, best_bet = j, i, new_bet
 
-                    graph.add_edge(j, i)
+def _get_approx_greedy_candidates(nb_nodes, node_id, edges, constraints, graph):
+    """
+    :param edges: (nb_edges, 2) int array, edges of the current state
+    :return: (nb_candidates, 2) int array, sorted existing edges and edges of node_id that can be toggled
+    """
+    edges = np.sort(np.asarray(edges, dtype=np.int64).reshape(-1, 2), axis=1)
+    edges = edges[~(constraints.are_impossible(edges[:, 0], edges[:, 1]) |
+                    constraints.are_imposed(edges[:, 0], edges[:, 1]))]
+    own_edges = constraints.get_candidates(graph, node_id)
+    keys = np.union1d(_get_edge_key(nb_nodes, edges[:, 0], edges[:, 1]),
+                      _get_edge_key(nb_nodes, own_edges[:, 0].astype(np.int64), own_edges[:, 1].astype(np.int64)))
+    return np.column_stack(np.divmod(keys, nb_nodes))
 
-                else:
-                    graph.add_edge(i, j)
 
-                    new_bet = nx.betweenness_centrality(graph)[node_id]
-                    if new_bet > best_bet:
-                        best_u, best_v, best_bet = i, j, new_bet
+def _get_edge_key(nb_nodes, u, v):
+    """
+    :return: int or array, index of the undirected edge (u, v) in a nb_nodes x nb_nodes matrix
+    """
+    return np.minimum(u, v) * nb_nodes + np.maximum(u, v)
 
-                    graph.remove_edge(i, j)
 
-            if best_u == best_v:
-                return None
-            else:
-                return best_u, best_v
+"""
+Candidate evaluators of the greedy strategies (see parallel.find_best_candidate). They are module level functions so
+that they can be sent to worker processes.
+"""
 
-        return greedy_strategy
 
-    def get_approx_greedy_strategy(self, EPSILON=.1, DELTA=.05):
-        """
-        Define and return the greedy strategy (myopic, only based on the current state and best current action)
-        :return: function that returns the best myopic ation given the current state
-        """
-        def approx_greedy_strategy(nb_nodes, node_id, history, impossible_edges, imposed_edges, EPSILON=EPSILON, DELTA=DELTA):
-            # if graph is empty, return random egoist
-            EPSILON = EPSILON
-            DELTA = DELTA
-            if len(history[len(history) - 1]) == 0:
-                return self.get_random_egoist_edge(nb_nodes, node_id)
+def _evaluate_greedy_candidates(snapshot, candidates, start, best_bet):
+    nb_nodes, node_id, edges, dependencies = snapshot
 
-            # build graph related to the current state
-            graph = nx.Graph()
-            graph.add_nodes_from(list(range(nb_nodes)))
-            graph.add_edges_from(history[len(history) - 1])
+    # the engine keeps the shortest path DAGs of the current state, each candidate edge only recomputes the
+    # sources whose DAG is modified by the toggle, and only the dependencies on node_id are accumulated
+    engine = DynamicBetweenness(ArrayGraph.from_edges(nb_nodes, edges), nb_nodes, node=node_id,
+                                dependencies=dependencies)
+    current_bet = engine.node_betweenness()
 
-            # initialize the best current action
-            best_u, best_v, best_bet = 0, 0, approximate_betweenness_centrality(graph, eps=EPSILON, delta=DELTA)[node_id]
+    # pruning: the candidates are evaluated by decreasing upper bound of their betweenness, and the scan stops as
+    # soon as no remaining candidate can beat the best one (the first candidate wins ties, as in a sequential scan)
+    bounds = current_bet + np.array([engine.gain_upper_bound(i, j) for i, j in candidates])
 
-            # create the list of possible edges
-            edges_combination = list(itertools.combinations(range(nb_nodes), r=2))
-            possible_edges = set(edges_combination) - set(impossible_edges)
-            possible_edges -= set(imposed_edges)
+    best_index = None
+    for k in np.argsort(-bounds, kind="stable"):
+        index = start + int(k)
+        if not _may_beat(bounds[k], index, best_bet, best_index):
+            if bounds[k] < best_bet - TOLERANCE or best_index is None:
+                break
+            continue
 
-            # iterate through all possible action (possible edge) and keep track of the best choice
-            for i, j in possible_edges:
-                if graph.has_edge(i, j):
-                    graph.remove_edge(i, j)
-                    new_bet = approximate_betweenness_centrality(graph, eps=EPSILON, delta=DELTA)[node_id]
-                    if new_bet > best_bet:
-                        best_u, best_v, best_bet = i, j, new_bet
-                    graph.add_edge(i, j)
-                elif i == node_id or j == node_id:
-                    # a greedy player would only consider adding edges adjacent to itself
-                    graph.add_edge(i, j)
-
-                    new_bet = approximate_betweenness_centrality(graph, eps=EPSILON, delta=DELTA)[node_id]
-                    if new_bet > best_bet:
-                        best_u, best_v, best_bet = i, j, new_bet
-
-                    graph.remove_edge(i, j)
-
-            if best_u == best_v:
-                return None
-            else:
-                return best_u, best_v
+        new_bet = engine.what_if(*candidates[k])
+        if _may_beat(new_bet, index, best_bet, best_index):
+            best_index, best_bet = index, new_bet
 
-        return approx_greedy_strategy
+    return best_bet, best_index
+
+
+def _may_beat(value, index, best_bet, best_index):
+    """
+    :return: boolean, True if a candidate with this value would replace the current best one in a sequential scan
+    """
+    if value - best_bet > TOLERANCE:
+        return True
+    return best_index is not None and index < best_index and value - best_bet >= -TOLERANCE
+
+
+def _evaluate_approx_greedy_candidates(snapshot, candidates, start, best_bet):
+    nb_nodes, node_id, edges, EPSILON, DELTA, move_seed = snapshot
+
+    graph = ArrayGraph.from_edges(nb_nodes, edges)
+
+    best_index = None
+    for index, (i, j) in enumerate(candidates, start):
+        graph.toggle_edge(i, j)
+        new_bet = approximate_betweenness_centrality(graph, eps=EPSILON, delta=DELTA, seed=[move_seed, index])[node_id]
+        graph.toggle_edge(i, j)
+
+        if new_bet - best_bet > TOLERANCE:
+            best_index, best_bet = index, new_bet
+
+    return best_bet, best_index
+
+
+def _evaluate_common_samples_candidates(snapshot, candidates, start, best_bet):
+    nb_nodes, node_id, edges, EPSILON, DELTA, move_seed = snapshot
+
+    estimator = SampledPairsBetweenness(ArrayGraph.from_edges(nb_nodes, edges), node_id, eps=EPSILON, delta=DELTA,
+                                        seed=move_seed, nb_nodes=nb_nodes)
+
+    best_index = None
+    for index, (i, j) in enumerate(candidates, start):
+        new_bet = estimator.what_if(i, j)
+        if new_bet - best_bet > TOLERANCE:
+            best_index, best_bet = index, new_bet
+
+    return best_bet, best_index
@@ -0,0 +1,85 @@
+import glob
+import os
+import tempfile
+
+import numpy as np
+
+from centrality.backfill import backfill, get_nb_rounds, get_output_filenames
+from centrality.metrics import Metrics
+from centrality.metricstore import MetricsStore
+from centrality.simulation import GameConfig
+from centrality.strategy import Strategy
+
+METRICS = [Metrics.macro_diameter, Metrics.micro_betweenness_centrality, Metrics.micro_core_number]
+
+
+def _play(seed):
+    """
+    :return: Game, small game played with live metrics (see observer.MetricsObserver)
+    """
+    game = GameConfig(12, 20, [Strategy.greedy, Strategy.random_egoist, Strategy.random]).build_game(seed)
+    game.fast_forward = False
+    game.play_game(metrics=METRICS)
+    return game
+
+
+def test_backfill_round_trip():
+    """
+    The metrics computed offline from saved games are the live metrics of the games, x.pkl, x.cgam and sub/x.pkl
+    having their own metrics
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        games = os.path.join(directory, "games")
+        os.makedirs(os.path.join(games, "sub"))
+        live = {}
+        for seed, name in enumerate(["x.pkl", "x.cgam", os.path.join("sub", "x.pkl")]):
+            filename = os.path.join(games, name)
+            game = _play(seed)
+            if filename.endswith(".cgam"):
+                game.save_binary(filename)
+            else:
+                game.save(filename)
+            live[filename] = game.metrics
+
+        output_directory = os.path.join(directory, "metrics")
+        outputs = backfill(sorted(live), output_directory, METRICS, nb_workers=2, chunk_size=4)
+        assert len(set(outputs.values())) == len(live)
+        assert os.path.exists(os.path.join(output_directory, "sub", "x.pkl.npz"))
+        for filename, metrics in live.items():
+            store = MetricsStore.load_npz(outputs[filename])
+            assert len(store) == len(metrics) == get_nb_rounds(filename) - 1
+            for metric in METRICS:
+                assert np.allclose(store.get(metric), metrics.get(metric), equal_nan=True, atol=1e-6), metric
+        assert not glob.glob(os.path.join(output_directory, "**", "*.part.npz"), recursive=True)
+
+        # a second run skips the games already computed
+        times = {filename: os.path.getmtime(output) for filename, output in outputs.items()}
+        assert backfill(sorted(live), output_directory, METRICS) == outputs
+        assert all(os.path.getmtime(outputs[filename]) == time for filename, time in times.items())
+
+
+def test_output_names():
+    """
+    Two games never share their metrics
+    """
+    outputs = get_output_filenames("metrics", ["a/x.pkl", "a/x.cgam", "a/b/x.pkl", "c/x.pkl"])
+    assert len(set(outputs.values())) == 4
+    assert outputs["a/b/x.pkl"] == os.path.join("metrics", "a", "b", "x.pkl.npz")
+
+    for filenames in (["a/x.pkl", "a/x.pkl"], ["a/x.pkl", "./a/x.pkl"]):
+        try:
+            get_output_filenames("metrics", filenames)
+        except Exception:
+            continue
+        raise Exception("%s share their metrics" % filenames)
+
+
+if __name__ == '__main__':
+
+    """
+    Backfill of saved games
+    """
+
+    test_backfill_round_trip()
+    test_output_names()
+    print("OK")
@@ -0,0 +1,136 @@
+import networkx as nx
+import numpy as np
+
+from centrality.betweenness import DynamicBetweenness, TOLERANCE
+from centrality.graph import ArrayGraph
+from centrality.history import GameHistory
+from centrality.strategy import StrategyBuilder
+
+
+def _get_graphs():
+    """
+    :return: seeded random graphs, small enough to compare every candidate edge with networkx
+    """
+    return [nx.gnp_random_graph(nb_nodes, p, seed=seed)
+            for seed, (nb_nodes, p) in enumerate([(8, .3), (12, .2), (15, .15), (20, .1), (20, .25)])]
+
+
+def _get_pairs(nb_nodes):
+    return [(u, v) for u in range(nb_nodes) for v in range(u + 1, nb_nodes)]
+
+
+def _toggled(graph, u, v):
+    graph = graph.copy()
+    if graph.has_edge(u, v):
+        graph.remove_edge(u, v)
+    else:
+        graph.add_edge(u, v)
+    return graph
+
+
+def _check(value, expected, message):
+    if abs(value - expected) > 1e-9:
+        raise Exception("%s: %s instead of %s" % (message, value, expected))
+
+
+def test_static_betweenness():
+    """
+    Betweenness of the array graph
+    """
+    for graph in _get_graphs():
+        expected = nx.betweenness_centrality(graph)
+        computed = ArrayGraph.from_networkx(graph).betweenness_centrality()
+        for node in range(graph.number_of_nodes()):
+            _check(computed[node], expected[node], "betweenness of %s" % node)
+
+
+def test_what_if():
+    """
+    what_if of every edge, then again after toggling some edges
+    """
+    rng = np.random.default_rng(0)
+    for graph in _get_graphs():
+        nb_nodes = graph.number_of_nodes()
+        pairs = _get_pairs(nb_nodes)
+        engine = DynamicBetweenness(graph)
+        current = graph.copy()
+        for step in range(3):
+            for u, v in pairs:
+                expected = nx.betweenness_centrality(_toggled(current, u, v))
+                computed = engine.what_if(u, v)
+                for node in range(nb_nodes):
+                    _check(computed[node], expected[node], "what_if(%s, %s) of %s" % (u, v, node))
+
+            u, v = pairs[rng.integers(len(pairs))]
+            engine.toggle(u, v)
+            current = _toggled(current, u, v)
+            expected = nx.betweenness_centrality(current)
+            for node, value in engine.betweenness().items():
+                _check(value, expected[node], "betweenness of %s after toggle(%s, %s)" % (node, u, v))
+
+
+def test_target_mode():
+    """
+    Target mode and its gain upper bound
+    """
+    rng = np.random.default_rng(1)
+    for graph in _get_graphs():
+        nb_nodes = graph.number_of_nodes()
+        for target in rng.choice(nb_nodes, size=3, replace=False):
+            target = int(target)
+            engine = DynamicBetweenness(graph, node=target)
+            _check(engine.node_betweenness(), nx.betweenness_centrality(graph)[target], "betweenness of %s" % target)
+            for u, v in _get_pairs(nb_nodes):
+                value = engine.what_if(u, v)
+                _check(value, nx.betweenness_centrality(_toggled(graph, u, v))[target],
+                       "target %s, what_if(%s, %s)" % (target, u, v))
+                if value > engine.node_betweenness() + engine.gain_upper_bound(u, v) + TOLERANCE:
+                    raise Exception("target %s, the gain of (%s, %s) exceeds its upper bound" % (target, u, v))
+
+
+def test_pruned_greedy():
+    """
+    Pruned greedy against a brute force scan: the first edge (in increasing order) strictly improving the betweenness
+    of the player the most, None if no edge improves it
+    """
+    rng = np.random.default_rng(2)
+    for graph in _get_graphs():
+        nb_nodes = graph.number_of_nodes()
+        pairs = _get_pairs(nb_nodes)
+        history = GameHistory()
+        history.append(ArrayGraph.from_networkx(graph))
+        greedy = StrategyBuilder().get_greedy_strategy(rng=np.random.default_rng(0))
+        impossible_edges = [pairs[k] for k in rng.choice(len(pairs), size=len(pairs) // 10, replace=False)]
+        imposed_edges = [edge for edge in graph.edges() if rng.random() < .2]
+        forbidden = set(impossible_edges) | set((min(u, v), max(u, v)) for u, v in imposed_edges)
+
+        for node_id in range(nb_nodes):
+            best_bet, best_edge = nx.betweenness_centrality(graph)[node_id], None
+            for u, v in pairs:
+                if (u, v) in forbidden:
+                    continue
+                value = nx.betweenness_centrality(_toggled(graph, u, v))[node_id]
+                if value - best_bet > TOLERANCE:
+                    best_bet, best_edge = value, (u, v)
+
+            edge = greedy(nb_nodes, node_id, history, impossible_edges, imposed_edges)
+            if (edge is None) != (best_edge is None):
+                raise Exception("greedy of %s: %s instead of %s" % (node_id, edge, best_edge))
+            if edge is not None:
+                if tuple(edge) in forbidden:
+                    raise Exception("greedy of %s: forbidden edge %s" % (node_id, edge))
+                _check(nx.betweenness_centrality(_toggled(graph, *edge))[node_id], best_bet,
+                       "greedy of %s, edge %s" % (node_id, edge))
+
+
+if __name__ == '__main__':
+
+    """
+    Exact and dynamic betweenness against networkx
+    """
+
+    test_static_betweenness()
+    test_what_if()
+    test_target_mode()
+    test_pruned_greedy()
+    print("OK")
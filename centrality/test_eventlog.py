@@ -0,0 +1,63 @@
+import os
+import tempfile
+
+import numpy as np
+
+from centrality.eventlog import EventLogObserver, resume_game, read_events
+from centrality.simulation import GameConfig
+from centrality.strategy import Strategy
+
+
+def _play_and_resume(config, seed, nb_rounds, filename):
+    """
+    Play nb_rounds rounds of a logged game, drop the game as if its process died and resume it from the log
+    :return: Game, resumed game played until the end
+    """
+    game = config.build_game(seed)
+    game.observers.append(EventLogObserver(filename))
+    observers = game.get_observers()
+    for observer in observers:
+        observer.on_game_start(game)
+    for _ in range(nb_rounds):
+        game.play_round(observers=observers)
+    del game
+
+    game = resume_game(filename, headless=True)
+    assert game.current_step == nb_rounds and len(game.history) == nb_rounds + 1
+    game.play_game()
+    return game
+
+
+def test_resume_equals_uninterrupted():
+    """
+    A game resumed from its log plays the same rounds as the uninterrupted game
+    """
+    configs = [(GameConfig(12, 15, [Strategy.approx_greedy] * 6 + [Strategy.random] * 6), (8, 9)),
+               (GameConfig(16, 10, [Strategy.greedy, Strategy.random, Strategy.random_egoist]), (11,))]
+
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, "game.ndjson")
+        for config, seeds in configs:
+            for seed in seeds:
+                reference = config.build_game(seed)
+                reference.play_game()
+
+                for nb_rounds in (1, 5, 8):
+                    game = _play_and_resume(config, seed, nb_rounds, filename)
+                    assert len(game.history) == len(reference.history)
+                    for round_number in range(len(reference.history)):
+                        assert np.array_equal(game.history.get_edges(round_number),
+                                              reference.history.get_edges(round_number)), (seed, round_number)
+                    events = read_events(filename)
+                    assert [event["event"] for event in events].count("start") == 1
+                    assert events[-1]["event"] == "end"
+
+
+if __name__ == '__main__':
+
+    """
+    Resume a game after some rounds
+    """
+
+    test_resume_equals_uninterrupted()
+    print("OK")
@@ -0,0 +1,58 @@
+import numpy as np
+
+from centrality.graph import BitsetGraph
+from centrality.simulation import GameConfig, aggregate_results, play_seeded_game
+from centrality.strategy import Strategy
+
+
+def test_dense_equals_array():
+    """
+    Switching the state to a BitsetGraph is a pure representation change: with the same seed, both backends play the
+    same game
+    """
+    settings = [(12, 15, [Strategy.approx_greedy] * 6 + [Strategy.random] * 6, None),
+                (16, 10, [Strategy.greedy, Strategy.approx_greedy, Strategy.follower, Strategy.random_egoist],
+                 [(0, 1), (0, 2), (1, 3)])]
+
+    for nb_players, nb_max_step, strategies, impossible_edges in settings:
+        for seed in (0, 4, 9):
+            games = []
+            for dense_state in (False, True):
+                game = GameConfig(nb_players, nb_max_step, strategies, impossible_edges,
+                                  dense_state=dense_state).build_game(seed)
+                game.play_game()
+                games.append(game)
+
+            array_game, dense_game = games
+            assert isinstance(dense_game.graph, BitsetGraph) and not isinstance(array_game.graph, BitsetGraph)
+            assert len(array_game.history) == len(dense_game.history)
+            for round_number in range(len(array_game.history)):
+                assert np.array_equal(array_game.history.get_edges(round_number),
+                                      dense_game.history.get_edges(round_number)), (seed, round_number)
+
+
+def test_config_names():
+    """
+    The default names of the settings tell the backends apart, so their results are never merged
+    """
+    strategies = [Strategy.greedy, Strategy.random]
+    array_config = GameConfig(12, 6, strategies)
+    dense_config = GameConfig(12, 6, strategies, dense_state=True)
+    assert array_config.name == "12_6_greedy_random"
+    assert dense_config.name == "12_6_greedy_random_dense"
+    assert GameConfig(12, 6, strategies, name="custom", dense_state=True).name == "custom"
+
+    results = [play_seeded_game(config, seed) for config in (array_config, dense_config) for seed in range(2)]
+    summary = aggregate_results(results)
+    assert summary[array_config.name]["games"] == 2 and summary[dense_config.name]["games"] == 2
+
+
+if __name__ == '__main__':
+
+    """
+    Dense and array games
+    """
+
+    test_dense_equals_array()
+    test_config_names()
+    print("OK")
@@ -0,0 +1,86 @@
+from multiprocessing import shared_memory
+
+import networkx as nx
+import numpy as np
+
+from centrality.analysis import RoundAnalysis
+from centrality.constraints import ConstraintIndex
+from centrality.graph import ArrayGraph
+from centrality.history import GameHistory
+from centrality.parallel import find_best_candidate, SharedSnapshot
+from centrality.strategy import StrategyBuilder, _evaluate_greedy_candidates
+
+
+def _get_history(nb_nodes, p, seed):
+    history = GameHistory()
+    history.append(ArrayGraph.from_networkx(nx.gnp_random_graph(nb_nodes, p, seed=seed)))
+    return history
+
+
+def test_approx_greedy_workers():
+    """
+    The approx greedy picks the same edge whatever the number of workers evaluating the candidates
+    """
+    for seed, nodes in [(0, [17, 3]), (1, [0, 21]), (2, [10, 36])]:
+        history = _get_history(40, .08, seed)
+        for node_id in nodes:
+            for common_samples in (False, True):
+                picks = [StrategyBuilder().get_approx_greedy_strategy(nb_workers=nb_workers, seed=seed,
+                                                                      common_samples=common_samples)
+                         (40, node_id, history, [], []) for nb_workers in (None, 2, 4)]
+                assert picks[0] == picks[1] == picks[2], (seed, node_id, common_samples, picks)
+
+
+def test_greedy_workers():
+    """
+    Same for the exact greedy
+    """
+    history = _get_history(30, .1, 3)
+    for node_id in (0, 7, 19):
+        picks = [StrategyBuilder().get_greedy_strategy(nb_workers=nb_workers, rng=np.random.default_rng(0))
+                 (30, node_id, history, [], []) for nb_workers in (None, 2, 4)]
+        assert picks[0] == picks[1] == picks[2], (node_id, picks)
+
+
+def test_shared_snapshot():
+    """
+    Candidates scanned by blocks with a snapshot shipped once per move give the result of a single scan, and the
+    shared memory is freed at the end of the move
+    """
+    history = _get_history(30, .1, 3)
+    analysis = RoundAnalysis(history.get_graph(), 30)
+    constraints = ConstraintIndex(30, impossible_edges=[(0, 5), (7, 19)])
+    for node_id in (0, 7, 19):
+        snapshot = (30, node_id, analysis.edge_array(), analysis.get_target_dependencies(node_id))
+        expected = find_best_candidate(_evaluate_greedy_candidates, snapshot, constraints.get_candidates(),
+                                       analysis.node_betweenness(node_id))
+
+        for nb_workers in (None, 2, 4):
+            best_bet, best_index, offset = analysis.node_betweenness(node_id), None, 0
+            with SharedSnapshot(snapshot, nb_workers) as shared:
+                for candidates in constraints.iter_candidates(block_size=50):
+                    best_bet, index = find_best_candidate(_evaluate_greedy_candidates, shared, candidates, best_bet,
+                                                          nb_workers)
+                    if index is not None:
+                        best_index = offset + index
+                    offset += len(candidates)
+            assert (best_bet, best_index) == expected, (node_id, nb_workers, best_bet, best_index, expected)
+
+            if shared.name is not None:
+                try:
+                    shared_memory.SharedMemory(shared.name).close()
+                except FileNotFoundError:
+                    continue
+                raise Exception("The shared memory %s of the snapshot is still allocated" % shared.name)
+
+
+if __name__ == '__main__':
+
+    """
+    Same result with 1, 2 and 4 workers
+    """
+
+    test_approx_greedy_workers()
+    test_greedy_workers()
+    test_shared_snapshot()
+    print("OK")